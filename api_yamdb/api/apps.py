@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+
+from api.db_connections import check_connections, count_connection
+from api.db_router import reset_routing
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        connection_created.connect(count_connection)
+        request_started.connect(check_connections)
+        request_finished.connect(reset_routing)
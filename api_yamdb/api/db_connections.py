@@ -0,0 +1,96 @@
+import threading
+from collections import defaultdict
+
+from django.db import connections
+
+_stats_lock = threading.Lock()
+_requests = 0
+_stats = defaultdict(lambda: {
+    'opened': 0,
+    'closed': 0,
+    'unusable': 0,
+    'checkouts': 0,
+    'wait_ms': 0.0,
+    'max_wait_ms': 0.0,
+    'timeouts': 0,
+})
+
+
+def record(alias: str, **values) -> None:
+    """Счётчики соединений базы alias: opened=1, wait_ms=0.4 и т.д."""
+    with _stats_lock:
+        stats = _stats[alias]
+        for name, value in values.items():
+            stats[name] += value
+        if 'wait_ms' in values:
+            stats['max_wait_ms'] = max(stats['max_wait_ms'],
+                                       values['wait_ms'])
+
+
+def get_connection_stats() -> dict:
+    """
+    Сводка процесса: сколько соединений открыто на запрос (churn)
+     и сколько ждали свободного соединения пула.
+    """
+    with _stats_lock:
+        requests = _requests
+        snapshot = {alias: dict(stats) for alias, stats in _stats.items()}
+    for stats in snapshot.values():
+        stats['opened_per_request'] = (round(stats['opened'] / requests, 3)
+                                       if requests else 0.0)
+        stats['avg_wait_ms'] = (round(stats['wait_ms'] / stats['checkouts'],
+                                      3) if stats['checkouts'] else 0.0)
+        stats['wait_ms'] = round(stats['wait_ms'], 3)
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 3)
+    return {'requests': requests, 'databases': snapshot}
+
+
+def reset_connection_stats() -> None:
+    global _requests
+    with _stats_lock:
+        _requests = 0
+        _stats.clear()
+
+
+def count_connection(sender, connection, **kwargs):
+    """connection_created: новое соединение без пула."""
+    # соединение из пула считает сам пул: физически открытые и выдачи
+    if not getattr(connection, 'pooled', False):
+        record(connection.alias, opened=1)
+
+
+def check_connections(sender, **kwargs):
+    """
+    request_started: постоянные соединения (CONN_MAX_AGE) с
+     CONN_HEALTH_CHECKS=True в настройках базы проверяются один раз
+     за запрос, перед первым обращением к базе (как в Django 4.1).
+    Соединение, оборванное базой или pgbouncer за время простоя,
+     закрывается, и запрос открывает новое вместо ошибки на первом SQL.
+     Запрос без SQL (ответ из кэша, 304) проверку не оплачивает.
+    """
+    global _requests
+    with _stats_lock:
+        _requests += 1
+    for connection in connections.all():
+        if connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            defer_health_check(connection)
+
+
+def defer_health_check(connection) -> None:
+    """Проверка соединения при следующем ensure_connection."""
+    connection.health_check_done = False
+    if 'ensure_connection' in vars(connection):
+        return
+    ensure_connection = connection.ensure_connection
+
+    def checked_ensure_connection():
+        if not connection.health_check_done:
+            connection.health_check_done = True
+            if (connection.connection is not None
+                    and not connection.in_atomic_block
+                    and not connection.is_usable()):
+                connection.close()
+                record(connection.alias, unusable=1)
+        ensure_connection()
+
+    connection.ensure_connection = checked_ensure_connection
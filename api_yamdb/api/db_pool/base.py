@@ -0,0 +1,88 @@
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from api.db_pool.pool import ConnectionPool, PoolTimeoutError
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def is_usable(connection) -> bool:
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений процесса: ENGINE='api.db_pool'.
+    Соединение берётся из пула на время запроса и возвращается в него
+     при закрытии, поэтому CONN_MAX_AGE должен быть 0 - иначе каждый
+     поток держит своё соединение и пул не нужен.
+    Настройки в DATABASES[alias]['POOL']: MAX_SIZE - соединений на процесс
+     (для gthread не меньше GUNICORN_THREADS), TIMEOUT - сколько секунд
+     ждать свободного. CONN_HEALTH_CHECKS=True проверяет соединение,
+     простоявшее в пуле не меньше CHECK_AFTER секунд, перед повторной
+     выдачей.
+    """
+    pooled = True
+
+    @property
+    def pool(self) -> ConnectionPool:
+        with _pools_lock:
+            pool = _pools.get(self.alias)
+            if pool is None:
+                options = self.settings_dict.get('POOL', {})
+                pool = _pools[self.alias] = ConnectionPool(
+                    self.alias,
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 10),
+                    check=(is_usable if self.settings_dict.get(
+                        'CONN_HEALTH_CHECKS') else None),
+                    check_after=options.get('CHECK_AFTER', 30))
+        return pool
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection = self.pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params))
+        except PoolTimeoutError as error:
+            # как ошибка подключения: Django обернёт в OperationalError
+            raise Database.OperationalError(str(error)) from error
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            self.pool.release(self.connection,
+                              discard=not self.reset_connection())
+
+    def reset_connection(self) -> bool:
+        """
+        Вернуть соединение в исходное состояние перед возвратом в пул.
+        False - соединение не годится для повторного использования.
+        """
+        connection = self.connection
+        # закрытое посреди atomic-блока Django ещё держит до его конца
+        if connection.closed or self.in_atomic_block:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Database.Error:
+                return False
+        return True
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from api.db_connections import record
+
+
+class PoolTimeoutError(Exception):
+    """Все соединения пула заняты дольше timeout секунд."""
+
+
+class ConnectionPool:
+    """
+    Пул соединений процесса для одной базы: не больше max_size
+     соединений на все потоки, свободные хранятся и выдаются повторно.
+    Поток без свободного слота ждёт до timeout секунд, время ожидания
+     и открытия/закрытия соединений пишутся в api.db_connections.
+    check - проверка соединения, простоявшего в пуле не меньше
+     check_after секунд, перед выдачей: недавно возвращённое соединение
+     выдаётся без запроса к базе. Непрошедшее проверку закрывается
+     и заменяется.
+    """
+
+    def __init__(self, alias: str, max_size: int, timeout: float,
+                 check: Optional[Callable] = None, check_after: float = 0):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check = check
+        self.check_after = check_after
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, connect: Callable):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            record(self.alias, timeouts=1)
+            raise PoolTimeoutError(
+                f'нет свободных соединений с {self.alias} '
+                f'за {self.timeout} с, в пуле {self.max_size}')
+        record(self.alias, checkouts=1,
+               wait_ms=(time.perf_counter() - started) * 1000)
+        try:
+            return self._take(connect)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _take(self, connect: Callable):
+        while True:
+            with self._lock:
+                connection, released = (self._idle.pop() if self._idle
+                                        else (None, None))
+            if connection is None:
+                connection = connect()
+                record(self.alias, opened=1)
+                return connection
+            if (self.check is None
+                    or time.monotonic() - released < self.check_after
+                    or self.check(connection)):
+                return connection
+            record(self.alias, unusable=1)
+            self._discard(connection)
+
+    def release(self, connection, discard: bool = False) -> None:
+        try:
+            if discard:
+                self._discard(connection)
+            else:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def _discard(self, connection) -> None:
+        try:
+            connection.close()
+        finally:
+            record(self.alias, closed=1)
+
+    def clear(self) -> None:
+        """Закрыть свободные соединения, выданные вернутся как обычно."""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
@@ -0,0 +1,78 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# реплика, с которой читает текущий запрос, None - читать из default
+_replica = ContextVar('replica', default=None)
+
+
+@contextmanager
+def request_routing():
+    """Границы запроса: разрешение читать с реплик не переживает запрос."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def allow_replica_reads() -> None:
+    """
+    Дальнейшие чтения запроса идут на одну случайную реплику,
+     пока не было записи: запрос видит один снимок данных.
+    """
+    if settings.DATABASE_REPLICAS:
+        _replica.set(random.choice(settings.DATABASE_REPLICAS))
+
+
+def read_from_primary() -> None:
+    """Дальнейшие чтения запроса идут в default, как после записи."""
+    _replica.set(None)
+
+
+def reset_routing(**kwargs) -> None:
+    """
+    Конец запроса (request_finished): поток gthread берёт следующий
+     запрос без реплики прошлого. Потоковый ответ до этого ещё читает
+     с неё.
+    """
+    _replica.set(None)
+
+
+@contextmanager
+def replica_reads():
+    """Чтения внутри блока идут на реплики, пока не было записи."""
+    with request_routing():
+        allow_replica_reads()
+        yield
+
+
+class ReplicaRouter:
+    """
+    Чтения безопасных запросов к api.v1 (см. ReplicaRoutingMiddleware)
+     уходят на реплику из DATABASE_REPLICAS, выбранную один раз на запрос.
+    Первая запись переключает остаток запроса на основную базу:
+     данные, записанные запросом, он же и прочитает (read-your-writes).
+    Внутри транзакции на default и без реплик всё идёт в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if (replica is not None
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # и объекты, прочитанные с реплики, сохраняются в default,
+        # дальше запрос читает оттуда же
+        if _replica.get() is not None:
+            _replica.set(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в default
+        return True
@@ -1,10 +1,18 @@
-from typing import Dict, Union
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional, Union
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
 from django.forms import EmailField
+from django.utils import timezone
+
+from api.models import EmailOutbox
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 def email_body(user: User) -> Dict[str, Union[str, EmailField]]:
@@ -20,12 +28,116 @@ def email_body(user: User) -> Dict[str, Union[str, EmailField]]:
     return data
 
 
-def send_email(user: User) -> None:
-    """Отправка сообщения с кодом подтверждения регистрации."""
+def queue_email(user: User) -> None:
+    """
+    Постановка сообщения с кодом подтверждения в очередь,
+     SMTP в запросе не участвует.
+    """
     data = email_body(user)
-    email = EmailMessage(
+    EmailOutbox.objects.create(
         subject=data['email_subject'],
         body=data['email_body'],
-        to=(data['to_email'],)
-    )
-    email.send()
+        to_email=data['to_email'])
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Экспоненциальная задержка перед следующей попыткой отправки."""
+    seconds = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.EMAIL_OUTBOX_MAX_DELAY))
+
+
+def claim_outbox_batch(batch_size: int) -> List[EmailOutbox]:
+    """
+    Захват порции писем короткой транзакцией до отправки.
+    Строки блокируются с skip_locked, попытка засчитывается сразу и
+     следующая откладывается: другие обработчики не возьмут эти письма,
+     а если обработчик упадёт посреди порции, они уйдут после задержки.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(EmailOutbox.objects.select_for_update(
+            skip_locked=True).filter(
+                sent__isnull=True,
+                next_attempt__lte=now,
+                attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        )[:batch_size])
+        for message in batch:
+            message.attempts += 1
+            message.next_attempt = now + retry_delay(message.attempts)
+        EmailOutbox.objects.bulk_update(batch, ('attempts', 'next_attempt'))
+    return batch
+
+
+def record_attempt(message: EmailOutbox,
+                   error: Optional[Exception] = None) -> None:
+    """
+    Итог попытки одного письма, отдельным UPDATE сразу после неё:
+     отправленное письмо не уйдёт повторно, что бы ни случилось дальше.
+    """
+    if error is None:
+        EmailOutbox.objects.filter(pk=message.pk).update(
+            sent=timezone.now(), last_error='')
+        return
+    logger.warning(f'письмо {message.id} не отправлено: {error}')
+    EmailOutbox.objects.filter(pk=message.pk).update(last_error=str(error))
+
+
+def open_connection(connection, pending: List[EmailOutbox]) -> bool:
+    """
+    (Пере)открытие SMTP-соединения. Если оно не открылось, попытка
+     считается неудачной для всех неотправленных писем порции.
+    """
+    try:
+        connection.close()
+        connection.open()
+    except Exception as err:
+        for message in pending:
+            record_attempt(message, err)
+        return False
+    return True
+
+
+def send_outbox_batch(connection, batch: List[EmailOutbox]) -> bool:
+    """
+    Отправка захваченной порции по открытому соединению.
+    Возвращает False, если соединение оборвалось и не открылось заново.
+    """
+    for number, message in enumerate(batch):
+        try:
+            connection.send_messages((EmailMessage(
+                subject=message.subject,
+                body=message.body,
+                to=(message.to_email,)),))
+        except Exception as err:
+            record_attempt(message, err)
+            # соединение могло оборваться, следующее письмо - по новому
+            if not open_connection(connection, batch[number + 1:]):
+                return False
+        else:
+            record_attempt(message)
+    return True
+
+
+def send_outbox(batch_size: int = 100) -> int:
+    """
+    Отправка всей очереди по одному SMTP-соединению.
+    Если SMTP недоступен, очередь ждёт следующего запуска: письма
+     захваченной порции получают неудачную попытку и задержку.
+    Возвращает количество обработанных писем.
+    """
+    total = 0
+    connection = get_connection()
+    try:
+        batch = claim_outbox_batch(batch_size)
+        connected = bool(batch) and open_connection(connection, batch)
+        while batch:
+            total += len(batch)
+            if not (connected and send_outbox_batch(connection, batch)):
+                return total
+            batch = claim_outbox_batch(batch_size)
+        return total
+    finally:
+        try:
+            connection.close()
+        except Exception as err:
+            logger.warning(f'SMTP-соединение не закрылось: {err}')
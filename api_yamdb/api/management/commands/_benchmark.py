@@ -0,0 +1,359 @@
+import json
+import math
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import count
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.management.commands._seed import seed
+from api.v1.authentication import access_token_for
+from api.v1.renderers import FastJSONRenderer
+from api.v1.serializer import (CommentSerializer, CommentValuesSerializer,
+                               ReviewSerializer, ReviewValuesSerializer,
+                               TitlesReadSerializer, TitleValuesSerializer)
+from reviews.models import Comment, GenreTitle, Review, Title
+
+User = get_user_model()
+
+# запрос эндпоинта: (метод, путь, тело)
+Request = Tuple[str, str, Optional[dict]]
+# эндпоинты, которые запрашиваются с токеном
+AUTHORIZED = ('users_me',)
+
+PERCENTILES = (50, 95, 99)
+RENDER_PAGE_SIZES = (10, 100, 1000)
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+# вёдра ограничений не пустеют, но проверяются: стоимость проверки
+# входит в замер, а сотни регистраций подряд не получают 429
+UNLIMITED_THROTTLE_RATES = dict.fromkeys(
+    ('auth_ip', 'auth_account', 'write_ip', 'write_user'), '1000000/s')
+
+
+def percentile(values: List[float], percent: int) -> float:
+    """Процентиль по ближайшему рангу, values отсортированы."""
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def build_endpoints() -> Dict[str, Callable[[int], Request]]:
+    """
+    Запросы основных эндпоинтов api.v1 на засеянных данных.
+    Функция получает номер запроса: регистрации нужны новые username.
+    """
+    comment = Comment.objects.select_related('review').order_by('id').first()
+    review = comment.review
+    link = (GenreTitle.objects.select_related('genre', 'title__category')
+            .order_by('id').first())
+    title = link.title
+    user = User.objects.order_by('id').first()
+    confirmation_code = default_token_generator.make_token(user)
+    signups = count()
+
+    def signup(number):
+        name = f'bench{next(signups)}'
+        return ('post', '/api/v1/auth/signup/',
+                {'username': name, 'email': f'{name}@yamdb.fake'})
+
+    return {
+        'titles_list': lambda number: ('get', '/api/v1/titles/', None),
+        'titles_filtered': lambda number: (
+            'get', f'/api/v1/titles/?genre={link.genre.slug}'
+                   f'&category={title.category.slug}&year={title.year}',
+            None),
+        'reviews_list': lambda number: (
+            'get', f'/api/v1/titles/{review.title_id}/reviews/', None),
+        'comments_list': lambda number: (
+            'get', f'/api/v1/titles/{review.title_id}/reviews/'
+                   f'{review.id}/comments/', None),
+        'signup': signup,
+        'token': lambda number: (
+            'post', '/api/v1/auth/token/',
+            {'username': user.username,
+             'confirmation_code': confirmation_code}),
+        'users_me': lambda number: (
+            'get', '/api/v1/users/me/', None),
+    }
+
+
+def measure(client: APIClient, make_request: Callable[[int], Request],
+            requests: int, warmup: int) -> Dict[str, float]:
+    """
+    Последовательные запросы в процессе, без сети.
+    Запросы считаются отдельным прогоном: CaptureQueriesContext
+     включает журнал SQL и сам по себе замедляет ответ.
+    """
+    for number in range(warmup):
+        send(client, make_request(number))
+    with CaptureQueriesContext(connection) as queries:
+        status = send(client, make_request(warmup))
+    # журнал запросов очищается сигналом request_started следующего запроса
+    query_count = len(queries)
+
+    timings = []
+    started = time.perf_counter()
+    for number in range(warmup + 1, warmup + 1 + requests):
+        request_started = time.perf_counter()
+        send(client, make_request(number))
+        timings.append((time.perf_counter() - request_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    result = {f'p{percent}_ms': round(percentile(timings, percent), 3)
+              for percent in PERCENTILES}
+    result.update({
+        'rps': round(requests / elapsed, 1),
+        'queries': query_count,
+        'status': status,
+    })
+    return result
+
+
+def send(client: APIClient, request: Request) -> int:
+    method, path, data = request
+    return getattr(client, method)(path, data, format='json').status_code
+
+
+def run_benchmark(titles: int = 1000, users: int = 100,
+                  reviews_per_title: int = 5, comments_per_review: int = 2,
+                  requests: int = 200, warmup: int = 10,
+                  with_cache: bool = False,
+                  only: Optional[List[str]] = None) -> dict:
+    """
+    Засеивает данные и замеряет эндпоинты api.v1.
+    Без with_cache кэш ответов отключён: меряем базу и сериализацию,
+     а не чтение из кэша.
+    """
+    counts = seed(titles=titles, users=users,
+                  reviews_per_title=reviews_per_title,
+                  comments_per_review=comments_per_review)
+    endpoints = build_endpoints()
+    user = User.objects.order_by('id').first()
+    anonymous = APIClient()
+    authorized = APIClient()
+    # роль в claims, как у токенов API: права проверяются без базы
+    token = access_token_for(user)
+    authorized.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    results = {}
+    overrides = {'REST_FRAMEWORK': dict(
+        settings.REST_FRAMEWORK,
+        DEFAULT_THROTTLE_RATES=UNLIMITED_THROTTLE_RATES)}
+    if not with_cache:
+        overrides['CACHES'] = DUMMY_CACHES
+    with override_settings(**overrides):
+        for name, make_request in endpoints.items():
+            if only and name not in only:
+                continue
+            client = authorized if name in AUTHORIZED else anonymous
+            results[name] = measure(client, make_request, requests, warmup)
+
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'requests': requests,
+            'with_cache': with_cache,
+            'dataset': counts,
+        },
+        'endpoints': results,
+    }
+
+
+def render_paths():
+    """Списки api.v1: модели для ModelSerializer и быстрый сериализатор."""
+    return {
+        'titles': (Title.objects.defer('search_vector').select_related(
+            'category').prefetch_related('genre'),
+            TitlesReadSerializer, TitleValuesSerializer),
+        'reviews': (Review.objects.select_related('author'),
+                    ReviewSerializer, ReviewValuesSerializer),
+        'comments': (Comment.objects.select_related('author'),
+                     CommentSerializer, CommentValuesSerializer),
+    }
+
+
+def model_page(queryset, serializer_class, size: int) -> bytes:
+    return JSONRenderer().render(
+        serializer_class(queryset[:size], many=True).data)
+
+
+def values_page(queryset, serializer_class, size: int) -> bytes:
+    rows = list(queryset.prefetch_related(None).values(
+        *serializer_class.values())[:size])
+    serializer_class.prepare(rows)
+    return FastJSONRenderer().render(serializer_class(rows, many=True).data)
+
+
+def time_page(render_page: Callable[[], bytes], repeats: int) -> float:
+    """Среднее время страницы в мс: запрос, сериализация и JSON."""
+    render_page()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        render_page()
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def run_render_benchmark(page_sizes=RENDER_PAGE_SIZES, repeats: int = 20,
+                         **dataset) -> dict:
+    """
+    Страницы списков api.v1 разного размера двумя путями:
+     модели + ModelSerializer + JSONRenderer против
+     values() + ValuesSerializer + FastJSONRenderer.
+    Байты ответов сравниваются перед замером.
+    """
+    counts = seed(**dataset)
+    results = {}
+    for name, (queryset, serializer_class,
+               values_class) in render_paths().items():
+        queryset = queryset.order_by('id')
+        for size in page_sizes:
+            before = partial(model_page, queryset, serializer_class, size)
+            after = partial(values_page, queryset, values_class, size)
+            if before() != after():
+                raise ValueError(f'{name}: быстрый путь отдал другой ответ')
+            model_ms = time_page(before, repeats)
+            fast_ms = time_page(after, repeats)
+            results[f'{name}_{size}'] = {
+                'rows': min(size, queryset.count()),
+                'model_ms': round(model_ms, 3),
+                'fast_ms': round(fast_ms, 3),
+                'speedup': round(model_ms / fast_ms, 2),
+            }
+
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'repeats': repeats,
+            'dataset': counts,
+        },
+        'pages': results,
+    }
+
+
+def http_get(url: str, timeout: float) -> Tuple[int, float]:
+    """GET по сети: статус и время ответа с чтением тела в мс."""
+    started = time.perf_counter()
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except HTTPError as error:
+        status = error.code
+    return status, (time.perf_counter() - started) * 1000
+
+
+def discover_read_paths(base_url: str, timeout: float) -> Dict[str, str]:
+    """
+    Пути читающих эндпоинтов по данным работающего сервера:
+     первое произведение, у которого есть отзыв с комментариями.
+    """
+    def get_json(path):
+        with urlopen(base_url + path, timeout=timeout) as response:
+            return json.load(response)
+
+    paths = {'titles_list': '/api/v1/titles/'}
+    for title in get_json('/api/v1/titles/')['results']:
+        reviews = get_json(f'/api/v1/titles/{title["id"]}/reviews/')
+        if not reviews['results']:
+            continue
+        review = reviews['results'][0]
+        paths.update({
+            'title_detail': f'/api/v1/titles/{title["id"]}/',
+            'reviews_list': f'/api/v1/titles/{title["id"]}/reviews/',
+            'comments_list': f'/api/v1/titles/{title["id"]}/reviews/'
+                             f'{review["id"]}/comments/',
+        })
+        return paths
+    raise ValueError('на сервере нет произведений с отзывами')
+
+
+def run_http_benchmark(base_url: str, concurrency: int = 16,
+                       requests: int = 1000, timeout: float = 30,
+                       label: str = '') -> dict:
+    """
+    Нагрузка по сети на развёрнутый сервер: concurrency клиентов
+     одновременно шлют requests запросов на каждый читающий эндпоинт.
+    Прогоны одного набора данных с GUNICORN_WORKER_CLASS=sync и gthread
+     при одинаковом GUNICORN_WORKERS сравниваются через compare.
+    """
+    base_url = base_url.rstrip('/')
+    paths = discover_read_paths(base_url, timeout)
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for name, path in paths.items():
+            url = base_url + path
+            started = time.perf_counter()
+            responses = list(pool.map(lambda _: http_get(url, timeout),
+                                      range(requests)))
+            elapsed = time.perf_counter() - started
+            timings = sorted(duration for _, duration in responses)
+            result = {f'p{percent}_ms': round(percentile(timings, percent), 3)
+                      for percent in PERCENTILES}
+            result.update({
+                'rps': round(requests / elapsed, 1),
+                'errors': sum(status != 200 for status, _ in responses),
+                'status': responses[-1][0],
+            })
+            results[name] = result
+
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'url': base_url,
+            'label': label,
+            'concurrency': concurrency,
+            'requests': requests,
+        },
+        'endpoints': results,
+    }
+
+
+def compare(previous: dict, current: dict) -> Dict[str, Dict[str, float]]:
+    """
+    Изменения относительно прошлого прогона по общим эндпоинтам:
+     отношения p95 (больше 1 - медленнее) и запросов в секунду,
+     разница числа SQL-запросов.
+    """
+    changes = {}
+    for name, result in current['endpoints'].items():
+        before = previous['endpoints'].get(name)
+        if before is None:
+            continue
+        changes[name] = {
+            'p95_ratio': round(result['p95_ms'] / before['p95_ms'], 3)
+            if before['p95_ms'] else math.inf,
+            'rps_ratio': round(result['rps'] / before['rps'], 3)
+            if before['rps'] else math.inf,
+        }
+        # по сети число SQL-запросов не видно
+        if 'queries' in result and 'queries' in before:
+            changes[name]['queries_delta'] = (result['queries']
+                                              - before['queries'])
+    return changes
+
+
+def save(report: dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as report_file:
+        return json.load(report_file)
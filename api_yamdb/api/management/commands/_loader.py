@@ -0,0 +1,223 @@
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Type
+
+import django
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, connections, models, transaction
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+# имена файлов выгрузки YaMDb, если в папке нет manifest.json
+DEFAULT_MANIFEST = {
+    'users.User': 'users.csv',
+    'reviews.Category': 'category.csv',
+    'reviews.Genre': 'genre.csv',
+    'reviews.Title': 'titles.csv',
+    'reviews.GenreTitle': 'genre_title.csv',
+    'reviews.Review': 'review.csv',
+    'reviews.Comment': 'comments.csv',
+}
+
+
+def load_levels(
+        models_list: Iterable[Type[models.Model]]
+) -> List[List[Type[models.Model]]]:
+    """
+    Разбиение моделей на уровни по внешним ключам: модели уровня ссылаются
+     только на предыдущие уровни, поэтому их можно грузить одновременно.
+    Учитываются только связи между загружаемыми моделями.
+    """
+    pending = list(dict.fromkeys(models_list))
+    levels = []
+    while pending:
+        ready = [model for model in pending
+                 if not (dependencies(model) & set(pending))]
+        if not ready:
+            raise ValueError(f'циклические внешние ключи: {pending}')
+        levels.append(ready)
+        pending = [model for model in pending if model not in ready]
+    return levels
+
+
+def load_order(
+        models_list: Iterable[Type[models.Model]]) -> List[Type[models.Model]]:
+    """Сортировка моделей по внешним ключам: сначала те, на кого ссылаются."""
+    return [model for level in load_levels(models_list) for model in level]
+
+
+def dependencies(model: Type[models.Model]) -> set:
+    """Модели, на которые ссылаются внешние ключи model (кроме неё самой)."""
+    return {field.related_model for field in model._meta.concrete_fields
+            if field.many_to_one and field.related_model is not model}
+
+
+def read_batches(reader: Iterator[List[str]],
+                 batch_size: int) -> Iterator[List[List[str]]]:
+    """Чтение csv порциями по batch_size строк, файл целиком не читается."""
+    while True:
+        batch = list(islice(reader, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def row_to_object(model: Type[models.Model], fields: List[models.Field],
+                  row: List[str]) -> models.Model:
+    values = {}
+    for field, value in zip(fields, row):
+        if value == '' and field.null:
+            values[field.attname] = None
+        else:
+            values[field.attname] = field.to_python(value)
+    return model(**values)
+
+
+@contextmanager
+def keep_file_dates(fields: List[models.Field]):
+    """
+    auto_now_add перезаписывает даты при вставке,
+     на время загрузки берём их из файла.
+    """
+    dated = [field for field in fields
+             if getattr(field, 'auto_now_add', False)
+             or getattr(field, 'auto_now', False)]
+    flags = [(field.auto_now, field.auto_now_add) for field in dated]
+    for field in dated:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(dated, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def load_csv(model: Type[models.Model], file_path: str, batch_size: int,
+             ignore_conflicts: bool = True) -> int:
+    """
+    Потоковая загрузка csv в таблицу модели через bulk_create,
+     каждая порция - отдельная транзакция.
+    ignore_conflicts - строки с уже существующим первичным ключом
+     (или другим уникальным значением) пропускаются.
+    Возвращает количество прочитанных строк.
+    """
+    started = time.monotonic()
+    total = 0
+    with open(file_path, 'r', encoding='utf-8-sig') as csv_file:
+        reader = csv.reader(csv_file, delimiter=',', quotechar='"')
+        head = next(reader)
+        fields = [model._meta.get_field(name) for name in head]
+        logger.info(f'пишем в поля - {head} таблицы {model.__name__}'
+                    f' порциями по {batch_size} строк')
+
+        with keep_file_dates(fields):
+            for number, batch in enumerate(
+                    read_batches(reader, batch_size), start=1):
+                objects = [row_to_object(model, fields, row)
+                           for row in batch]
+                with transaction.atomic():
+                    model.objects.bulk_create(
+                        objects, ignore_conflicts=ignore_conflicts)
+                total += len(batch)
+                elapsed = time.monotonic() - started
+                rate = total / elapsed if elapsed else total
+                logger.info(f'{model.__name__}: порция {number},'
+                            f' всего {total} строк за {elapsed:.1f} с'
+                            f' ({rate:.0f} строк/с)')
+
+    reset_sequences(model)
+    return total
+
+
+def reset_sequences(model: Type[models.Model]) -> None:
+    """Первичные ключи пришли из файла - двигаем счётчики автоинкремента."""
+    statements = connection.ops.sequence_reset_sql(no_style(), (model,))
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def read_manifest(directory: str) -> Dict[Type[models.Model], str]:
+    """
+    Модели и файлы для загрузки папки целиком.
+    manifest.json - словарь {"app_name.ModelName": "файл.csv"},
+     без него берутся найденные в папке файлы из DEFAULT_MANIFEST.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    else:
+        present = set(os.listdir(directory))
+        manifest = {label: file_name
+                    for label, file_name in DEFAULT_MANIFEST.items()
+                    if file_name in present}
+    return {apps.get_model(label): os.path.join(directory, file_name)
+            for label, file_name in manifest.items()}
+
+
+@contextmanager
+def deferred_indexes(models_list: Iterable[Type[models.Model]]):
+    """
+    Вторичные индексы из Meta.indexes снимаются на время загрузки и
+     строятся один раз в конце. Уникальные индексы и внешние ключи остаются:
+     на них держится ignore_conflicts, а ключи PostgreSQL и так
+     проверяются при коммите порции.
+    """
+    deferred = [(model, index) for model in models_list
+                for index in model._meta.indexes]
+    with connection.schema_editor() as editor:
+        for model, index in deferred:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in deferred:
+                editor.add_index(model, index)
+                logger.info(f'индекс {index.name} построен')
+
+
+def load_label(label: str, file_path: str, batch_size: int,
+               ignore_conflicts: bool) -> int:
+    """Загрузка одного файла в процессе пула, модель передаётся по имени."""
+    return load_csv(apps.get_model(label), file_path, batch_size,
+                    ignore_conflicts)
+
+
+def load_files(files: Dict[Type[models.Model], str], batch_size: int,
+               ignore_conflicts: bool = True, workers: int = 1) -> None:
+    """
+    Загрузка набора файлов по уровням внешних ключей.
+    Файлы одного уровня грузятся параллельно в пуле из workers процессов.
+    SQLite не держит параллельную запись - для неё всегда один процесс.
+    """
+    if connection.vendor == 'sqlite':
+        workers = 1
+    levels = load_levels(files)
+    with deferred_indexes(files):
+        if workers == 1:
+            for level in levels:
+                for model in level:
+                    load_csv(model, files[model], batch_size,
+                             ignore_conflicts)
+            return
+        # процессы пула открывают свои соединения, общие сокеты не наследуем
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=django.setup) as pool:
+            for level in levels:
+                tasks = [pool.submit(load_label, model._meta.label,
+                                     files[model], batch_size,
+                                     ignore_conflicts)
+                         for model in level]
+                for task in tasks:
+                    task.result()
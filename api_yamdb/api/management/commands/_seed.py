@@ -0,0 +1,111 @@
+import random
+from typing import Dict, Iterable, List, Type
+
+from django.contrib.auth import get_user_model
+from django.db import connection, models
+from django.db.models import Max
+
+from api.management.commands._loader import reset_sequences
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from reviews.rating_utils import rebuild_ratings
+
+User = get_user_model()
+
+WORDS = ('война', 'мир', 'море', 'город', 'ночь', 'звезда', 'дорога', 'сад',
+         'река', 'зима', 'песня', 'свет', 'тень', 'дом', 'ветер', 'огонь')
+
+
+def next_ids(model: Type[models.Model], count: int) -> List[int]:
+    """Явные id новых строк: bulk_create на SQLite их не возвращает."""
+    start = (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+    return list(range(start, start + count))
+
+
+def bulk_create(model: Type[models.Model], objects: Iterable[models.Model],
+                batch_size: int) -> None:
+    """
+    Явный batch_size в Django 2.2 не ограничивается лимитами базы
+     (у SQLite - число параметров запроса), ограничиваем сами.
+    """
+    objects = list(objects)
+    limit = connection.ops.bulk_batch_size(model._meta.concrete_fields,
+                                           objects)
+    model.objects.bulk_create(objects, batch_size=min(batch_size, limit))
+
+
+def sentence(rnd: random.Random, length: int) -> str:
+    return ' '.join(rnd.choice(WORDS) for _ in range(length))
+
+
+def seed(titles: int = 1000, users: int = 100, reviews_per_title: int = 5,
+         comments_per_review: int = 1, categories: int = 10,
+         genres: int = 20, batch_size: int = 1000,
+         random_seed: int = 0) -> Dict[str, int]:
+    """
+    Синтетический набор данных для замеров и EXPLAIN.
+    Отзывы произведения пишут разные пользователи (unique-review),
+     поэтому reviews_per_title не больше users.
+    Возвращает количество созданных строк по таблицам.
+    """
+    reviews_per_title = min(reviews_per_title, users)
+    rnd = random.Random(random_seed)
+
+    user_ids = next_ids(User, users)
+    bulk_create(User, (
+        User(id=pk, username=f'seed{pk}', email=f'seed{pk}@yamdb.fake')
+        for pk in user_ids), batch_size)
+
+    category_ids = next_ids(Category, categories)
+    bulk_create(Category, (
+        Category(id=pk, name=f'Категория {pk}', slug=f'seed-category-{pk}')
+        for pk in category_ids), batch_size)
+
+    genre_ids = next_ids(Genre, genres)
+    bulk_create(Genre, (
+        Genre(id=pk, name=f'Жанр {pk}', slug=f'seed-genre-{pk}')
+        for pk in genre_ids), batch_size)
+
+    title_ids = next_ids(Title, titles)
+    bulk_create(Title, (
+        Title(id=pk, name=sentence(rnd, 3), year=rnd.randint(1900, 2020),
+              description=sentence(rnd, 12),
+              category_id=rnd.choice(category_ids))
+        for pk in title_ids), batch_size)
+
+    genre_titles = [
+        GenreTitle(title_id=title_id, genre_id=genre_id)
+        for title_id in title_ids
+        for genre_id in rnd.sample(genre_ids, min(rnd.randint(1, 3), genres))
+    ]
+    bulk_create(GenreTitle, genre_titles, batch_size)
+
+    review_ids = next_ids(Review, titles * reviews_per_title)
+    bulk_create(Review, (
+        Review(id=review_ids[number * reviews_per_title + shift],
+               title_id=title_id,
+               author_id=user_ids[(number + shift) % users],
+               text=sentence(rnd, 20), score=rnd.randint(1, 10))
+        for number, title_id in enumerate(title_ids)
+        for shift in range(reviews_per_title)), batch_size)
+
+    comment_ids = next_ids(Comment, len(review_ids) * comments_per_review)
+    bulk_create(Comment, (
+        Comment(id=comment_ids[number * comments_per_review + shift],
+                review_id=review_id, author_id=rnd.choice(user_ids),
+                text=sentence(rnd, 10))
+        for number, review_id in enumerate(review_ids)
+        for shift in range(comments_per_review)), batch_size)
+
+    for model in (User, Category, Genre, Title, GenreTitle, Review, Comment):
+        reset_sequences(model)
+    rebuild_ratings()
+
+    return {
+        'users': users,
+        'categories': categories,
+        'genres': genres,
+        'titles': titles,
+        'genre_titles': len(genre_titles),
+        'reviews': len(review_ids),
+        'comments': len(comment_ids),
+    }
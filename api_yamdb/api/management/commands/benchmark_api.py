@@ -0,0 +1,145 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.management.commands._benchmark import (
+    AUTHORIZED, RENDER_PAGE_SIZES, compare, load, run_benchmark,
+    run_http_benchmark, run_render_benchmark, save)
+
+ENDPOINTS = ('titles_list', 'titles_filtered', 'reviews_list',
+             'comments_list', 'signup', 'token') + AUTHORIZED
+
+
+class Command(BaseCommand):
+    help = ('Benchmarking api.v1 endpoints in process on a seeded '
+            'throwaway test database, or over HTTP against a running '
+            'server with --url')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--reviews_per_title', type=int, default=5)
+        parser.add_argument('--comments_per_review', type=int, default=2)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help="measured requests per endpoint")
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help="unmeasured requests per endpoint before timing")
+        parser.add_argument(
+            '--endpoint', action='append', choices=ENDPOINTS,
+            help="benchmark only these endpoints (repeatable)")
+        parser.add_argument(
+            '--with_cache', action='store_true',
+            help="keep the response cache enabled")
+        parser.add_argument(
+            '--render', action='store_true',
+            help="compare ModelSerializer + JSONRenderer with the values() "
+                 "fast path + FastJSONRenderer per page size instead")
+        parser.add_argument(
+            '--page_size', type=int, action='append',
+            help="page sizes for --render (repeatable), "
+                 f"default {', '.join(map(str, RENDER_PAGE_SIZES))}")
+        parser.add_argument(
+            '--url',
+            help="load a running server over HTTP instead, e.g. "
+                 "http://web:8000 (read endpoints only)")
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help="concurrent HTTP clients in --url mode")
+        parser.add_argument(
+            '--label', default='',
+            help="name of the run in the report, e.g. sync or gthread")
+        parser.add_argument(
+            '--output', help="save the JSON report to this file")
+        parser.add_argument(
+            '--compare', help="JSON report of a previous run to compare with")
+        parser.add_argument(
+            '--max_slowdown', type=float,
+            help="fail if p95 of any endpoint grows more than this ratio")
+
+    def handle(self, *args, **options):
+        previous = load(options['compare']) if options['compare'] else None
+
+        if options['render']:
+            report = self.run_in_process(options, self.render_benchmark)
+            self.print_render_report(report)
+            if options['output']:
+                save(report, options['output'])
+            return
+        if options['url']:
+            report = run_http_benchmark(
+                options['url'], concurrency=options['concurrency'],
+                requests=options['requests'], label=options['label'])
+        else:
+            report = self.run_in_process(options, self.endpoints_benchmark)
+        self.print_report(report)
+
+        if options['output']:
+            save(report, options['output'])
+            self.stdout.write(f'report saved to {options["output"]}')
+
+        if previous is not None:
+            self.report_changes(compare(previous, report),
+                                options['max_slowdown'])
+
+    def run_in_process(self, options, benchmark):
+        # как и тесты, пишем в отдельную базу test_<NAME>, рабочую не трогаем
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        report['meta']['label'] = options['label']
+        return report
+
+    @staticmethod
+    def endpoints_benchmark(options):
+        return run_benchmark(
+            titles=options['titles'], users=options['users'],
+            reviews_per_title=options['reviews_per_title'],
+            comments_per_review=options['comments_per_review'],
+            requests=options['requests'], warmup=options['warmup'],
+            with_cache=options['with_cache'], only=options['endpoint'])
+
+    @staticmethod
+    def render_benchmark(options):
+        return run_render_benchmark(
+            page_sizes=options['page_size'] or RENDER_PAGE_SIZES,
+            repeats=options['requests'], titles=options['titles'],
+            users=options['users'],
+            reviews_per_title=options['reviews_per_title'],
+            comments_per_review=options['comments_per_review'])
+
+    def print_render_report(self, report):
+        self.stdout.write(f'{"page":<16}{"rows":>8}{"model ms":>12}'
+                          f'{"fast ms":>12}{"speedup":>10}')
+        for name, result in report['pages'].items():
+            self.stdout.write(
+                f'{name:<16}{result["rows"]:>8}{result["model_ms"]:>12}'
+                f'{result["fast_ms"]:>12}{result["speedup"]:>10}')
+
+    def print_report(self, report):
+        # в памяти процесса видно число SQL-запросов, по сети - ошибки
+        extra = 'errors' if 'url' in report['meta'] else 'queries'
+        self.stdout.write(f'{"endpoint":<16}{"p50 ms":>10}{"p95 ms":>10}'
+                          f'{"p99 ms":>10}{"rps":>10}{extra:>9}')
+        for name, result in report['endpoints'].items():
+            self.stdout.write(
+                f'{name:<16}{result["p50_ms"]:>10}{result["p95_ms"]:>10}'
+                f'{result["p99_ms"]:>10}{result["rps"]:>10}'
+                f'{result[extra]:>9}')
+
+    def report_changes(self, changes, max_slowdown):
+        slower = []
+        for name, change in changes.items():
+            line = (f'{name:<16} p95 x{change["p95_ratio"]}, '
+                    f'rps x{change["rps_ratio"]}')
+            if 'queries_delta' in change:
+                line += f', queries {change["queries_delta"]:+d}'
+            self.stdout.write(line)
+            if max_slowdown and change['p95_ratio'] > max_slowdown:
+                slower.append(name)
+        if slower:
+            raise CommandError(f'p95 вырос больше чем в {max_slowdown} раза: '
+                               f'{", ".join(slower)}')
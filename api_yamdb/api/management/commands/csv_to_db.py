@@ -1,25 +1,53 @@
-import csv
 import logging
+import os
+from contextlib import contextmanager
 from logging.handlers import TimedRotatingFileHandler
 
 from django.apps import apps
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import IntegrityError
 
 from api.management.commands._exceptions import AttrException
+from api.management.commands._loader import (load_csv, load_files,
+                                             read_manifest)
+from reviews.models import Review
+from reviews.rating_utils import rebuild_ratings
 
-file_log = TimedRotatingFileHandler(
-    filename='csv_to_db_log.log', when='midnight', interval=30, backupCount=7)
-stream_log = logging.StreamHandler()
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=(stream_log, file_log),)
 logger = logging.getLogger(__name__)
 
 
+@contextmanager
+def command_logging():
+    """
+    Лог команды в консоль и в файл CSV_TO_DB_LOG_FILE.
+    Обработчики ставятся только на время handle(): импорт команды
+     (manage.py help, тесты) не создаёт файл лога и не меняет логгер.
+    """
+    root = logging.getLogger()
+    level = root.level
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+    handlers = (
+        logging.StreamHandler(),
+        TimedRotatingFileHandler(filename=settings.CSV_TO_DB_LOG_FILE,
+                                 when='midnight', interval=30, backupCount=7))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    try:
+        yield
+    finally:
+        root.setLevel(level)
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+
+
 class Command(BaseCommand):
-    help = 'Creating model objects according the file path specified'
+    help = ('Creating model objects according the file path specified.'
+            ' Several files passed with --load or --dir are loaded in foreign'
+            ' key order, independent tables in parallel with --workers')
 
     def add_arguments(self, parser):
         parser.add_argument('--path', type=str, help="file path")
@@ -27,47 +55,82 @@ class Command(BaseCommand):
         parser.add_argument(
             '--app_name', type=str,
             help="django app name that the model is connected to")
+        parser.add_argument(
+            '--load', type=str, action='append', default=[],
+            metavar='APP_NAME.MODEL_NAME=PATH',
+            help="model and file to load, may be repeated")
+        parser.add_argument(
+            '--dir', type=str,
+            help="directory with csv files and optional manifest.json")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help="processes loading independent tables at the same time")
+        parser.add_argument(
+            '--batch_size', type=int, default=1000,
+            help="rows per bulk insert and transaction")
+        parser.add_argument(
+            '--on_conflict', choices=('ignore', 'fail'), default='ignore',
+            help="skip rows with existing keys or stop on the first one")
+
+    def get_files(self, options):
+        """Модели и пути к файлам из ключей командной строки."""
+        files = {}
+        if options['dir']:
+            files.update(read_manifest(options['dir']))
+        for item in options['load']:
+            label, _, file_path = item.partition('=')
+            if not file_path:
+                raise AttrException(f'нет пути к файлу в --load {item}')
+            files[apps.get_model(label)] = file_path
+        if files:
+            return files
+
+        for key in ('path', 'app_name', 'model_name'):
+            if not options[key]:
+                raise AttrException(f'нет ключа --{key}')
+        _model = apps.get_model(options['app_name'], options['model_name'])
+        return {_model: options['path']}
 
     def handle(self, *args, **options):
-        file_path = None
+        with command_logging():
+            self.load(options)
+
+    def load(self, options):
+        ignore_conflicts = options['on_conflict'] == 'ignore'
 
         try:
-            for key in ('path', 'app_name', 'model_name'):
-                if not options[key]:
-                    raise AttrException(f'нет ключа --{key}')
-
-            file_path = options['path']
-            _model = apps.get_model(options['app_name'], options['model_name'])
-
-            with open(file_path, 'r', encoding='utf-8-sig') as csv_file:
-                reader = csv.reader(csv_file, delimiter=',', quotechar='"')
-                head = next(reader)
-                logger.info(f'пишем в поля - {head} таблицы {_model.__name__}'
-                            f' приложения {options["app_name"]}')
-
-                for row in reader:
-                    _object_dict = {}
-                    for i in range(len(head)):
-                        if head[i] in ('author', 'category',
-                                       'genre', 'review'):
-                            _object_dict[head[i] + '_id'] = int(row[i])
-                        else:
-                            _object_dict[head[i]] = row[i]
-                    _model.objects.get_or_create(**_object_dict)
-                logger.info('файл успешно сохранён в базе данных')
+            files = self.get_files(options)
+            if len(files) == 1:
+                (_model, file_path), = files.items()
+                load_csv(_model, file_path, options['batch_size'],
+                         ignore_conflicts)
+            else:
+                load_files(files, options['batch_size'], ignore_conflicts,
+                           max(options['workers'] or 1, 1))
+            logger.info(f'файлы {list(files.values())} успешно сохранены'
+                        ' в базе данных')
+            if Review in files:
+                rebuild_ratings()
+                logger.info('рейтинг произведений пересчитан')
 
         except FileNotFoundError as err:
-            file_name = "".join(file_path.split('/')[-1])
+            file_name = os.path.basename(err.filename or '')
             logger.error(err)
             logger.debug(f'проверьте наличие файла "{file_name}"'
                          f' в папке static/data')
 
         except LookupError as err:
             logger.error(err)
-            logger.debug(f'в приложении "{options["app_name"]}"'
-                         f' нет модели "{options["model_name"]}"')
+            logger.debug('проверьте имя приложения и модели:'
+                         f' "{options["app_name"]}.{options["model_name"]}"'
+                         f' или {options["load"]} и manifest.json')
 
         except AttrException as err:
             logger.error(f'для работы программы нужны все три ключа: {err}')
             logger.debug('передайте все три ключа "--path", "--app_name",'
-                         ' "--model_name" в параметры')
+                         ' "--model_name" в параметры или ключи --load, --dir')
+
+        except IntegrityError as err:
+            logger.error(err)
+            logger.debug('файлы содержат уже существующие записи,'
+                         ' запустите с --on_conflict ignore')
@@ -0,0 +1,86 @@
+import re
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.management.commands._seed import seed
+from api.v1.custom_filter import TitleFilter
+from reviews.models import GenreTitle, Title
+
+FILTERS = ('category', 'genre', 'year', 'name', 'search')
+# строки плана с полным просмотром таблицы:
+# PostgreSQL - "Seq Scan on table", SQLite - "SCAN table" без индекса
+SEQ_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)(?!.*\bUSING\b.*\bINDEX\b)'),
+}
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN for every combination of title filters, '
+            'reports plans with sequential scans')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help="seed N synthetic titles first, rolled back afterwards")
+        parser.add_argument(
+            '--verbose_plans', action='store_true',
+            help="print every plan, not only sequential scans")
+        parser.add_argument(
+            '--fail_on_seq_scan', action='store_true',
+            help="exit with an error if any plan has a sequential scan")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQ_SCAN:
+            raise CommandError(f'EXPLAIN для {connection.vendor} не разбираем')
+        with transaction.atomic():
+            if options['seed']:
+                counts = seed(titles=options['seed'])
+                self.stdout.write(f'seeded: {counts}')
+                if connection.vendor == 'postgresql':
+                    # свежие строки без статистики планировщик не видит
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')
+            flagged = self.explain_all(options['verbose_plans'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{flagged} combinations with sequential scans')
+        if flagged and options['fail_on_seq_scan']:
+            raise CommandError('есть планы с полным просмотром таблиц')
+
+    def explain_all(self, verbose):
+        values = self.sample_values()
+        pattern = SEQ_SCAN[connection.vendor]
+        flagged = 0
+        for size in range(1, len(FILTERS) + 1):
+            for names in combinations(FILTERS, size):
+                data = {name: values[name] for name in names}
+                queryset = TitleFilter(data, queryset=Title.objects.all()).qs
+                plan = queryset.explain()
+                scans = [line.strip() for line in plan.splitlines()
+                         if pattern.search(line)]
+                if scans:
+                    flagged += 1
+                if scans or verbose:
+                    self.stdout.write(f'{", ".join(names)}: {data}')
+                    self.stdout.write(plan if verbose else '\n'.join(scans))
+        return flagged
+
+    @staticmethod
+    def sample_values():
+        """Значения фильтров из данных базы, чтобы план был правдоподобным."""
+        link = (GenreTitle.objects.select_related('genre', 'title__category')
+                .order_by('id').first())
+        if link is None:
+            raise CommandError(
+                'нет произведений с жанрами, запустите с --seed')
+        title = link.title
+        return {
+            'category': title.category.slug if title.category else '',
+            'genre': link.genre.slug,
+            'year': title.year,
+            'name': title.name.split()[0],
+            'search': title.name.split()[-1],
+        }
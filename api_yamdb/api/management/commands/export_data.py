@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.export_utils import EXPORTS, FORMATS, export_lines
+
+
+def datetime_argument(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = ('Streaming titles, reviews or comments as NDJSON or CSV, '
+            'memory use does not depend on the table size')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=tuple(EXPORTS))
+        parser.add_argument(
+            '--output', choices=FORMATS, default='ndjson',
+            help="output format")
+        parser.add_argument(
+            '--file', default='-',
+            help="file to write, stdout by default")
+        parser.add_argument(
+            '--since', type=datetime_argument,
+            help="pub_date from, ISO 8601, inclusive")
+        parser.add_argument(
+            '--until', type=datetime_argument,
+            help="pub_date to, ISO 8601, exclusive")
+        parser.add_argument(
+            '--title_id', type=int,
+            help="rows of one title only")
+
+    def handle(self, *args, **options):
+        lines = export_lines(
+            options['kind'], options['output'], since=options['since'],
+            until=options['until'], title_id=options['title_id'])
+        if options['file'] == '-':
+            for block in lines:
+                self.stdout.write(block, ending='')
+            return
+        try:
+            with open(options['file'], 'w', encoding='utf-8',
+                      newline='') as export_file:
+                for block in lines:
+                    export_file.write(block)
+        except OSError as error:
+            raise CommandError(error)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from reviews.rating_utils import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Rebuilding stored title ratings from the reviews table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--title_id', type=int, nargs='*',
+            help="title ids to rebuild, all titles if omitted")
+
+    def handle(self, *args, **options):
+        updated = rebuild_ratings(options['title_id'])
+        self.stdout.write(f'rebuilt rating for {updated} titles')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.mail_utils import send_outbox
+
+
+class Command(BaseCommand):
+    help = 'Sending queued emails from the outbox over one SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch_size', type=int, default=100,
+            help="messages claimed and sent per batch")
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="keep draining the outbox instead of exiting when empty")
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="seconds to wait for new messages in --loop mode")
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_outbox(options['batch_size'])
+            if sent:
+                self.stdout.write(f'processed {sent} messages')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
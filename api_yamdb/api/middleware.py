@@ -0,0 +1,256 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer
+
+from api.db_router import allow_replica_reads, reset_routing
+
+logger = logging.getLogger(__name__)
+
+# сколько последних длительностей эндпоинта хранится для процентилей
+SAMPLES_PER_ENDPOINT = 1000
+
+# замеры текущего запроса для обёртки BaseSerializer.data
+_profile = ContextVar('request_profile', default=None)
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {
+    'requests': 0,
+    'queries': 0,
+    'db_ms': 0.0,
+    'view_ms': 0.0,
+    'serialize_ms': 0.0,
+    'render_ms': 0.0,
+    'total_ms': 0.0,
+    'size': 0,
+    'max_ms': 0.0,
+    'samples': deque(maxlen=SAMPLES_PER_ENDPOINT),
+})
+
+
+def _ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+class RequestProfile:
+    """Замеры одного запроса, живут в request.profile."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_finished = None
+        self.render_finished = None
+        self.serialize_ms = 0.0
+        self.serializing = False
+        self.queries: List[Tuple[str, float]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper: время каждого SQL-запроса во всех базах."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, _ms(started)))
+
+    def render_done(self, response):
+        self.render_finished = time.perf_counter()
+
+    def timings(self) -> Dict[str, float]:
+        finished = time.perf_counter()
+        view_finished = self.view_finished or finished
+        view_ms = ((view_finished - self.view_started) * 1000
+                   if self.view_started else 0.0)
+        render_ms = ((self.render_finished - view_finished) * 1000
+                     if self.render_finished else 0.0)
+        return {
+            'db_ms': round(sum(duration for _, duration in self.queries), 3),
+            # сериализация идёт внутри представления, но считается отдельно
+            'view_ms': round(max(view_ms - self.serialize_ms, 0.0), 3),
+            'serialize_ms': round(self.serialize_ms, 3),
+            'render_ms': round(render_ms, 3),
+            'total_ms': round((finished - self.started) * 1000, 3),
+        }
+
+
+def profile_serializers() -> None:
+    """
+    Обернуть BaseSerializer.data: время сборки данных ответа копится
+     в serialize_ms текущего запроса. Serializer.data, ListSerializer.data
+     и ValuesSerializer приходят сюда через super().data, вложенные
+     сериализаторы - через to_representation, поэтому считается только
+     внешний вызов; повторный .data внутри него не считается дважды.
+    """
+    data = BaseSerializer.data
+    if getattr(data.fget, 'profiled', False):
+        return
+
+    def profiled_data(serializer):
+        profile = _profile.get()
+        if profile is None or profile.serializing:
+            return data.fget(serializer)
+        profile.serializing = True
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            profile.serializing = False
+            profile.serialize_ms += _ms(started)
+
+    profiled_data.profiled = True
+    BaseSerializer.data = property(profiled_data)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запросов, включается PROFILING_ENABLED=True.
+    На каждый запрос: число и время SQL-запросов, время представления
+     (вместе с его SQL, без сериализации), время сборки данных ответа
+     сериализаторами (serializer.data, с SQL ленивых связей), время
+     рендеринга ответа в JSON и размер ответа.
+    Замеры уходят в заголовок Server-Timing и в лог api.middleware,
+     запросы дольше PROFILING_SLOW_REQUEST_MS логируются с текстом SQL.
+    Сводка по эндпоинтам копится в памяти процесса: /api/v1/profiling/.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        profile_serializers()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = profile = RequestProfile()
+        token = _profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+
+        self.record(request, response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # ответы DRF рендерятся после этого хука: конец работы представления
+        request.profile.view_finished = time.perf_counter()
+        response.add_post_render_callback(request.profile.render_done)
+        return response
+
+    def record(self, request, response, profile):
+        timings = profile.timings()
+        size = len(response.content) if not response.streaming else 0
+        queries = len(profile.queries)
+        response['Server-Timing'] = (
+            f'db;dur={timings["db_ms"]};desc="{queries} queries",'
+            f' view;dur={timings["view_ms"]},'
+            f' serialize;dur={timings["serialize_ms"]},'
+            f' render;dur={timings["render_ms"]},'
+            f' total;dur={timings["total_ms"]}')
+
+        # эндпоинт - имя маршрута (titles-list), а не путь с id
+        match = request.resolver_match
+        view_name = (match.view_name or match.route) if match else '-'
+        endpoint = f'{request.method} {view_name}'
+        entry = {
+            'endpoint': endpoint,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'queries': queries,
+            'size': size,
+        }
+        entry.update(timings)
+        add_stats(endpoint, entry)
+
+        if timings['total_ms'] >= settings.PROFILING_SLOW_REQUEST_MS:
+            entry['sql'] = [{'sql': sql, 'ms': round(duration, 3)}
+                            for sql, duration in profile.queries]
+            logger.warning(json.dumps(entry, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(entry, ensure_ascii=False))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Безопасные запросы (GET, HEAD, OPTIONS) к вьюсетам api.v1 читают
+     с реплик, см. ReplicaRouter. Без DATABASE_REPLICAS не подключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # реплику запроса сбрасывает request_finished (см. api.apps),
+        # потоковые ответы читают с неё и после выхода из middleware
+        reset_routing()
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if (request.method in SAFE_METHODS and view_class is not None
+                and view_class.__module__.startswith('api.v1.')):
+            allow_replica_reads()
+
+
+def add_stats(endpoint: str, entry: dict) -> None:
+    with _stats_lock:
+        stats = _stats[endpoint]
+        stats['requests'] += 1
+        for name in ('queries', 'db_ms', 'view_ms', 'serialize_ms',
+                     'render_ms', 'total_ms', 'size'):
+            stats[name] += entry[name]
+        stats['max_ms'] = max(stats['max_ms'], entry['total_ms'])
+        stats['samples'].append(entry['total_ms'])
+
+
+def get_stats() -> Dict[str, dict]:
+    """Средние по эндпоинтам и процентили последних запросов."""
+    with _stats_lock:
+        snapshot = {endpoint: dict(stats, samples=sorted(stats['samples']))
+                    for endpoint, stats in _stats.items()}
+    result = {}
+    for endpoint, stats in snapshot.items():
+        count = stats['requests']
+        samples = stats['samples']
+        result[endpoint] = {
+            'requests': count,
+            'avg_queries': round(stats['queries'] / count, 2),
+            'avg_db_ms': round(stats['db_ms'] / count, 3),
+            'avg_view_ms': round(stats['view_ms'] / count, 3),
+            'avg_serialize_ms': round(stats['serialize_ms'] / count, 3),
+            'avg_render_ms': round(stats['render_ms'] / count, 3),
+            'avg_total_ms': round(stats['total_ms'] / count, 3),
+            'avg_size': round(stats['size'] / count),
+            'max_ms': stats['max_ms'],
+            'p50_ms': _percentile(samples, 50),
+            'p95_ms': _percentile(samples, 95),
+            'p99_ms': _percentile(samples, 99),
+        }
+    return result
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _percentile(values: List[float], percent: int) -> float:
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
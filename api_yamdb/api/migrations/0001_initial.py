@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='тема письма')),
+                ('body', models.TextField(verbose_name='текст письма')),
+                ('to_email', models.EmailField(max_length=254, verbose_name='получатель')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='дата постановки в очередь')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='количество попыток отправки')),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='время следующей попытки')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='дата отправки')),
+                ('last_error', models.TextField(blank=True, verbose_name='ошибка последней попытки')),
+            ],
+            options={
+                'verbose_name_plural': 'очередь писем',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(fields=['sent', 'next_attempt'], name='outbox-pending'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import models
+from django.utils import timezone
+
+
+class EmailOutbox(models.Model):
+    """
+    Очередь писем: регистрация кладёт письмо сюда и сразу отвечает,
+     отправляет их команда send_outbox.
+    поля - id, subject, body, to_email, created, attempts, next_attempt,
+     sent, last_error
+    """
+    subject = models.CharField(max_length=255, verbose_name='тема письма')
+    body = models.TextField(verbose_name='текст письма')
+    to_email = models.EmailField(verbose_name='получатель')
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name='дата постановки в очередь')
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='количество попыток отправки')
+    next_attempt = models.DateTimeField(
+        default=timezone.now, verbose_name='время следующей попытки')
+    sent = models.DateTimeField(
+        null=True, blank=True, verbose_name='дата отправки')
+    last_error = models.TextField(
+        blank=True, verbose_name='ошибка последней попытки')
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name_plural = 'очередь писем'
+        indexes = (models.Index(fields=('sent', 'next_attempt'),
+                                name='outbox-pending'),)
+
+    def __str__(self):
+        return f'{self.to_email}: {self.subject}'
@@ -0,0 +1,132 @@
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from users.models import ADMIN, MODERATOR, USER
+
+User = get_user_model()
+
+ROLE_KEY = 'users:role:{user_id}'
+# поля пользователя, нужные правам доступа, они же claims токена
+ROLE_FIELDS = ('username', 'role', 'is_staff', 'is_superuser', 'is_active')
+
+
+def access_token_for(user) -> AccessToken:
+    """Токен доступа с ролью пользователя: права проверяются без базы."""
+    token = RefreshToken.for_user(user).access_token
+    for field in ROLE_FIELDS:
+        token[field] = getattr(user, field)
+    return token
+
+
+def cache_role(user) -> None:
+    """
+    Новая роль в кэш после коммита: запросы со старым токеном
+     берут её отсюда, а не из claims токена.
+    """
+    role = {field: getattr(user, field) for field in ROLE_FIELDS}
+    transaction.on_commit(lambda: cache.set(
+        ROLE_KEY.format(user_id=user.pk), role,
+        settings.ROLE_CACHE_TIMEOUT))
+
+
+def forget_user(user_id: int) -> None:
+    """Удалённый пользователь: его токены перестают работать."""
+    transaction.on_commit(lambda: cache.set(
+        ROLE_KEY.format(user_id=user_id), {'is_active': False},
+        settings.ROLE_CACHE_TIMEOUT))
+
+
+class RoleTokenUser(TokenUser):
+    """
+    Пользователь из токена и роли: id, username, role и флаги.
+    Для записи (автор отзыва, профиль) нужна модель - загружаем по id.
+    """
+
+    def __init__(self, token, role: dict):
+        super().__init__(token)
+        self.role_data = role
+
+    @cached_property
+    def username(self):
+        return self.role_data.get('username', '')
+
+    @cached_property
+    def role(self):
+        return self.role_data.get('role', USER)
+
+    @cached_property
+    def is_staff(self):
+        return self.role_data.get('is_staff', False)
+
+    @cached_property
+    def is_superuser(self):
+        return self.role_data.get('is_superuser', False)
+
+    @property
+    def is_user(self):
+        return self.role == USER
+
+    @property
+    def is_admin(self):
+        return self.role == ADMIN or self.is_superuser
+
+    @property
+    def is_moderator(self):
+        return self.role == MODERATOR
+
+
+class RoleJWTAuthentication(JWTAuthentication):
+    """
+    JWT без запроса к users_user: роль берётся из кэша ROLE_KEY,
+     а если его нет - из claims токена, выпущенного не раньше
+     ROLE_CACHE_TIMEOUT секунд назад. Иначе (старый токен или токен
+     без роли) роль читается из базы и кэшируется на ROLE_CACHE_TIMEOUT.
+    Смена роли через UsersViewSet сразу пишет новую роль в кэш и действует
+     во всех воркерах: кэш в памяти процесса settings допускают только
+     с одним воркером gunicorn, см. PROCESS_LOCAL_CACHES. Изменения из
+     других процессов (manage.py shell) с таким кэшем действуют не позже
+     чем через ROLE_CACHE_TIMEOUT.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = ROLE_KEY.format(user_id=user_id)
+        role = cache.get(key)
+        if role is None:
+            role = self.role_from_token(validated_token)
+        if role is None:
+            role = self.role_from_db(user_id)
+            cache.set(key, role, settings.ROLE_CACHE_TIMEOUT)
+
+        if not role.get('is_active'):
+            raise AuthenticationFailed('Пользователь не найден или неактивен',
+                                       code='user_inactive')
+        return RoleTokenUser(validated_token, role)
+
+    @staticmethod
+    def role_from_token(token) -> Optional[dict]:
+        issued = token.get('iat')
+        if (issued is None or any(field not in token
+                                  for field in ROLE_FIELDS)
+                or time.time() - issued > settings.ROLE_CACHE_TIMEOUT):
+            return None
+        return {field: token[field] for field in ROLE_FIELDS}
+
+    @staticmethod
+    def role_from_db(user_id) -> dict:
+        role = User.objects.filter(pk=user_id).values(*ROLE_FIELDS).first()
+        return role or {'is_active': False}
@@ -0,0 +1,203 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from api.v1.cache import invalidate
+from api.v1.serializer import (SlugNameBulkSerializer, TitleBulkSerializer,
+                               TitlesWriteSerializer)
+from reviews.models import Category, Genre, GenreTitle, Title
+
+
+class BulkWriteMixin:
+    """
+    POST /<ресурс>/bulk/ - создание списка объектов,
+    PATCH /<ресурс>/bulk/ - изменение списка объектов.
+    Всё или ничего: при ошибке хотя бы в одном элементе ничего не пишется,
+     в ответе 400 список ошибок по элементам ({} у корректных).
+    Права - как у записи во вьюсет.
+    """
+    bulk_serializer_class = None
+
+    @action(methods=('POST', 'PATCH'), detail=False, url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError(
+                {'non_field_errors': ['Ожидается непустой список объектов']})
+        if len(items) > settings.API_BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f'Не больше {settings.API_BULK_MAX_ITEMS} объектов за запрос'
+            ]})
+
+        partial = request.method == 'PATCH'
+        with transaction.atomic():
+            context = self.get_bulk_context(items, partial)
+            serializer = self.bulk_serializer_class(
+                data=items, many=True, partial=partial, context=context)
+            if not serializer.is_valid():
+                return Response(serializer.errors,
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                if partial:
+                    data = self.bulk_update_items(
+                        serializer.validated_data, context)
+                else:
+                    data = self.bulk_create_items(
+                        serializer.validated_data, context)
+            except IntegrityError:
+                # параллельная запись успела занять slug или name
+                raise ValidationError({'non_field_errors': [
+                    'Данные изменились во время записи, повторите запрос']})
+            # bulk_create и bulk_update не шлют сигналов модели
+            invalidate(self.cache_namespace)
+
+        return Response(data, status=status.HTTP_200_OK if partial
+                        else status.HTTP_201_CREATED)
+
+    @property
+    def bulk_lookup_field(self):
+        """Поле элемента, по которому PATCH находит объект."""
+        if self.lookup_field == 'pk':
+            return self.get_queryset().model._meta.pk.name
+        return self.lookup_field
+
+    def get_bulk_context(self, items, partial):
+        """
+        Всё, на что ссылаются элементы, одним запросом на таблицу.
+        По умолчанию для PATCH - existing, изменяемые объекты
+         по bulk_lookup_field; bulk_serializer_class проверяет по нему,
+         что объект есть.
+        """
+        if not partial:
+            return {}
+        lookup = self.bulk_lookup_field
+        keys = [item.get(lookup) for item in items if isinstance(item, dict)]
+        return {'existing': self.get_queryset().model.objects.in_bulk(
+            keys, field_name=lookup)}
+
+    def bulk_create_items(self, validated_data, context):
+        model = self.get_queryset().model
+        objects = model.objects.bulk_create(
+            model(**item) for item in validated_data)
+        return self.get_serializer(objects, many=True).data
+
+    def bulk_update_items(self, validated_data, context):
+        lookup = self.bulk_lookup_field
+        objects, fields = [], set()
+        for item in validated_data:
+            obj = context['existing'][item[lookup]]
+            for field, value in item.items():
+                if field != lookup:
+                    setattr(obj, field, value)
+                    fields.add(field)
+            objects.append(obj)
+        if fields:
+            self.get_queryset().model.objects.bulk_update(objects, fields)
+        return self.get_serializer(objects, many=True).data
+
+
+def payload_values(items, field):
+    """Строковые значения поля из сырых элементов, до валидации."""
+    return [item.get(field) for item in items
+            if isinstance(item, dict) and isinstance(item.get(field), str)]
+
+
+class SlugNameBulkMixin(BulkWriteMixin):
+    """Пакетная запись справочников со slug и name (жанры, категории)."""
+    bulk_serializer_class = SlugNameBulkSerializer
+
+    def get_bulk_context(self, items, partial):
+        model = self.get_queryset().model
+        slugs = payload_values(items, 'slug')
+        names = payload_values(items, 'name')
+        return {
+            'existing': model.objects.filter(slug__in=slugs).in_bulk(
+                field_name='slug'),
+            'names': dict(model.objects.filter(name__in=names).values_list(
+                'name', 'slug')),
+            'payload_slugs': Counter(slugs),
+            'payload_names': Counter(names),
+        }
+
+
+class TitleBulkMixin(BulkWriteMixin):
+    """
+    Пакетная запись произведений: slug всех категорий и жанров
+     разрешаются одним запросом на таблицу, произведения и связи
+     GenreTitle пишутся bulk_create в одной транзакции.
+    """
+    bulk_serializer_class = TitleBulkSerializer
+
+    def get_bulk_context(self, items, partial):
+        genre_slugs = {slug for item in items if isinstance(item, dict)
+                       and isinstance(item.get('genre'), list)
+                       for slug in item['genre'] if isinstance(slug, str)}
+        context = {
+            'categories': Category.objects.filter(
+                slug__in=payload_values(items, 'category')).in_bulk(
+                field_name='slug'),
+            'genres': Genre.objects.filter(slug__in=genre_slugs).in_bulk(
+                field_name='slug'),
+            'titles': {},
+        }
+        if partial:
+            ids = [item.get('id') for item in items if isinstance(item, dict)
+                   and isinstance(item.get('id'), int)]
+            context['payload_ids'] = Counter(ids)
+            context['titles'] = (Title.objects.defer('search_vector')
+                                 .select_for_update().in_bulk(ids))
+        return context
+
+    def bulk_create_items(self, validated_data, context):
+        titles = [Title(**{field: value for field, value in item.items()
+                           if field not in ('id', 'genre')})
+                  for item in validated_data]
+        if connection.features.can_return_ids_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+        else:
+            # SQLite не возвращает id из bulk_create, а они нужны связям
+            for title in titles:
+                title.save()
+        self.replace_genres(titles, validated_data)
+        return self.titles_data(title.pk for title in titles)
+
+    def bulk_update_items(self, validated_data, context):
+        titles = context['titles']
+        fields = {field for item in validated_data for field in item
+                  if field not in ('id', 'genre')}
+        changed = []
+        for item in validated_data:
+            title = titles[item['id']]
+            for field, value in item.items():
+                if field not in ('id', 'genre'):
+                    setattr(title, field, value)
+            changed.append(title)
+        if fields:
+            Title.objects.bulk_update(changed, fields)
+        with_genres = [item for item in validated_data if 'genre' in item]
+        GenreTitle.objects.filter(
+            title_id__in=[item['id'] for item in with_genres]).delete()
+        self.replace_genres([titles[item['id']] for item in with_genres],
+                            with_genres)
+        return self.titles_data(item['id'] for item in validated_data)
+
+    @staticmethod
+    def replace_genres(titles, validated_data):
+        # копия рейтинга для рейтингов жанров, см. sync_genre_ratings
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre, rating=title.rating,
+                       rating_count=title.rating_count)
+            for title, item in zip(titles, validated_data)
+            for genre in dict.fromkeys(item['genre']))
+
+    @staticmethod
+    def titles_data(ids):
+        titles = (Title.objects.defer('search_vector').filter(pk__in=ids)
+                  .select_related('category').prefetch_related('genre')
+                  .order_by('id'))
+        return TitlesWriteSerializer(titles, many=True).data
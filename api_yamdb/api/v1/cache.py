@@ -0,0 +1,96 @@
+import hashlib
+import time
+from typing import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = 'api:v1:generation:{namespace}'
+RESPONSE_KEY = 'api:v1:response:{namespace}:{generation}:{path}'
+
+# поколения отзывов одного произведения и комментариев одного отзыва,
+# по ним строятся ETag и Last-Modified, см. ConditionalGetMixin
+REVIEWS_NAMESPACE = 'reviews:{title_id}'
+COMMENTS_NAMESPACE = 'comments:{review_id}'
+# любая запись в комментарии: от неё зависят счётчики в списке произведений
+ALL_COMMENTS_NAMESPACE = 'comments'
+
+# какие закэшированные ответы устаревают после записи в ресурс:
+# категории и жанры выводятся внутри произведений
+DEPENDENT_NAMESPACES = {
+    'categories': ('categories', 'titles'),
+    'genres': ('genres', 'titles'),
+    'titles': ('titles',),
+}
+
+
+def _now() -> int:
+    return time.time_ns() // 1000
+
+
+def is_shared() -> bool:
+    """
+    Кэш общий для всех процессов (redis): запись в любом процессе
+     сдвигает поколение для всех.
+    В кэше в памяти процесса запись из другого процесса поколение
+     не сдвигает, и без таймаута оно устаревает навсегда.
+    """
+    return (settings.CACHES['default']['BACKEND']
+            not in settings.PROCESS_LOCAL_CACHES)
+
+
+def get_generation(namespace: str) -> int:
+    """
+    Текущее поколение пространства имён кэша.
+    Поколение - метка времени последней записи в микросекундах,
+     при первом обращении берётся текущее время.
+    """
+    key = GENERATION_KEY.format(namespace=namespace)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _now(), timeout=None)
+        generation = cache.get(key)
+    if generation is None:
+        # кэш ничего не хранит (DummyCache): каждое чтение - новое поколение
+        generation = _now()
+    return generation
+
+
+def bump_generation(namespace: str) -> None:
+    """
+    Сдвиг поколения: старые ключи ответов больше не читаются
+     и вытесняются из кэша по таймауту.
+    """
+    for dependent in DEPENDENT_NAMESPACES.get(namespace, (namespace,)):
+        key = GENERATION_KEY.format(namespace=dependent)
+        generation = max(_now(), (cache.get(key) or 0) + 1)
+        cache.set(key, generation, timeout=None)
+
+
+def invalidate(namespace: str) -> None:
+    """
+    Сдвиг поколения после коммита текущей транзакции, иначе параллельный
+     запрос успеет закэшировать старые данные под новым поколением.
+    """
+    transaction.on_commit(lambda: bump_generation(namespace))
+
+
+def replica_may_lag(generations: Sequence[int]) -> bool:
+    """
+    Последняя запись в пространства имён была меньше DATABASE_REPLICA_LAG
+     секунд назад: реплика может ещё не получить её.
+    """
+    return _now() - max(generations) < settings.DATABASE_REPLICA_LAG * 10 ** 6
+
+
+def response_key(namespace: str, full_path: str,
+                 generations: Sequence[int]) -> str:
+    """
+    Ключ ответа: поколения namespace и пространств, от которых ответ
+     тоже зависит, - запись в любое из них его сбрасывает.
+    """
+    path = hashlib.md5(full_path.encode()).hexdigest()
+    generation = '.'.join(map(str, generations))
+    return RESPONSE_KEY.format(namespace=namespace, generation=generation,
+                               path=path)
@@ -0,0 +1,118 @@
+import heapq
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from api.v1.serializer import CommentSerializer, ReviewSerializer
+from reviews.models import Comment, Review, Tombstone
+
+# позиция в ленте: время изменения, порядок источника, id строки
+Position = Tuple[datetime, int, int]
+
+# источники ленты в порядке при равном времени изменения
+REVIEWS, COMMENTS, TOMBSTONES = range(3)
+
+
+def encode_cursor(position: Position) -> str:
+    changed, source, pk = position
+    value = f'{changed.isoformat()}|{source}|{pk}'
+    return urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Optional[Position]:
+    if not cursor:
+        return None
+    try:
+        changed, source, pk = urlsafe_b64decode(cursor).decode().split('|')
+        changed = parse_datetime(changed)
+        source, pk = int(source), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        changed = None
+    if changed is None:
+        raise ValidationError({'cursor': ['Неверный курсор']})
+    return changed, source, pk
+
+
+def after(queryset, field: str, source: int,
+          position: Optional[Position]):
+    """
+    Строки источника строго после позиции в порядке (время, источник, id):
+     диапазон индекса (field, id) без OFFSET.
+    """
+    if position is None:
+        return queryset
+    changed, position_source, pk = position
+    if source > position_source:
+        return queryset.filter(**{f'{field}__gte': changed})
+    if source < position_source:
+        return queryset.filter(**{f'{field}__gt': changed})
+    return queryset.filter(Q(**{f'{field}__gt': changed})
+                           | Q(**{field: changed, 'id__gt': pk}))
+
+
+def sources(title_id: Optional[int]):
+    reviews = Review.objects.select_related('author')
+    comments = Comment.objects.select_related('author').annotate(
+        title_id=F('review__title_id'))
+    tombstones = Tombstone.objects.all()
+    if title_id is not None:
+        reviews = reviews.filter(title_id=title_id)
+        comments = comments.filter(review__title_id=title_id)
+        tombstones = tombstones.filter(title_id=title_id)
+    return (
+        (REVIEWS, reviews, 'updated_at', review_change),
+        (COMMENTS, comments, 'updated_at', comment_change),
+        (TOMBSTONES, tombstones, 'deleted_at', tombstone_change),
+    )
+
+
+def review_change(review: Review) -> dict:
+    return {'type': 'review', 'action': 'upsert', 'id': review.id,
+            'title_id': review.title_id, 'review_id': None,
+            'data': ReviewSerializer(review).data}
+
+
+def comment_change(comment: Comment) -> dict:
+    return {'type': 'comment', 'action': 'upsert', 'id': comment.id,
+            'title_id': comment.title_id, 'review_id': comment.review_id,
+            'data': CommentSerializer(comment).data}
+
+
+def tombstone_change(tombstone: Tombstone) -> dict:
+    return {'type': tombstone.kind, 'action': 'delete',
+            'id': tombstone.object_id, 'title_id': tombstone.title_id,
+            'review_id': tombstone.review_id, 'data': None}
+
+
+def changes_since(position: Optional[Position], limit: int,
+                  title_id: Optional[int] = None
+                  ) -> Tuple[List[dict], Optional[Position], bool]:
+    """
+    Изменения отзывов и комментариев после позиции, не больше limit:
+     созданные и изменённые по updated_at, удалённые по Tombstone.
+    Каждый источник читает не больше limit + 1 строк по своему индексу,
+     строки сливаются в общий порядок (время, источник, id).
+    Последние CHANGES_SAFETY_LAG секунд не отдаются: транзакция,
+     начатая раньше, могла ещё не закоммитить строку с более ранним
+     временем, и клиент, ушедший дальше по курсору, её бы пропустил.
+    Возвращает изменения, позицию последнего и есть ли ещё.
+    """
+    horizon = timezone.now() - timedelta(seconds=settings.CHANGES_SAFETY_LAG)
+    streams = []
+    for source, queryset, field, to_change in sources(title_id):
+        rows = after(queryset, field, source, position).filter(
+            **{f'{field}__lt': horizon}).order_by(field, 'id')[:limit + 1]
+        streams.append([((getattr(row, field), source, row.id), to_change, row)
+                        for row in rows])
+    merged = list(heapq.merge(*streams, key=lambda item: item[0]))
+    page = merged[:limit]
+    last = page[-1][0] if page else position
+    changes = [dict(to_change(row), changed_at=key[0])
+               for key, to_change, row in page]
+    return changes, last, len(merged) > limit
@@ -1,6 +1,8 @@
+from django.db.models import F
 from django_filters import rest_framework as filters
 
-from reviews.models import Title
+from reviews.models import GenreTitle, Title
+from reviews.search_utils import search_titles
 
 
 class TitleFilter(filters.FilterSet):
@@ -10,13 +12,41 @@ class TitleFilter(filters.FilterSet):
     .../api/v1/titles/?genre= (slug жанра)
     .../api/v1/titles/?name= (название, или его часть)
     .../api/v1/titles/?year= (год выпуска произведения)
+    .../api/v1/titles/?search= (полнотекстовый поиск по названию и описанию,
+     результаты по убыванию релевантности)
+    .../api/v1/titles/?ordering= (rating, year, name, с минусом - по убыванию;
+     произведения без оценок в конце)
     """
     name = filters.CharFilter(
         field_name='name', lookup_expr='icontains')
     year = filters.NumberFilter(field_name='year')
     category = filters.CharFilter(field_name='category__slug')
-    genre = filters.CharFilter(field_name='genre__slug')
+    genre = filters.CharFilter(method='filter_genre')
+    search = filters.CharFilter(method='filter_search')
+    # последним: порядок из ordering заменяет порядок поиска
+    ordering = filters.ChoiceFilter(
+        method='filter_ordering',
+        choices=[(f'{direction}{field}',) * 2
+                 for field in ('rating', 'year', 'name')
+                 for direction in ('', '-')])
 
     class Meta:
         model = Title
-        fields = ('name', 'genre', 'category', 'year',)
+        fields = ('name', 'genre', 'category', 'year', 'search', 'ordering',)
+
+    def filter_genre(self, queryset, name, value):
+        """
+        Полусоединение через индекс GenreTitle(genre, title) вместо JOIN:
+         произведение не дублируется в выдаче.
+        """
+        return queryset.filter(id__in=GenreTitle.objects.filter(
+            genre__slug=value).values('title_id'))
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        field = F(value.lstrip('-'))
+        order = (field.desc(nulls_last=True) if value.startswith('-')
+                 else field.asc(nulls_last=True))
+        return queryset.order_by(order, 'id')
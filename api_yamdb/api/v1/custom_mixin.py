@@ -1,9 +1,198 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.functional import cached_property
+from django.utils.http import http_date
 from rest_framework import mixins
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from api.db_router import read_from_primary
+from api.v1.cache import (get_generation, is_shared, replica_may_lag,
+                          response_key)
+from api.v1.serializer import ValuesSerializer
+
 
 class CreateListDestroyViewSet(mixins.CreateModelMixin,
                                mixins.DestroyModelMixin,
                                mixins.ListModelMixin,
                                GenericViewSet):
     """Вьюсет для категорий и жанров."""
+
+
+class FieldsQueryMixin:
+    """
+    ?fields=id,name - ответ на чтение только с этими полями.
+    Столбцы остальных полей не читаются из базы (only(), в списках
+     с ValuesListMixin - values()), связи для них не загружаются:
+     вьюсет спрашивает requested() перед select_related
+     и prefetch_related. Неизвестное поле - 400.
+    """
+    fields_query_param = 'fields'
+
+    @cached_property
+    def sparse_fields(self):
+        value = self.request.query_params.get(self.fields_query_param)
+        if not value or self.request.method not in SAFE_METHODS:
+            return None
+        names = tuple(dict.fromkeys(name for name in value.split(',')
+                                    if name))
+        available = self.get_available_fields()
+        unknown = set(names) - set(available)
+        if unknown:
+            raise ValidationError({self.fields_query_param: [
+                f'Неизвестные поля: {", ".join(sorted(unknown))}, '
+                f'доступны: {", ".join(available)}']})
+        return names or None
+
+    def get_available_fields(self):
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, ValuesSerializer):
+            return tuple(serializer_class.columns)
+        return tuple(serializer_class().fields)
+
+    def requested(self, name):
+        """Нужно ли поле name в ответе."""
+        return self.sparse_fields is None or name in self.sparse_fields
+
+    def get_sparse_columns(self, fields):
+        """Поля модели для only() под поля ответа fields."""
+        return fields
+
+    def sparse_queryset(self, queryset):
+        if self.sparse_fields is None:
+            return queryset
+        return queryset.only(*self.get_sparse_columns(self.sparse_fields))
+
+    def filter_queryset(self, queryset):
+        return self.sparse_queryset(super().filter_queryset(queryset))
+
+    def get_serializer_context(self):
+        return dict(super().get_serializer_context(),
+                    fields=self.sparse_fields)
+
+
+class ValuesListMixin(FieldsQueryMixin):
+    """
+    Быстрый путь list: страница читается через queryset.values() только
+     с нужными полями и сериализуется values_serializer_class
+     (см. api.v1.serializer.ValuesSerializer) без экземпляров моделей
+     и полей ModelSerializer. Ответ тот же, что у serializer_class.
+    Остальные действия работают с моделями как обычно.
+    """
+    values_serializer_class = None
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return self.values_serializer_class
+        return super().get_serializer_class()
+
+    def get_sparse_columns(self, fields):
+        return self.values_serializer_class.values(fields)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            # связи values_serializer_class догружает сам в prepare
+            return queryset.prefetch_related(None).values(
+                *self.values_serializer_class.values(self.sparse_fields))
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.action == 'list':
+            self.values_serializer_class.prepare(page, self.sparse_fields)
+        return page
+
+
+class ConditionalGetMixin:
+    """
+    Слабый ETag и Last-Modified для list и retrieve из поколений кэша
+     (см. api.v1.cache): поколение - время последней записи в ресурс,
+     его чтение не трогает базу.
+    Совпавшие If-None-Match или If-Modified-Since получают 304
+     до запроса к базе и сериализации.
+    Last-Modified точен до секунды, поэтому клиентам лучше If-None-Match.
+    В первые DATABASE_REPLICA_LAG секунд после записи ответ читается
+     из default: отстающая реплика отдала бы старые данные с новым ETag.
+    Только при общем кэше: в кэше в памяти процесса запись из другого
+     процесса не меняет поколение, и 304 отдавался бы вечно.
+    """
+
+    def get_version_namespaces(self):
+        """Пространства имён, запись в которые меняет ответ."""
+        return (self.cache_namespace,)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if not is_shared():
+            return handler(request, *args, **kwargs)
+        # поколения читаем до ответа: запись во время ответа даст новый ETag
+        generations = [get_generation(namespace)
+                       for namespace in self.get_version_namespaces()]
+        etag = 'W/"{}"'.format('.'.join(map(str, generations)))
+        last_modified = math.ceil(max(generations) / 10 ** 6)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            if replica_may_lag(generations):
+                # ETag нового поколения не должен достаться данным
+                # отстающей реплики
+                read_from_primary()
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class CachedReadMixin:
+    """
+    Кэш ответов list и retrieve для публичных справочников.
+    Ключ - пространство имён, его поколение и полный путь с query string
+     (фильтры, страница, поиск). Запись в модель - из API, из админки,
+     каскадом - сдвигает поколение вместо удаления ключей,
+     см. reviews.signals.
+    Ответ, который ляжет под поколение моложе DATABASE_REPLICA_LAG,
+     читается из default, а не с реплики.
+    """
+    cache_namespace = None
+
+    def get_cache_dependencies(self):
+        """Другие пространства имён, от которых зависит ответ."""
+        return ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        generations = [get_generation(namespace) for namespace in (
+            self.cache_namespace, *self.get_cache_dependencies())]
+        key = response_key(self.cache_namespace, request.get_full_path(),
+                           generations)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        if replica_may_lag(generations):
+            # ответ ляжет в кэш под новым поколением: читаем из default
+            read_from_primary()
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
@@ -10,6 +10,18 @@ def validate_username(value):
         )
 
 
+# slug, занятые маршрутами вьюсетов категорий и жанров: /categories/bulk/
+RESERVED_SLUGS = ('bulk',)
+
+
+def validate_slug_not_reserved(value):
+    if value in RESERVED_SLUGS:
+        raise ValidationError(
+            f'Slug <{value}> занят адресом API.',
+            params={'value': value},
+        )
+
+
 def validate_year(year):
     if year > timezone.now().year:
         raise ValidationError(
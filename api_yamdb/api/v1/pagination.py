@@ -0,0 +1,96 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PageSizePagination(PageNumberPagination):
+    """
+    Страницы по номеру, размер страницы клиент задаёт ?page_size=,
+     но не больше API_MAX_PAGE_SIZE.
+    """
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
+
+
+class KeysetPagination(PageSizePagination):
+    """
+    Обычная выдача по номеру страницы, а с параметром cursor - по ключу
+     (pub_date, id): без COUNT(*) и OFFSET, каждая страница читается
+     диапазоном составного индекса.
+    .../reviews/?cursor= (первая страница)
+    .../reviews/?cursor=<значение из next> (следующая страница)
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+
+        queryset = queryset.order_by('pub_date', 'id')
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(pub_date__gte=pub_date).exclude(
+                pub_date=pub_date, id__lte=pk)
+
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        self.page_items = page[:page_size]
+        return self.page_items
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page_items[-1]
+        # страница - модели или строки values(), см. ValuesListMixin
+        if isinstance(last, dict):
+            pub_date, pk = last['pub_date'], last['id']
+        else:
+            pub_date, pk = last.pub_date, last.id
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(pub_date, pk))
+
+    @staticmethod
+    def encode_cursor(pub_date, pk):
+        position = f'{pub_date.isoformat()}|{pk}'
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(cursor).decode().split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
@@ -30,6 +30,6 @@ class AdminModeratorAuthorPermission(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (request.method in permissions.SAFE_METHODS
                 or request.user.is_authenticated
-                and (obj.author == request.user
+                and (obj.author_id == request.user.id
                      or request.user.is_moderator
                      or request.user.is_admin))
@@ -0,0 +1,41 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson: те же байты ответа, что у JSONRenderer DRF
+     с настройками по умолчанию (UNICODE_JSON, COMPACT_JSON),
+     но кодирование в несколько раз быстрее.
+    Даты и время orjson отдаёт в default кодировщика DRF: формат
+     дат не меняется.
+    Без orjson, с ?indent= (в том числе в Browsable API), с другими
+     настройками JSON или на данных, которые orjson не кодирует
+     (например, целые больше 64 бит), работает обычный JSONRenderer.
+    """
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+               if orjson is not None else 0)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not self.use_orjson(data, accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # как и JSONRenderer, экранируем U+2028 и U+2029 для JavaScript
+        return (ret.replace('\u2028'.encode(), b'\\u2028')
+                .replace('\u2029'.encode(), b'\\u2029'))
+
+    def use_orjson(self, data, accepted_media_type, renderer_context):
+        if orjson is None or data is None:
+            return False
+        if self.ensure_ascii or not self.compact:
+            return False
+        return self.get_indent(accepted_media_type,
+                               renderer_context or {}) is None
@@ -1,12 +1,43 @@
+from collections import OrderedDict, defaultdict
+from operator import itemgetter
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.validators import UniqueValidator
+
+from api.export_utils import FORMATS
+from api.v1.custom_validators import validate_slug_not_reserved, validate_year
 from reviews.models import Category, Comment, Genre, Review, Title
 
 User = get_user_model()
 
+# даты в быстрых сериализаторах форматируются тем же полем DRF
+DATETIME_FIELD = serializers.DateTimeField()
+
+
+class SparseFieldsMixin:
+    """
+    Ответ только с полями ?fields= из context['fields'], остальные поля
+     не создаются и не сериализуются. Вложенные сериализаторы
+     отдаются целиком.
+    """
 
-class ReviewSerializer(serializers.ModelSerializer):
+    def get_fields(self):
+        fields = super().get_fields()
+        names = self.context.get('fields')
+        top = (self.parent if isinstance(self.parent,
+                                         serializers.ListSerializer)
+               else self)
+        if names is None or top.parent is not None:
+            return fields
+        return OrderedDict((name, field) for name, field in fields.items()
+                           if name in names)
+
+
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username')
 
@@ -14,17 +45,8 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ('id', 'author', 'text', 'score', 'pub_date')
 
-    def validate(self, data):
-        request = self.context['request']
-        author = request.user
-        title_id = self.context.get('view').kwargs.get('title_id')
-        if (request.method == 'POST' and Review.objects.filter(
-                title_id=title_id, author=author).exists()):
-            raise ValidationError('есть уже твоё мнение, угомонись')
-        return data
-
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username')
 
@@ -33,19 +55,19 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'author', 'text', 'pub_date')
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ('name', 'slug')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ('name', 'slug')
 
 
-class TitlesReadSerializer(serializers.ModelSerializer):
+class TitlesReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
     description = serializers.CharField(allow_blank=True, required=False)
@@ -57,6 +79,124 @@ class TitlesReadSerializer(serializers.ModelSerializer):
                   'genre', 'category')
 
 
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Быстрый путь списков только для чтения: строки values() сразу
+     превращаются в словари ответа, без полей ModelSerializer.
+    Ответ совпадает с ответом обычного сериализатора ресурса байт в байт,
+     это проверяют тесты.
+    columns - поле ответа: поля values(), из которых оно собирается,
+     и функция строки, которая его строит; порядок - порядок ответа.
+    required - поля values(), нужные всегда (пагинации, prepare).
+    context['fields'] - поля ?fields=, остальные не читаются из базы
+     и не попадают в ответ.
+    """
+    columns = {}
+    required = ('id',)
+
+    @classmethod
+    def values(cls, fields=None):
+        """Поля для queryset.values() под поля ответа fields."""
+        names = cls.columns if fields is None else fields
+        return tuple(dict.fromkeys((*cls.required, *(
+            column for name in cls.columns if name in names
+            for column in cls.columns[name][0]))))
+
+    @classmethod
+    def prepare(cls, rows, fields=None):
+        """Дополнить строки страницы перед сериализацией."""
+
+    @cached_property
+    def getters(self):
+        fields = self.context.get('fields')
+        return tuple((name, getter)
+                     for name, (_, getter) in self.columns.items()
+                     if fields is None or name in fields)
+
+    def to_representation(self, row):
+        return {name: getter(row) for name, getter in self.getters}
+
+
+def datetime_getter(column):
+    def getter(row):
+        return DATETIME_FIELD.to_representation(row[column])
+    return getter
+
+
+class ReviewValuesSerializer(ValuesSerializer):
+    """Список отзывов в формате ReviewSerializer."""
+    columns = {
+        'id': (('id',), itemgetter('id')),
+        'author': (('author__username',), itemgetter('author__username')),
+        'text': (('text',), itemgetter('text')),
+        'score': (('score',), itemgetter('score')),
+        'pub_date': (('pub_date',), datetime_getter('pub_date')),
+    }
+    # ключ KeysetPagination
+    required = ('id', 'pub_date')
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """Список комментариев в формате CommentSerializer."""
+    columns = {
+        'id': (('id',), itemgetter('id')),
+        'author': (('author__username',), itemgetter('author__username')),
+        'text': (('text',), itemgetter('text')),
+        'pub_date': (('pub_date',), datetime_getter('pub_date')),
+    }
+    required = ('id', 'pub_date')
+
+
+def title_rating(row):
+    # rating - IntegerField в TitlesReadSerializer: дробная часть
+    # отбрасывается так же
+    rating = row['rating']
+    return None if rating is None else int(rating)
+
+
+def title_category(row):
+    if row['category__slug'] is None:
+        return None
+    return {'name': row['category__name'], 'slug': row['category__slug']}
+
+
+class TitleValuesSerializer(ValuesSerializer):
+    """
+    Список произведений в формате TitlesReadSerializer.
+    Жанры страницы загружаются одним запросом в prepare,
+     поля ?expand= добавляет api.v1.expand.
+    """
+    columns = {
+        'id': (('id',), itemgetter('id')),
+        'name': (('name',), itemgetter('name')),
+        'year': (('year',), itemgetter('year')),
+        'rating': (('rating',), title_rating),
+        'description': (('description',), itemgetter('description')),
+        'genre': ((), itemgetter('genre')),
+        'category': (('category__name', 'category__slug'), title_category),
+    }
+    # rating_count - для ?expand=review_count
+    required = ('id', 'rating_count')
+
+    @classmethod
+    def prepare(cls, rows, fields=None):
+        if fields is not None and 'genre' not in fields:
+            return
+        genres = defaultdict(list)
+        for title_id, name, slug in Genre.objects.filter(
+                title__in=[row['id'] for row in rows]).values_list(
+                    'title', 'name', 'slug'):
+            genres[title_id].append({'name': name, 'slug': slug})
+        for row in rows:
+            row['genre'] = genres[row['id']]
+
+    def to_representation(self, row):
+        data = super().to_representation(row)
+        for name in self.context.get('expand', ()):
+            data[name] = row[name]
+        return data
+
+
 class TitlesWriteSerializer(serializers.ModelSerializer):
     description = serializers.CharField(required=False)
     category = serializers.SlugRelatedField(queryset=Category.objects.all(),
@@ -70,6 +210,121 @@ class TitlesWriteSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class TopTitlesQuerySerializer(serializers.Serializer):
+    """Параметры /titles/top/: рейтинг категории, жанра или общий."""
+    category = serializers.SlugField(required=False)
+    genre = serializers.SlugField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.API_TOP_MAX_ITEMS, default=10)
+    min_reviews = serializers.IntegerField(min_value=1, default=1)
+
+    def validate(self, data):
+        if 'category' in data and 'genre' in data:
+            raise ValidationError(
+                'Рейтинг строится по категории или по жанру, не по обоим')
+        return data
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """Параметры /export/<таблица>/, см. api.export_utils."""
+    output = serializers.ChoiceField(choices=FORMATS, default='ndjson')
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    title = serializers.IntegerField(required=False)
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    """Параметры /changes/, см. api.v1.changes."""
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.API_CHANGES_MAX_ITEMS, default=100)
+    title = serializers.IntegerField(required=False)
+
+
+class TitleBulkSerializer(serializers.Serializer):
+    """
+    Элемент списка для /titles/bulk/.
+    Категории, жанры и (для PATCH) произведения всех элементов
+     загружаются заранее одним запросом на таблицу и передаются в context:
+     categories и genres - словари по slug, titles - по id,
+     payload_ids - сколько раз id встречается в запросе.
+    """
+    id = serializers.IntegerField(required=False)
+    name = serializers.CharField(max_length=250)
+    year = serializers.IntegerField(validators=(validate_year,))
+    description = serializers.CharField(required=False, allow_blank=True)
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    def does_not_exist(self, slug):
+        return ValidationError(
+            serializers.SlugRelatedField.default_error_messages[
+                'does_not_exist'].format(slug_name='slug', value=slug))
+
+    def validate_id(self, pk):
+        if not self.partial:
+            return pk
+        if pk not in self.context['titles']:
+            raise ValidationError(f'Произведение {pk} не найдено')
+        if self.context['payload_ids'][pk] > 1:
+            raise ValidationError(UniqueValidator.message)
+        return pk
+
+    def validate_category(self, slug):
+        if slug not in self.context['categories']:
+            raise self.does_not_exist(slug)
+        return self.context['categories'][slug]
+
+    def validate_genre(self, slugs):
+        for slug in slugs:
+            if slug not in self.context['genres']:
+                raise self.does_not_exist(slug)
+        return [self.context['genres'][slug] for slug in slugs]
+
+    def validate(self, data):
+        if self.partial and 'id' not in data:
+            raise ValidationError(
+                {'id': self.fields['id'].error_messages['required']})
+        return data
+
+
+class SlugNameBulkSerializer(serializers.Serializer):
+    """
+    Элемент списка для /genres/bulk/ и /categories/bulk/.
+    POST создаёт объекты, PATCH меняет name объекта с данным slug.
+    В context: existing - объекты по slug, names - занятые названия
+     (name: slug), payload_slugs и payload_names - сколько раз slug
+     и name встречаются в запросе.
+    """
+    name = serializers.CharField(max_length=100)
+    slug = serializers.SlugField(max_length=50,
+                                 validators=(validate_slug_not_reserved,))
+
+    def not_unique(self):
+        return ValidationError(UniqueValidator.message)
+
+    def validate_slug(self, slug):
+        if self.partial:
+            if slug not in self.context['existing']:
+                raise ValidationError(f'Объект {slug} не найден')
+        elif slug in self.context['existing']:
+            raise self.not_unique()
+        if self.context['payload_slugs'][slug] > 1:
+            raise self.not_unique()
+        return slug
+
+    def validate(self, data):
+        if self.partial and 'slug' not in data:
+            raise ValidationError(
+                {'slug': self.fields['slug'].error_messages['required']})
+        name = data.get('name')
+        if name is not None and (
+                self.context['names'].get(name, data['slug']) != data['slug']
+                or self.context['payload_names'][name] > 1):
+            raise ValidationError({'name': UniqueValidator.message})
+        return data
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(required=True)
     username = serializers.CharField(required=True)
@@ -93,7 +348,7 @@ class GetTokenSerializer(serializers.ModelSerializer):
         fields = ('username', 'confirmation_code',)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('username', 'email', 'first_name',
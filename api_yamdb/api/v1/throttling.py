@@ -0,0 +1,182 @@
+import hashlib
+import math
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+BUCKET_KEY = 'api:v1:throttle:{scope}:{ident}'
+# периоды в нотации DEFAULT_THROTTLE_RATES DRF: '5/min', '100/hour'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# ведро в redis: долить токены за прошедшее время, взять один;
+# скрипт выполняется атомарно для всех воркеров
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or capacity
+local at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * refill)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / refill
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill) + 1)
+return tostring(wait)
+"""
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """'5/min' - ёмкость ведра 5 и 5 / 60 токенов в секунду."""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def refill_bucket(bucket: Optional[Tuple[float, float]], capacity: int,
+                  refill: float, now: float) -> Tuple[Tuple[float, float],
+                                                      float]:
+    """Ведро после попытки взять токен и сколько ждать следующего."""
+    tokens, at = bucket or (capacity, now)
+    tokens = min(capacity, tokens + max(0.0, now - at) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / refill
+
+
+class CacheBucketStore:
+    """
+    Вёдра в кэше Django под блокировкой процесса: атомарно только
+     в одном процессе (тесты, запуск одним воркером).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, refill: float) -> float:
+        cache = caches['default']
+        with self._lock:
+            bucket, wait = refill_bucket(cache.get(key), capacity, refill,
+                                         time.time())
+            cache.set(key, bucket, math.ceil(capacity / refill) + 1)
+        return wait
+
+
+class RedisBucketStore:
+    """
+    Вёдра в redis кэша django_redis: один вызов Lua-скрипта на проверку,
+     лимит общий для всех воркеров gunicorn.
+    """
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.script = get_redis_connection('default').register_script(
+            TAKE_SCRIPT)
+
+    def take(self, key: str, capacity: int, refill: float) -> float:
+        return float(self.script(keys=(caches['default'].make_key(key),),
+                                 args=(capacity, refill, time.time())))
+
+
+_stores = {}
+
+
+def get_store():
+    """
+    Хранилище вёдер для бэкенда кэша default, одно на процесс.
+    Несколько воркеров требуют redis: иначе у каждого свои вёдра.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    store = _stores.get(backend)
+    if store is None:
+        redis = backend.startswith('django_redis')
+        if not redis and settings.WEB_WORKERS > 1:
+            raise ImproperlyConfigured(
+                f'{settings.WEB_WORKERS} workers need the redis throttle '
+                'store: set CACHE_BACKEND=django_redis.cache.RedisCache')
+        store = RedisBucketStore() if redis else CacheBucketStore()
+        store = _stores.setdefault(backend, store)
+    return store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ведро токенов: rate из DEFAULT_THROTTLE_RATES[scope] - ёмкость
+     и скорость пополнения, пустое ведро даёт 429 с Retry-After.
+    Без rate для scope ограничения нет.
+    Вёдра лежат в redis при кэше django_redis, иначе в кэше процесса,
+     см. get_store. Проверка - один запрос к хранилищу на ключ.
+    """
+    scope = None
+
+    def get_idents(self, request, view) -> Iterable[str]:
+        """Ключи вёдер запроса, токен берётся из каждого; по умолчанию IP."""
+        return (self.get_ident(request),)
+
+    def allow_request(self, request, view):
+        self.delay = 0.0
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+        capacity, refill = parse_rate(rate)
+        store = get_store()
+        for ident in self.get_idents(request, view):
+            key = BUCKET_KEY.format(scope=self.scope, ident=ident)
+            self.delay = max(self.delay, store.take(key, capacity, refill))
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Регистрация и получение токена с одного IP."""
+    scope = 'auth_ip'
+
+
+class AuthAccountThrottle(TokenBucketThrottle):
+    """
+    Регистрация и получение токена на один username и на один email,
+     с любых IP: перебор кодов и рассылка писем одному адресу.
+    """
+    scope = 'auth_account'
+    fields = ('username', 'email')
+
+    def get_idents(self, request, view):
+        # значения ещё не проверены сериализатором: в ключ - только хэш
+        data = request.data if isinstance(request.data, dict) else {}
+        return [f'{field}:' + hashlib.md5(
+            str(data[field]).lower().encode()).hexdigest()
+            for field in self.fields if data.get(field)]
+
+
+class WriteIPThrottle(TokenBucketThrottle):
+    """Запросы на запись с одного IP."""
+    scope = 'write_ip'
+
+    def get_idents(self, request, view):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return ()
+        return (self.get_ident(request),)
+
+
+class WriteUserThrottle(TokenBucketThrottle):
+    """Запросы на запись одного пользователя с любых IP."""
+    scope = 'write_user'
+
+    def get_idents(self, request, view):
+        if (request.method in ('GET', 'HEAD', 'OPTIONS')
+                or not request.user.is_authenticated):
+            return ()
+        return (request.user.id,)
@@ -2,7 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.v1.views import (
-    CategoryViewSet, CommentViewSet, EmailTokenObtainPairView, GenreViewSet,
+    CategoryViewSet, ChangesView, CommentViewSet, ConnectionStatsView,
+    EmailTokenObtainPairView, ExportView, GenreViewSet, ProfilingView,
     ReviewViewSet, RegisterView, TitlesViewSet, UsersViewSet)
 
 v1_router = DefaultRouter()
@@ -23,4 +24,9 @@ auth_patterns = [
     path('signup/', RegisterView.as_view(), name='signup')]
 
 urlpatterns = (path('', include(v1_router.urls)),
-               path('auth/', include(auth_patterns)),)
+               path('auth/', include(auth_patterns)),
+               path('profiling/', ProfilingView.as_view(), name='profiling'),
+               path('profiling/connections/', ConnectionStatsView.as_view(),
+                    name='profiling_connections'),
+               path('export/<kind>/', ExportView.as_view(), name='export'),
+               path('changes/', ChangesView.as_view(), name='changes'),)
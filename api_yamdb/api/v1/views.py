@@ -1,63 +1,144 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django_filters import rest_framework as filters
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from api.db_connections import get_connection_stats, reset_connection_stats
+from api.export_utils import EXPORTS, export_lines
+from api.middleware import get_stats, reset_stats
+from api.v1.authentication import access_token_for, cache_role, forget_user
+from api.v1.bulk import SlugNameBulkMixin, TitleBulkMixin
+from api.v1.changes import changes_since, decode_cursor, encode_cursor
+from api.v1.cache import (ALL_COMMENTS_NAMESPACE, COMMENTS_NAMESPACE,
+                          REVIEWS_NAMESPACE)
 from api.v1.custom_filter import TitleFilter
-from api.v1.custom_mixin import CreateListDestroyViewSet
-from api.mail_utils import send_email
+from api.v1.custom_mixin import (CachedReadMixin, ConditionalGetMixin,
+                                 CreateListDestroyViewSet, FieldsQueryMixin,
+                                 ValuesListMixin)
+from api.v1.expand import expand_titles, parse_expand
+from api.v1.pagination import KeysetPagination
+from api.mail_utils import queue_email
 from api.v1.permissions import (AdminModeratorAuthorPermission, AdminOnly,
                                 IsAdminUserOrReadOnly)
-from api.v1.serializer import (CategorySerializer, CommentSerializer,
-                               GenreSerializer, GetTokenSerializer,
-                               RegisterSerializer, ReviewSerializer,
-                               TitlesReadSerializer, TitlesWriteSerializer,
+from api.v1.serializer import (CategorySerializer, ChangesQuerySerializer,
+                               CommentSerializer, CommentValuesSerializer,
+                               ExportQuerySerializer, GenreSerializer,
+                               GetTokenSerializer, RegisterSerializer,
+                               ReviewSerializer, ReviewValuesSerializer,
+                               TitlesReadSerializer, TitleValuesSerializer,
+                               TitlesWriteSerializer,
+                               TopTitlesQuerySerializer,
                                UserSelfSerializer, UserSerializer)
+from api.v1.throttling import AuthAccountThrottle, AuthIPThrottle
 from reviews.models import Category, Genre, Review, Title
+from reviews.rating_utils import sync_genre_ratings, top_title_ids
 
 
 User = get_user_model()
 
+DUPLICATE_REVIEW = 'есть уже твоё мнение, угомонись'
 
-class ReviewViewSet(ModelViewSet):
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class ReviewViewSet(ConditionalGetMixin, ValuesListMixin, ModelViewSet):
     """
     Получение и добавление отзывов к шедевру
     GET - доступно всем
     POST - user может добавить только один отзыв на произведение
     PATCH, PUT, DELETE - автор отзыва, модератор, админ
+    Каждая запись пересчитывает рейтинг произведения в той же транзакции
+     сигналами модели, как и запись из админки, см. reviews.signals.
+    GET ?cursor= - выдача по ключу (pub_date, id), см. KeysetPagination
+    GET с If-None-Match или If-Modified-Since - 304 без запроса к базе,
+     если отзывы произведения не менялись, см. ConditionalGetMixin
+    GET списка - строки values() без моделей, см. ValuesListMixin
     """
     serializer_class = ReviewSerializer
+    values_serializer_class = ReviewValuesSerializer
+    pagination_class = KeysetPagination
     permission_classes = (AdminModeratorAuthorPermission,
                           IsAuthenticatedOrReadOnly)
 
+    def get_version_namespaces(self):
+        return (REVIEWS_NAMESPACE.format(title_id=self.kwargs['title_id']),)
+
+    @cached_property
+    def title(self):
+        """Произведение из url, один запрос на запрос API."""
+        return get_object_or_404(Title.objects.only('id'),
+                                 pk=self.kwargs.get('title_id'))
+
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.review.all()
+        reviews = self.title.review.all()
+        if self.requested('author'):
+            reviews = reviews.select_related('author')
+        return reviews
+
+    def get_sparse_columns(self, fields):
+        # отзывы из title.review сверяют произведение по title_id
+        return (*super().get_sparse_columns(fields), 'title')
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        # второй отзыв автора отклоняет ограничение unique-review,
+        # без проверки перед вставкой и без окна между ними
+        title = self.title
+        try:
+            with transaction.atomic():
+                serializer.save(author_id=self.request.user.id, title=title)
+        except IntegrityError:
+            # другие нарушения ограничений - не повторный отзыв
+            if not Review.objects.filter(
+                    title=title, author_id=self.request.user.id).exists():
+                raise
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_REVIEW]})
+
+    def perform_update(self, serializer):
+        # pre_save блокирует строку отзыва до конца транзакции
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        # рейтинг и кэш сдвигает post_delete, см. reviews.signals;
+        # блокировка строки не даёт двум удалениям вычесть оценку дважды
+        with transaction.atomic():
+            review = Review.objects.select_for_update().filter(
+                pk=instance.pk).first()
+            if review is not None:
+                review.delete()
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, ValuesListMixin, ModelViewSet):
     """
     Комментарии к отзывам
     GET - доступно всем
     POST - аутентифицированный юзер
     PATCH, PUT, DELETE - автор отзыва, модератор, админ
+    GET ?cursor= - выдача по ключу (pub_date, id), см. KeysetPagination
+    GET с If-None-Match или If-Modified-Since - 304 без запроса к базе,
+     версия учитывает и удаление самого отзыва
+    GET списка - строки values() без моделей, см. ValuesListMixin
     """
     serializer_class = CommentSerializer
+    values_serializer_class = CommentValuesSerializer
+    pagination_class = KeysetPagination
     permission_classes = (AdminModeratorAuthorPermission,
                           IsAuthenticatedOrReadOnly)
 
@@ -65,63 +146,166 @@ class CommentViewSet(ModelViewSet):
         review = get_object_or_404(
             Review, pk=self.kwargs.get('review_id'),
             title_id=self.kwargs.get('title_id'))
-        return review.comments.all()
+        comments = review.comments.all()
+        if self.requested('author'):
+            comments = comments.select_related('author')
+        return comments
+
+    def get_sparse_columns(self, fields):
+        return (*super().get_sparse_columns(fields), 'review')
+
+    def get_version_namespaces(self):
+        return (REVIEWS_NAMESPACE.format(title_id=self.kwargs['title_id']),
+                COMMENTS_NAMESPACE.format(review_id=self.kwargs['review_id']))
 
     def perform_create(self, serializer):
         review = get_object_or_404(Review, pk=self.kwargs.get('review_id'))
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author_id=self.request.user.id, review=review)
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(SlugNameBulkMixin, ConditionalGetMixin,
+                      CachedReadMixin, FieldsQueryMixin,
+                      CreateListDestroyViewSet):
     """
     GET /categories/ - список всех категорий, доступно всем
     GET /categories/?search=name - доступно всем
     POST /categories/ - только admin
         params = {"name": string, "slug": string}
     DELETE /categories/slug/ - только admin
+    POST, PATCH /categories/bulk/ - список категорий, только admin
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_namespace = 'categories'
     permission_classes = (IsAdminUserOrReadOnly,)
     filter_backends = (SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(SlugNameBulkMixin, ConditionalGetMixin,
+                   CachedReadMixin, FieldsQueryMixin,
+                   CreateListDestroyViewSet):
     """
     GET /genres/ - список всех жанров, доступно всем
     GET /genres/?search=name - доступно всем
     POST /genres/ - только admin
         params = {"name": string, "slug": string}
     DELETE /genres/slug/ - только admin
+    POST, PATCH /genres/bulk/ - список жанров, только admin
         """
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_namespace = 'genres'
     permission_classes = (IsAdminUserOrReadOnly,)
     filter_backends = (SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
 
 
-class TitlesViewSet(ModelViewSet):
+class TitlesViewSet(TitleBulkMixin, ConditionalGetMixin, CachedReadMixin,
+                    ValuesListMixin, ModelViewSet):
     """
     Получение списка всех произведений со средним рейтингом.
+    Рейтинг берётся из полей Title, без агрегации по отзывам.
+    Категория и жанры на чтение подгружаются заранее: страница списка
+     обходится фиксированным числом запросов.
+    Ответы на чтение кэшируются, см. CachedReadMixin,
+     повторный GET с If-None-Match получает 304, см. ConditionalGetMixin.
     GET - доступно без токена.
     POST, PUT, PATCH, DELETE - только администратор.
+    POST, PATCH /titles/bulk/ - список произведений одним запросом,
+     см. TitleBulkMixin.
+    GET /titles/top/?category=|genre=&limit=&min_reviews= - лучшие
+     произведения категории, жанра или всего каталога, см. top_title_ids.
+    GET /titles/?expand=review_count,comment_count,latest_reviews - данные
+     карточек в списке, запрос на вид данных на страницу, см. expand_titles.
+    GET списка - строки values() без моделей, жанры страницы одним
+     запросом, см. ValuesListMixin и TitleValuesSerializer.
+    GET ?fields=id,name - только эти поля, категория и жанры
+     загружаются, только если запрошены, см. FieldsQueryMixin.
     """
     filterset_class = TitleFilter
-    queryset = Title.objects.annotate(rating=Avg('review__score')).all()
+    values_serializer_class = TitleValuesSerializer
+    queryset = Title.objects.defer('search_vector')
+    cache_namespace = 'titles'
     permission_classes = (IsAdminUserOrReadOnly,)
     filter_backends = (filters.DjangoFilterBackend,)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('retrieve', 'top'):
+            return queryset
+        if self.requested('category'):
+            queryset = queryset.select_related('category')
+        if self.requested('genre'):
+            queryset = queryset.prefetch_related('genre')
+        return queryset
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action == 'list':
+            return super().get_serializer_class()
+        if self.action in ('retrieve', 'top'):
             return TitlesReadSerializer
         return TitlesWriteSerializer
 
-
-class UsersViewSet(ModelViewSet):
+    @cached_property
+    def expand(self):
+        if self.action != 'list':
+            return []
+        return parse_expand(self.request.query_params.get('expand', ''))
+
+    def get_serializer_context(self):
+        return dict(super().get_serializer_context(), expand=self.expand)
+
+    def get_cache_dependencies(self):
+        # число комментариев меняется без записи в произведения
+        if 'comment_count' in self.expand:
+            return (ALL_COMMENTS_NAMESPACE,)
+        return ()
+
+    def get_version_namespaces(self):
+        return (self.cache_namespace, *self.get_cache_dependencies())
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.expand:
+            expand_titles(page, self.expand)
+        return page
+
+    @action(detail=False, url_path='top')
+    def top(self, request):
+        return self.conditional_response(self.cached_top, request)
+
+    def cached_top(self, request):
+        return self.cached_response(self.ranked_titles, request)
+
+    def ranked_titles(self, request):
+        query = TopTitlesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        ids = top_title_ids(
+            params['limit'], params['min_reviews'],
+            category_id=self.slug_to_id(Category, params.get('category')),
+            genre_id=self.slug_to_id(Genre, params.get('genre')))
+        titles = self.sparse_queryset(self.get_queryset()).in_bulk(ids)
+        return Response(self.get_serializer(
+            [titles[pk] for pk in ids if pk in titles], many=True).data)
+
+    @staticmethod
+    def slug_to_id(model, slug):
+        if slug is None:
+            return None
+        return get_object_or_404(model.objects.values_list('id', flat=True),
+                                 slug=slug)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        # новые связи с жанрами получают текущий рейтинг произведения
+        sync_genre_ratings((serializer.instance.pk,))
+
+
+class UsersViewSet(FieldsQueryMixin, ModelViewSet):
     """
     GET, POST: /users/ - admin
     GET, POST, PATCH, DELETE: /users/username/ - admin
@@ -132,17 +316,27 @@ class UsersViewSet(ModelViewSet):
     permission_classes = (IsAuthenticated, AdminOnly,)
     lookup_field = 'username'
 
+    def perform_update(self, serializer):
+        cache_role(serializer.save())
+
+    def perform_destroy(self, instance):
+        user_id = instance.pk
+        instance.delete()
+        forget_user(user_id)
+
     @action(
         methods=('GET', 'PATCH',),
         detail=False,
         permission_classes=(IsAuthenticated,),
         url_path='me')
     def get_current_user_info(self, request):
+        # request.user собран из токена, профиль читаем из базы
+        user = get_object_or_404(User, pk=request.user.id)
         serializer = UserSelfSerializer(
-            request.user, data=request.data, partial=True)
+            user, data=request.data, partial=True)
 
         if serializer.is_valid(raise_exception=True):
-            serializer.save()
+            cache_role(serializer.save())
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -152,7 +346,10 @@ class EmailTokenObtainPairView(APIView):
     POST: /auth/token/
     отправить код подтверждения и получить токен
     {"username": "string","confirmation_code": "string"}
+    не больше THROTTLE_AUTH_IP попыток с одного IP
+     и THROTTLE_AUTH_ACCOUNT на один username, иначе 429
     """
+    throttle_classes = (AuthIPThrottle, AuthAccountThrottle)
 
     def post(self, request):
         serializer = GetTokenSerializer(data=request.data)
@@ -162,7 +359,7 @@ class EmailTokenObtainPairView(APIView):
 
         if default_token_generator.check_token(
                 user, data.get('confirmation_code')):
-            token = RefreshToken.for_user(user).access_token
+            token = access_token_for(user)
 
             return Response({'token': str(token)},
                             status=status.HTTP_201_CREATED)
@@ -176,8 +373,13 @@ class RegisterView(APIView):
     """
     POST: /auth/signup/
     получить код подтверждения на email
+    письмо ставится в очередь и отправляется командой send_outbox
     {"email": "string","username": "string"}
+    не больше THROTTLE_AUTH_IP регистраций с одного IP
+     и THROTTLE_AUTH_ACCOUNT на один username или email, иначе 429
     """
+    throttle_classes = (AuthIPThrottle, AuthAccountThrottle)
+
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
 
@@ -194,6 +396,88 @@ class RegisterView(APIView):
 
             user.confirmation_code = default_token_generator.make_token(user)
 
-            send_email(user)
+            queue_email(user)
 
             return Response(serializer.data, status.HTTP_200_OK)
+
+
+class ProfilingView(APIView):
+    """
+    GET: /profiling/ - сводка ProfilingMiddleware по эндпоинтам, admin
+    DELETE: /profiling/ - сбросить сводку
+    Сводка своя у каждого процесса сервера.
+    """
+    permission_classes = (IsAuthenticated, AdminOnly,)
+
+    def get(self, request):
+        return Response(get_stats())
+
+    def delete(self, request):
+        reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ConnectionStatsView(APIView):
+    """
+    GET: /profiling/connections/ - соединения с базами процесса, admin:
+     открыто соединений на запрос, ожидание свободного соединения пула
+    DELETE: /profiling/connections/ - сбросить счётчики
+    """
+    permission_classes = (IsAuthenticated, AdminOnly,)
+
+    def get(self, request):
+        return Response(get_connection_stats())
+
+    def delete(self, request):
+        reset_connection_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ExportView(APIView):
+    """
+    GET: /export/{titles|reviews|comments}/ - вся таблица потоком, admin
+     ?output=ndjson (по умолчанию) или csv,
+     ?since=, ?until= - диапазон pub_date, ?title= - id произведения
+    Строки читаются частями и сразу отдаются клиенту, без пагинации.
+    """
+    permission_classes = (IsAuthenticated, AdminOnly,)
+
+    def get(self, request, kind):
+        if kind not in EXPORTS:
+            raise Http404
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        output = params['output']
+        response = StreamingHttpResponse(
+            export_lines(kind, output, since=params.get('since'),
+                         until=params.get('until'),
+                         title_id=params.get('title')),
+            content_type=EXPORT_CONTENT_TYPES[output])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}.{output}"')
+        return response
+
+
+class ChangesView(APIView):
+    """
+    GET: /changes/ - лента изменений отзывов и комментариев для зеркал
+     ?cursor= - next из прошлого ответа (без него - с начала),
+     ?limit= - изменений за запрос, ?title= - только одного произведения
+    Клиент повторяет запрос с next, пока has_more, и дальше опрашивает
+     ленту с последним next: курсор монотонный, изменения не теряются.
+    GET - доступно всем, как и сами отзывы.
+    """
+
+    def get(self, request):
+        query = ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        changes, last, has_more = changes_since(
+            decode_cursor(params.get('cursor')), params['limit'],
+            params.get('title'))
+        return Response({
+            'next': encode_cursor(last) if last else None,
+            'has_more': has_more,
+            'results': changes,
+        })
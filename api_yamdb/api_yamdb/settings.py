@@ -1,6 +1,8 @@
 import os
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = os.getenv('SECRET_KEY', default='p&l%385148kslhtyn^##a1)ilz@4zqj=rq&agdol^##zgl9(v')
@@ -24,13 +26,15 @@ INSTALLED_APPS = (
     'django_filters',)
 
 MIDDLEWARE = (
+    'api.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',)
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',)
 
 ROOT_URLCONF = 'api_yamdb.urls'
 
@@ -59,10 +63,104 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # постоянные соединения: сколько секунд держать, 0 - на запрос
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        # проверка постоянного соединения перед запросом
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', default='True') == 'True',
+    }
+}
+
+# пул соединений процесса вместо соединения на поток (gthread):
+# DB_POOL_MAX_SIZE соединений на процесс, ожидание до DB_POOL_TIMEOUT секунд;
+# CONN_HEALTH_CHECKS - только для простоявших DB_POOL_CHECK_AFTER секунд
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', default=0))
+if DB_POOL_MAX_SIZE and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default'].update(
+        ENGINE='api.db_pool',
+        CONN_MAX_AGE=0,
+        POOL={'MAX_SIZE': DB_POOL_MAX_SIZE,
+              'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+              'CHECK_AFTER': float(os.getenv('DB_POOL_CHECK_AFTER',
+                                             default=30))})
+
+# реплики для чтения: DB_REPLICA_HOSTS=host1,host2:5433
+# остальные параметры подключения те же, что у default
+DATABASE_REPLICAS = ()
+for number, address in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')),
+        start=1):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host,
+                            PORT=port or DATABASES['default']['PORT'],
+                            TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS += (alias,)
+
+DATABASE_ROUTERS = ('api.db_router.ReplicaRouter',)
+
+# наибольшее отставание реплик в секундах: столько после записи ответы,
+# которые кэшируются и получают ETag, читаются из default
+DATABASE_REPLICA_LAG = float(os.getenv('DB_REPLICA_LAG', default=10))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
     }
 }
 
+# в кэше лежат поколения ответов и ETag, роли из токенов и вёдра
+# ограничений запросов; у кэша в памяти они свои в каждом процессе,
+# поэтому несколько воркеров gunicorn требуют общего кэша (django_redis)
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+WEB_WORKERS = int(os.getenv('GUNICORN_WORKERS', default=1))
+
+if (not DEBUG and WEB_WORKERS > 1
+        and CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES):
+    raise ImproperlyConfigured(
+        f'GUNICORN_WORKERS={WEB_WORKERS} with a process-local cache: '
+        'set CACHE_BACKEND=django_redis.cache.RedisCache')
+
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default=300))
+
+# наибольший ?page_size= списков api.v1
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', default=100))
+
+API_BULK_MAX_ITEMS = int(os.getenv('API_BULK_MAX_ITEMS', default=10000))
+
+API_TOP_MAX_ITEMS = int(os.getenv('API_TOP_MAX_ITEMS', default=100))
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', default=2000))
+
+CSV_TO_DB_LOG_FILE = os.getenv('CSV_TO_DB_LOG_FILE', default='csv_to_db_log.log')
+
+API_CHANGES_MAX_ITEMS = int(os.getenv('API_CHANGES_MAX_ITEMS', default=1000))
+
+# лента /changes/ не отдаёт изменения последних секунд: их транзакции
+# могут быть ещё не закоммичены
+CHANGES_SAFETY_LAG = float(os.getenv('CHANGES_SAFETY_LAG', default=5))
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='False') == 'True'
+
+PROFILING_SLOW_REQUEST_MS = int(os.getenv('PROFILING_SLOW_REQUEST_MS', default=500))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ('console',),
+            'level': os.getenv('PROFILING_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = (
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -100,17 +198,57 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.v1.authentication.RoleJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.v1.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.v1.pagination.PageSizePagination',
     'PAGE_SIZE': 10,
+    # запись ограничена для всех эндпоинтов, auth/ - своими ведрами,
+    # см. api.v1.throttling; пустая переменная окружения снимает лимит
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.v1.throttling.WriteIPThrottle',
+        'api.v1.throttling.WriteUserThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('THROTTLE_AUTH_IP', default='20/min') or None,
+        'auth_account': os.getenv('THROTTLE_AUTH_ACCOUNT', default='5/min') or None,
+        'write_ip': os.getenv('THROTTLE_WRITE_IP', default='120/min') or None,
+        'write_user': os.getenv('THROTTLE_WRITE_USER', default='60/min') or None,
+    },
+    # IP клиента - из X-Forwarded-For, который ставит nginx
+    'NUM_PROXIES': int(os.getenv('THROTTLE_NUM_PROXIES', default=1)),
 }
 
+# вёдра ограничений общие для всех воркеров только в redis: Lua-скрипт
+# RedisBucketStore; с другим кэшем блокировка вёдер - в процессе, и каждый
+# воркер пропускал бы свой лимит, см. api.v1.throttling.get_store
+if (not DEBUG and WEB_WORKERS > 1
+        and not CACHES['default']['BACKEND'].startswith('django_redis')
+        and any(REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].values())):
+    raise ImproperlyConfigured(
+        f'GUNICORN_WORKERS={WEB_WORKERS} needs the redis throttle store: '
+        'set CACHE_BACKEND=django_redis.cache.RedisCache')
+
+ROLE_CACHE_TIMEOUT = int(os.getenv('ROLE_CACHE_TIMEOUT', default=300))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5))
+
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv('EMAIL_OUTBOX_RETRY_DELAY', default=30))
+
+EMAIL_OUTBOX_MAX_DELAY = int(os.getenv('EMAIL_OUTBOX_MAX_DELAY', default=3600))
+
 EMAIL_HOST = 'smtp.yandex.ru'
 
 EMAIL_HOST_USER = 'S1DeR24@yandex.ru'
@@ -0,0 +1,15 @@
+import os
+
+# Django 2.2 не умеет асинхронные представления и ORM, поэтому
+# конкурентность даёт gthread: пока один поток ждёт базу, другие
+# потоки того же процесса отвечают на запросы.
+# GUNICORN_WORKER_CLASS=sync возвращает прежний режим для сравнения.
+# По умолчанию один процесс: его потоки делят кэш в памяти, а несколько
+# воркеров требуют общего кэша (CACHE_BACKEND=django_redis.cache.RedisCache),
+# см. PROCESS_LOCAL_CACHES в settings.
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', default='gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', default=1))
+threads = int(os.getenv('GUNICORN_THREADS', default=4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
@@ -1,5 +1,24 @@
 from django.apps import AppConfig
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
 
 
 class ReviewsConfig(AppConfig):
     name = 'reviews'
+
+    def ready(self):
+        from reviews.models import Category, Comment, Genre, Review, Title
+        from reviews.signals import (cache_deleted, cache_saved,
+                                     collect_deletion, review_rating_loaded,
+                                     review_rating_saved, write_deletion)
+
+        for model in (Review, Comment):
+            pre_delete.connect(collect_deletion, sender=model)
+            post_delete.connect(write_deletion, sender=model)
+        pre_delete.connect(collect_deletion, sender=Title)
+        pre_save.connect(review_rating_loaded, sender=Review)
+        post_save.connect(review_rating_saved, sender=Review)
+        for model in (Category, Genre, Title, Review, Comment):
+            post_save.connect(cache_saved, sender=model)
+        for model in (Category, Genre, Title):
+            post_delete.connect(cache_deleted, sender=model)
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:42
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce({row}name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce({row}description, '')), 'B')"
+)
+
+CREATE_SQL = (
+    'CREATE FUNCTION reviews_title_search_vector_update() RETURNS trigger AS $$'
+    ' BEGIN NEW.search_vector := ' + SEARCH_VECTOR.format(row='NEW.') + ';'
+    ' RETURN NEW; END $$ LANGUAGE plpgsql',
+    'CREATE TRIGGER reviews_title_search_vector'
+    ' BEFORE INSERT OR UPDATE OF name, description ON reviews_title'
+    ' FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector_update()',
+    'UPDATE reviews_title SET search_vector = ' + SEARCH_VECTOR.format(row=''),
+    'CREATE INDEX reviews_title_search_vector_gin'
+    ' ON reviews_title USING gin (search_vector)',
+)
+
+DROP_SQL = (
+    'DROP INDEX IF EXISTS reviews_title_search_vector_gin',
+    'DROP TRIGGER IF EXISTS reviews_title_search_vector ON reviews_title',
+    'DROP FUNCTION IF EXISTS reviews_title_search_vector_update()',
+)
+
+
+def run_on_postgresql(statements):
+    """Триггер и GIN-индекс есть только в PostgreSQL."""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_review_comment_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='поисковый вектор'),
+        ),
+        migrations.RunPython(run_on_postgresql(CREATE_SQL),
+                             run_on_postgresql(DROP_SQL)),
+    ]
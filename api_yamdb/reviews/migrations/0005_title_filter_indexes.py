@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:44
+
+import api.v1.custom_validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_title_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.IntegerField(db_index=True, validators=[api.v1.custom_validators.validate_year], verbose_name='год выпуска произведения'),
+        ),
+        migrations.AddIndex(
+            model_name='genretitle',
+            index=models.Index(fields=['genre', 'title'], name='genre-title'),
+        ),
+    ]
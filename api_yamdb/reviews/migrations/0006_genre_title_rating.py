@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:03
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_genre_rating(apps, schema_editor):
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    Title = apps.get_model('reviews', 'Title')
+    titles = Title.objects.filter(pk=OuterRef('title_id'))
+    GenreTitle.objects.update(
+        rating=Subquery(titles.values('rating')),
+        rating_count=Subquery(titles.values('rating_count')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genretitle',
+            name='rating',
+            field=models.FloatField(editable=False, null=True, verbose_name='средняя оценка произведения'),
+        ),
+        migrations.AddField(
+            model_name='genretitle',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество оценок произведения'),
+        ),
+        migrations.AddIndex(
+            model_name='genretitle',
+            index=models.Index(fields=['genre', 'rating', 'rating_count', 'title'], name='genre-title-rating'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['rating', 'rating_count', 'id'], name='title-rating'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'rating', 'rating_count', 'id'], name='title-category-rating'),
+        ),
+        migrations.RunPython(fill_genre_rating, migrations.RunPython.noop),
+    ]
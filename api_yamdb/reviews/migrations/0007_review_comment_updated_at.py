@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    # существующие строки не менялись с публикации
+    for model in ('Review', 'Comment'):
+        apps.get_model('reviews', model).objects.update(
+            updated_at=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_genre_title_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('review', 'отзыв'), ('comment', 'комментарий')], max_length=16, verbose_name='что удалено')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('title_id', models.PositiveIntegerField(verbose_name='id произведения')),
+                ('review_id', models.PositiveIntegerField(null=True, verbose_name='id отзыва комментария')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='дата удаления')),
+            ],
+            options={
+                'verbose_name_plural': 'удалённые отзывы и комментарии',
+            },
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата изменения комментария'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата изменения отзыва'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['updated_at', 'id'], name='comment-updated-at'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['updated_at', 'id'], name='review-updated-at'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone-deleted-at'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
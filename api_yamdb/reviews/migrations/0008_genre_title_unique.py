@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:06
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_links(apps, schema_editor):
+    # из повторяющихся связей произведения с жанром остаётся первая
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    first_ids = (GenreTitle.objects.order_by().values('title', 'genre')
+                 .annotate(first_id=Min('id')).values('first_id'))
+    GenreTitle.objects.filter(genre__isnull=False).exclude(
+        id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_review_comment_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_links,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='genretitle',
+            constraint=models.UniqueConstraint(fields=('title', 'genre'), name='unique-genre-title'),
+        ),
+    ]
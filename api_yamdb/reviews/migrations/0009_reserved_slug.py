@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:09
+
+import api.v1.custom_validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_genre_title_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(unique=True, validators=[api.v1.custom_validators.validate_slug_not_reserved], verbose_name='url'),
+        ),
+        migrations.AlterField(
+            model_name='genre',
+            name='slug',
+            field=models.SlugField(unique=True, validators=[api.v1.custom_validators.validate_slug_not_reserved], verbose_name='url'),
+        ),
+    ]
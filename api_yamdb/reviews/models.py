@@ -1,8 +1,9 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-from api.v1.custom_validators import validate_year
+from api.v1.custom_validators import validate_slug_not_reserved, validate_year
 
 
 class Category(models.Model):
@@ -14,7 +15,8 @@ class Category(models.Model):
     """
     name = models.CharField(max_length=100,
                             verbose_name='название категории', unique=True)
-    slug = models.SlugField(verbose_name='url', unique=True)
+    slug = models.SlugField(verbose_name='url', unique=True,
+                            validators=(validate_slug_not_reserved,))
 
     class Meta:
         verbose_name_plural = 'категории'
@@ -31,7 +33,8 @@ class Genre(models.Model):
     """
     name = models.CharField(max_length=100,
                             verbose_name='название жанра', unique=True)
-    slug = models.SlugField(verbose_name='url', unique=True)
+    slug = models.SlugField(verbose_name='url', unique=True,
+                            validators=(validate_slug_not_reserved,))
 
     class Meta:
         verbose_name_plural = 'жанры'
@@ -40,15 +43,23 @@ class Genre(models.Model):
         return self.name
 
 
+# поля рейтинга произведения, пишутся только из reviews.rating_utils
+RATING_FIELDS = ('rating', 'rating_sum', 'rating_count')
+
+
 class Title(models.Model):
     """
     Произведения, к которым пишут отзывы, каждое привязано к одной категории.
-    поля - id,name,year,category
+    Рейтинг хранится в самой таблице и пересчитывается при изменении отзывов,
+     см. reviews.rating_utils.
+    search_vector на PostgreSQL заполняет триггер по name и description,
+     см. reviews.search_utils.
+    поля - id,name,year,category,rating,rating_sum,rating_count,search_vector
     """
     name = models.CharField(max_length=250,
                             verbose_name='название произведения')
     year = models.IntegerField(verbose_name='год выпуска произведения',
-                               validators=(validate_year,))
+                               validators=(validate_year,), db_index=True)
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, null=True, related_name='titles',
         verbose_name='категория')
@@ -56,18 +67,46 @@ class Title(models.Model):
                                    through='GenreTitle', verbose_name='Жанр')
     description = models.TextField(verbose_name='описание произведения',
                                    blank=True)
+    rating = models.FloatField(verbose_name='средняя оценка', null=True,
+                               editable=False)
+    rating_sum = models.PositiveIntegerField(
+        verbose_name='сумма оценок', default=0, editable=False)
+    rating_count = models.PositiveIntegerField(
+        verbose_name='количество оценок', default=0, editable=False)
+    search_vector = SearchVectorField(
+        verbose_name='поисковый вектор', null=True, editable=False)
 
     class Meta:
         verbose_name_plural = 'произведения которые обсуждают пользователи'
+        # рейтинги: лучшие произведения - обратный проход по индексу
+        indexes = (models.Index(fields=('rating', 'rating_count', 'id'),
+                                name='title-rating'),
+                   models.Index(fields=('category', 'rating', 'rating_count',
+                                        'id'),
+                                name='title-category-rating'),)
 
     def __str__(self):
         return self.name
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        # сумму и количество оценок сдвигают UPDATE с F(), см. rating_utils:
+        # сохранение не перезаписывает их значениями, прочитанными раньше
+        if (update_fields is None and not force_insert
+                and not self._state.adding):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name not in RATING_FIELDS]
+        super().save(force_insert, force_update, using, update_fields)
+
 
 class Review(models.Model):
     """
     отзывы к шедеврам, каждый отзыв привязан к своему произведению
-    поля - id, title_id, text, author, score, pub_date
+    updated_at - время последнего изменения для ленты /changes/
+    поля - id, title_id, text, author, score, pub_date, updated_at
     """
     title = models.ForeignKey(
         Title, on_delete=models.CASCADE, related_name='review',
@@ -83,11 +122,17 @@ class Review(models.Model):
                     MinValueValidator(0, 'оценка не может быть меньше 0'),))
     pub_date = models.DateTimeField(
         auto_now_add=True, verbose_name='дата добавления отзыва')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='дата изменения отзыва')
 
     class Meta:
         verbose_name_plural = 'отзывы и оценки к произведениям'
         constraints = (models.UniqueConstraint(fields=('author', 'title'),
                                                name='unique-review'),)
+        indexes = (models.Index(fields=('title', 'pub_date', 'id'),
+                                name='review-title-pub-date'),
+                   models.Index(fields=('updated_at', 'id'),
+                                name='review-updated-at'),)
 
     def __str__(self):
         return self.text[:12]
@@ -96,7 +141,8 @@ class Review(models.Model):
 class Comment(models.Model):
     """
     комментарии к отзывам, коммент привязан к своему отзыву
-    поля - id, review_id, text, author, pub_date
+    updated_at - время последнего изменения для ленты /changes/
+    поля - id, review_id, text, author, pub_date, updated_at
     """
     review = models.ForeignKey(
         Review, on_delete=models.CASCADE, related_name='comments',
@@ -107,9 +153,15 @@ class Comment(models.Model):
         related_name='comments', verbose_name='автор комментария')
     pub_date = models.DateTimeField(
         auto_now_add=True, verbose_name='дата добавления комментария')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='дата изменения комментария')
 
     class Meta:
         verbose_name_plural = 'комментарии к отзывам'
+        indexes = (models.Index(fields=('review', 'pub_date', 'id'),
+                                name='comment-review-pub-date'),
+                   models.Index(fields=('updated_at', 'id'),
+                                name='comment-updated-at'),)
 
     def __str__(self):
         return self.text[:12]
@@ -119,7 +171,9 @@ class GenreTitle(models.Model):
     """
     К каким жанрам относится произведение, их может быть несколько,
      как лирическая комедия.
-    поля - id, title_id, genre_id
+    rating и rating_count - копия из Title для рейтинга жанра,
+     обновляется вместе с рейтингом произведения, см. reviews.rating_utils.
+    поля - id, title_id, genre_id, rating, rating_count
     """
     title = models.ForeignKey(
         Title, on_delete=models.CASCADE, verbose_name='произведение',
@@ -127,6 +181,49 @@ class GenreTitle(models.Model):
     genre = models.ForeignKey(
         Genre, on_delete=models.SET_NULL, null=True, verbose_name='жанр',
         related_name='genre_title')
+    rating = models.FloatField(verbose_name='средняя оценка произведения',
+                               null=True, editable=False)
+    rating_count = models.PositiveIntegerField(
+        verbose_name='количество оценок произведения', default=0,
+        editable=False)
 
     class Meta:
         verbose_name_plural = 'произведения и жанры, промежуточная таблица'
+        # дубль связи повторял бы произведение в рейтинге жанра
+        constraints = (models.UniqueConstraint(fields=('title', 'genre'),
+                                               name='unique-genre-title'),)
+        indexes = (models.Index(fields=('genre', 'title'),
+                                name='genre-title'),
+                   models.Index(fields=('genre', 'rating', 'rating_count',
+                                        'title'),
+                                name='genre-title-rating'),)
+
+
+class Tombstone(models.Model):
+    """
+    Удалённые отзывы и комментарии для ленты /changes/: строка остаётся,
+     когда самого объекта и его произведения уже нет.
+    Пишется сигналами удаления, в том числе при каскадном удалении,
+     см. reviews.signals.
+    поля - id, kind, object_id, title_id, review_id, deleted_at
+    """
+    REVIEW = 'review'
+    COMMENT = 'comment'
+    KINDS = ((REVIEW, 'отзыв'), (COMMENT, 'комментарий'))
+
+    kind = models.CharField(max_length=16, choices=KINDS,
+                            verbose_name='что удалено')
+    object_id = models.PositiveIntegerField(verbose_name='id объекта')
+    title_id = models.PositiveIntegerField(verbose_name='id произведения')
+    review_id = models.PositiveIntegerField(
+        verbose_name='id отзыва комментария', null=True)
+    deleted_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='дата удаления')
+
+    class Meta:
+        verbose_name_plural = 'удалённые отзывы и комментарии'
+        indexes = (models.Index(fields=('deleted_at', 'id'),
+                                name='tombstone-deleted-at'),)
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
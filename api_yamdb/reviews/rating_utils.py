@@ -0,0 +1,89 @@
+from typing import Iterable, List, Optional
+
+from django.db.models import (Avg, Case, Count, F, FloatField, OuterRef,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce
+
+from reviews.models import GenreTitle, Review, Title
+
+
+def update_rating(title_id: int, score_delta: int,
+                  count_delta: int = 0) -> None:
+    """
+    Сдвиг суммы и количества оценок произведения одним UPDATE.
+    Выражения справа ссылаются на значения строки до обновления, поэтому
+     средняя оценка считается из уже сдвинутых суммы и количества.
+    Вторым UPDATE новый рейтинг копируется в связи с жанрами.
+    """
+    new_sum = F('rating_sum') + score_delta
+    new_count = F('rating_count') + count_delta
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=new_sum,
+        rating_count=new_count,
+        rating=Case(
+            When(rating_count__lte=-count_delta, then=Value(None)),
+            default=Cast(new_sum, FloatField()) / new_count,
+            output_field=FloatField()))
+    sync_genre_ratings((title_id,))
+
+
+def sync_genre_ratings(title_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Копия рейтинга произведений в GenreTitle для рейтингов жанров,
+     если title_ids не переданы - для всех связей.
+    """
+    titles = Title.objects.filter(pk=OuterRef('title_id'))
+    links = GenreTitle.objects.all()
+    if title_ids is not None:
+        links = links.filter(title_id__in=title_ids)
+    return links.update(
+        rating=Subquery(titles.values('rating')),
+        rating_count=Subquery(titles.values('rating_count')))
+
+
+def rebuild_ratings(title_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Полный пересчёт рейтинга по таблице отзывов,
+     если title_ids не переданы - для всех произведений.
+    Возвращает количество обновлённых произведений.
+    """
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')).order_by().values('title')
+    titles = Title.objects.all()
+    if title_ids is not None:
+        title_ids = list(title_ids)
+        titles = titles.filter(pk__in=title_ids)
+    updated = titles.update(
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')),
+            0),
+        rating_count=Coalesce(
+            Subquery(reviews.annotate(total=Count('id')).values('total')),
+            0),
+        rating=Subquery(
+            reviews.annotate(avg=Avg('score')).values('avg'),
+            output_field=FloatField()))
+    sync_genre_ratings(title_ids)
+    return updated
+
+
+def top_title_ids(limit: int, min_reviews: int = 1,
+                  category_id: Optional[int] = None,
+                  genre_id: Optional[int] = None) -> List[int]:
+    """
+    id лучших произведений по убыванию рейтинга, при равном рейтинге
+     выше то, у которого больше оценок.
+    Читается обратным проходом по индексу title-category-rating
+     (title-rating без категории, genre-title-rating для жанра)
+     до limit строк: время не зависит от размера категории или жанра.
+    """
+    if genre_id is not None:
+        rows, key = GenreTitle.objects.filter(genre_id=genre_id), 'title_id'
+    else:
+        rows, key = Title.objects.all(), 'id'
+        if category_id is not None:
+            rows = rows.filter(category_id=category_id)
+    return list(rows.filter(rating__isnull=False,
+                            rating_count__gte=min_reviews)
+                .order_by('-rating', '-rating_count', f'-{key}')
+                .values_list(key, flat=True)[:limit])
@@ -0,0 +1,27 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, QuerySet, Value, When
+
+# тот же словарь, что в триггере reviews_title_search_vector
+SEARCH_CONFIG = 'russian'
+
+
+def search_titles(queryset: QuerySet, value: str) -> QuerySet:
+    """
+    Поиск произведений по названию и описанию, сначала самые релевантные.
+    PostgreSQL - по search_vector (GIN-индекс), совпадение в названии
+     весит больше, чем в описании.
+    Остальные базы (локальный запуск на SQLite) - по вхождению подстроки,
+     сначала совпадения в названии.
+    """
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(value, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)).order_by(
+                '-search_rank', 'id')
+    return queryset.filter(
+        Q(name__icontains=value) | Q(description__icontains=value)
+    ).annotate(
+        search_rank=Case(When(name__icontains=value, then=Value(1)),
+                         default=Value(0), output_field=IntegerField())
+    ).order_by('-search_rank', 'id')
@@ -0,0 +1,192 @@
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from api.v1.cache import (ALL_COMMENTS_NAMESPACE, COMMENTS_NAMESPACE,
+                          REVIEWS_NAMESPACE, invalidate)
+from reviews.models import Category, Comment, Genre, Review, Title, Tombstone
+from reviews.rating_utils import update_rating
+
+# текущее удаление вместе с каскадом, см. DeletionBatch
+_batch = ContextVar('deletion_batch', default=None)
+
+# пространства имён кэша API справочников, см. api.v1.cache
+CATALOG_NAMESPACES = {Category: 'categories', Genre: 'genres'}
+
+
+class DeletionBatch:
+    """
+    Одно удаление вместе с каскадом: Django сначала шлёт pre_delete для всех
+     удаляемых строк, потом удаляет их и шлёт post_delete.
+    pre_delete собирает надгробия, оценки удаляемых отзывов, удаляемые
+     произведения и пространства имён кэша. Последний post_delete отзыва
+     или комментария пишет надгробия одним bulk_create и сдвигает рейтинг
+     один раз на произведение, кроме удаляемых, в той же транзакции,
+     что и удаление; каждое поколение кэша сдвигается один раз.
+    Если удаление откатилось, незаконченная порция забывается:
+     откат выбрасывает её колбэк из on_commit транзакции.
+    """
+
+    def __init__(self):
+        self.tombstones = {}
+        self.pending = set()
+        # id произведения: [сдвиг суммы оценок, сдвиг количества]
+        self.ratings = defaultdict(lambda: [0, 0])
+        self.titles = set()
+        self.namespaces = set()
+        transaction.on_commit(self.finish)
+
+    @classmethod
+    def current(cls) -> 'DeletionBatch':
+        batch = _batch.get()
+        if batch is None or not batch.alive():
+            batch = cls()
+            _batch.set(batch)
+        return batch
+
+    def alive(self) -> bool:
+        return any(func == self.finish for _, func
+                   in transaction.get_connection().run_on_commit)
+
+    def finish(self) -> None:
+        if _batch.get() is self:
+            _batch.set(None)
+
+    def add(self, tombstone: Tombstone, instance) -> None:
+        key = (tombstone.kind, tombstone.object_id)
+        self.tombstones[key] = tombstone
+        self.pending.add(key)
+        self.namespaces |= cache_namespaces(instance)
+
+    def add_review(self, review: Review) -> None:
+        self.add(Tombstone(kind=Tombstone.REVIEW, object_id=review.pk,
+                           title_id=review.title_id), review)
+        rating = self.ratings[review.title_id]
+        rating[0] -= review.score
+        rating[1] -= 1
+
+    def deleted(self, kind: str, object_id: int) -> None:
+        self.pending.discard((kind, object_id))
+        if not self.pending:
+            self.write()
+            self.finish()
+
+    def write(self) -> None:
+        self.write_tombstones()
+        for title_id, (score_delta, count_delta) in self.ratings.items():
+            if title_id not in self.titles:
+                update_rating(title_id, score_delta, count_delta)
+        for namespace in self.namespaces:
+            invalidate(namespace)
+
+    def write_tombstones(self) -> None:
+        tombstones = list(self.tombstones.values())
+        titles = {tombstone.object_id: tombstone.title_id
+                  for tombstone in tombstones
+                  if tombstone.kind == Tombstone.REVIEW}
+        # отзывы, удалённые без своих комментариев, ещё в базе
+        missing = {tombstone.review_id for tombstone in tombstones
+                   if tombstone.kind == Tombstone.COMMENT
+                   and tombstone.review_id not in titles}
+        if missing:
+            titles.update(Review.objects.filter(pk__in=missing).values_list(
+                'id', 'title_id'))
+        for tombstone in tombstones:
+            if tombstone.kind == Tombstone.COMMENT:
+                tombstone.title_id = titles[tombstone.review_id]
+        Tombstone.objects.bulk_create(tombstones)
+
+
+def collect_deletion(sender, instance, **kwargs):
+    batch = DeletionBatch.current()
+    if sender is Title:
+        # рейтинг удаляемого произведения не пересчитывается
+        batch.titles.add(instance.pk)
+    elif sender is Review:
+        batch.add_review(instance)
+    else:
+        batch.add(Tombstone(kind=Tombstone.COMMENT, object_id=instance.pk,
+                            review_id=instance.review_id), instance)
+
+
+def write_deletion(sender, instance, **kwargs):
+    batch = _batch.get()
+    if batch is not None:
+        kind = Tombstone.COMMENT if sender is Comment else Tombstone.REVIEW
+        batch.deleted(kind, instance.pk)
+
+
+def review_rating_loaded(sender, instance, raw=False, update_fields=None,
+                         **kwargs):
+    """
+    Произведение и оценка отзыва в базе до сохранения: от них
+     post_save считает сдвиг рейтинга.
+    В транзакции строка блокируется до её конца, и параллельное
+     изменение оценки не сдвинет рейтинг от устаревшего значения.
+    """
+    instance._rating_before = None
+    if (raw or instance._state.adding or update_fields is not None
+            and not {'title', 'score'} & set(update_fields)):
+        return
+    reviews = Review.objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        reviews = reviews.select_for_update()
+    instance._rating_before = reviews.values_list('title_id', 'score').first()
+
+
+def review_rating_saved(sender, instance, created, raw=False, **kwargs):
+    # оценка учитывается при любом сохранении отзыва: из API и из админки
+    if raw:
+        return
+    if created:
+        changes = {instance.title_id: (instance.score, 1)}
+    else:
+        changes = rating_changes(getattr(instance, '_rating_before', None),
+                                 instance)
+    for title_id, (score_delta, count_delta) in changes.items():
+        update_rating(title_id, score_delta, count_delta)
+
+
+def rating_changes(before, review: Review) -> dict:
+    """Сдвиги рейтинга произведений после изменения сохранённого отзыва."""
+    if before is None:
+        return {}
+    title_id, score = before
+    if title_id != review.title_id:
+        return {title_id: (-score, -1), review.title_id: (review.score, 1)}
+    if score != review.score:
+        return {title_id: (review.score - score, 0)}
+    return {}
+
+
+def cache_namespaces(instance) -> set:
+    """Пространства имён кэша API, которые устаревают после записи в объект."""
+    if isinstance(instance, Comment):
+        return {COMMENTS_NAMESPACE.format(review_id=instance.review_id),
+                ALL_COMMENTS_NAMESPACE}
+    if isinstance(instance, Review):
+        # отзыв, перенесённый на другое произведение, - и из старого
+        before = getattr(instance, '_rating_before', None)
+        titles = {instance.title_id, before[0] if before else None} - {None}
+        return {'titles', *(REVIEWS_NAMESPACE.format(title_id=title_id)
+                            for title_id in titles)}
+    if isinstance(instance, Title):
+        return {'titles', REVIEWS_NAMESPACE.format(title_id=instance.pk)}
+    return {CATALOG_NAMESPACES[type(instance)]}
+
+
+def cache_saved(sender, instance, raw=False, **kwargs):
+    """
+    Поколения кэша сдвигаются при любой записи: из API, из админки,
+     из manage.py shell. Удаление отзывов и комментариев, в том числе
+     каскадом, сдвигает их в DeletionBatch.
+    """
+    if not raw:
+        for namespace in cache_namespaces(instance):
+            invalidate(namespace)
+
+
+def cache_deleted(sender, instance, **kwargs):
+    for namespace in cache_namespaces(instance):
+        invalidate(namespace)
@@ -1,9 +1,52 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
+# два файла SQLite: основная база и реплика для тестов ReplicaRouter,
+# реплика включается в тесте через settings.DATABASE_REPLICAS
+TEST_DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': join(root_dir, 'db.sqlite3'),
+        'TEST': {'NAME': join(root_dir, 'test_db.sqlite3')},
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': join(root_dir, 'replica.sqlite3'),
+        'TEST': {'NAME': join(root_dir, 'test_replica.sqlite3')},
+    },
+}
+
 pytest_plugins = [
+    'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings():
+    """
+    Тесты с базой данных гоняем на SQLite, PostgreSQL для них не нужен.
+    Сам модуль настроек не меняем: test_settings проверяет боевой конфиг.
+    """
+    from django.conf import settings
+    from django.db import connections
+
+    settings.DATABASES = TEST_DATABASES
+    connections.__dict__['databases'] = TEST_DATABASES
+    for alias in TEST_DATABASES:
+        if hasattr(connections._connections, alias):
+            connections[alias].close()
+            del connections[alias]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш в памяти процесса переживает откат базы между тестами."""
+    from django.core.cache import cache
+
+    cache.clear()
@@ -0,0 +1,33 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.v1.authentication import access_token_for
+
+
+def token_client(user):
+    client = APIClient()
+    token = access_token_for(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create(
+        username='TestAdmin', email='admin@yamdb.fake', role='admin')
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create(
+        username='TestUser', email='user@yamdb.fake', role='user')
+
+
+@pytest.fixture
+def admin_client(admin):
+    return token_client(admin)
+
+
+@pytest.fixture
+def user_client(user):
+    return token_client(user)
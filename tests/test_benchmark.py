@@ -0,0 +1,119 @@
+import pytest
+from django.core.cache import cache
+
+from api.management.commands._benchmark import (
+    compare, discover_read_paths, percentile, run_benchmark,
+    run_http_benchmark, run_render_benchmark)
+from api.management.commands._seed import seed
+from reviews.models import Title
+
+EXPECTED_STATUS = {
+    'titles_list': 200,
+    'titles_filtered': 200,
+    'reviews_list': 200,
+    'comments_list': 200,
+    'signup': 200,
+    'token': 201,
+    'users_me': 200,
+}
+
+
+class TestPercentile:
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50, (
+            'Проверьте, что p50 считается по ближайшему рангу'
+        )
+        assert percentile(values, 99) == 99
+        assert percentile([7.0], 95) == 7.0, (
+            'Проверьте, что процентиль одного замера - сам замер'
+        )
+
+
+@pytest.mark.django_db
+class TestBenchmark:
+
+    def test_run_benchmark(self):
+        report = run_benchmark(titles=5, users=3, reviews_per_title=2,
+                               comments_per_review=1, requests=3, warmup=1)
+
+        assert report['meta']['dataset']['reviews'] == 10
+        assert set(report['endpoints']) == set(EXPECTED_STATUS), (
+            'Проверьте, что замеряются все основные эндпоинты'
+        )
+        for name, result in report['endpoints'].items():
+            assert result['status'] == EXPECTED_STATUS[name], (
+                f'Проверьте, что запрос {name} в замере выполняется успешно'
+            )
+            assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+            assert result['rps'] > 0
+            assert result['queries'] > 0, (
+                f'Проверьте, что для {name} считаются запросы к базе'
+            )
+
+        # профиль читается и сохраняется, роль берётся из токена
+        assert report['endpoints']['users_me']['queries'] == 2, (
+            'Проверьте, что токен замера содержит роль: права проверяются '
+            'без запроса к базе'
+        )
+
+        changes = compare(report, report)
+        assert changes['titles_list'] == {
+            'p95_ratio': 1.0, 'rps_ratio': 1.0, 'queries_delta': 0}
+
+    def test_run_render_benchmark(self):
+        report = run_render_benchmark(
+            page_sizes=(2, 10), repeats=2, titles=5, users=3,
+            reviews_per_title=2, comments_per_review=1)
+
+        assert set(report['pages']) == {
+            f'{name}_{size}' for name in ('titles', 'reviews', 'comments')
+            for size in (2, 10)}, (
+            'Проверьте, что сериализация замеряется по спискам и размерам '
+            'страницы'
+        )
+        assert report['pages']['titles_10']['rows'] == 5
+        for result in report['pages'].values():
+            assert result['model_ms'] > 0 and result['fast_ms'] > 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestHttpBenchmark:
+
+    def test_discover_read_paths(self, live_server):
+        Title.objects.create(name='Без отзывов', year=2000)
+        with pytest.raises(ValueError):
+            discover_read_paths(live_server.url, timeout=5)
+
+        seed(titles=2, users=2, reviews_per_title=1, comments_per_review=1)
+        # seed пишет в базу мимо API, кэш списка сбрасываем сами
+        cache.clear()
+        paths = discover_read_paths(live_server.url, timeout=5)
+
+        assert set(paths) == {'titles_list', 'title_detail', 'reviews_list',
+                              'comments_list'}, (
+            'Проверьте, что пути берутся из данных сервера'
+        )
+        assert paths['comments_list'].startswith(paths['reviews_list'])
+
+    def test_run_http_benchmark(self, live_server):
+        seed(titles=2, users=2, reviews_per_title=1, comments_per_review=1)
+
+        report = run_http_benchmark(live_server.url + '/', concurrency=2,
+                                    requests=4, timeout=5, label='gthread')
+
+        assert report['meta']['label'] == 'gthread'
+        assert report['meta']['url'] == live_server.url
+        assert set(report['endpoints']) == {
+            'titles_list', 'title_detail', 'reviews_list', 'comments_list'}
+        for name, result in report['endpoints'].items():
+            assert (result['status'], result['errors']) == (200, 0), (
+                f'Проверьте, что запросы {name} по сети успешны'
+            )
+            assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+            assert result['rps'] > 0
+        assert set(compare(report, report)['titles_list']) == {
+            'p95_ratio', 'rps_ratio'}, (
+            'Проверьте, что прогоны по сети сравниваются без числа SQL'
+        )
@@ -0,0 +1,194 @@
+import pytest
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+from rest_framework.viewsets import ModelViewSet
+
+from api.v1.bulk import BulkWriteMixin
+from reviews.models import Category, Genre, GenreTitle, Title
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Книги', slug='books')
+    genres = [Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+              for i in range(3)]
+    return category, genres
+
+
+def title_item(number, category='books', genre=('genre-0', 'genre-1')):
+    return {'name': f'Произведение {number}', 'year': 2000,
+            'category': category, 'genre': list(genre)}
+
+
+class GenreByIdSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Genre
+        fields = ('id', 'name', 'slug')
+
+
+class PlainGenreViewSet(BulkWriteMixin, ModelViewSet):
+    """Вьюсет только с bulk_serializer_class: работают умолчания миксина."""
+    queryset = Genre.objects.all()
+    serializer_class = GenreByIdSerializer
+    bulk_serializer_class = GenreByIdSerializer
+    permission_classes = ()
+    cache_namespace = 'genres'
+
+
+def plain_bulk(method, items):
+    request = getattr(APIRequestFactory(), method)(
+        '/bulk/', items, format='json')
+    return PlainGenreViewSet.as_view({method: 'bulk'})(request)
+
+
+@pytest.mark.django_db
+class TestTitlesBulk:
+
+    def test_bulk_create(self, admin_client, catalog,
+                         django_assert_max_num_queries):
+        items = [title_item(number) for number in range(50)]
+
+        # категории + жанры + 50 INSERT (SQLite без RETURNING)
+        # + связи + ответ (3) + savepoint/transaction
+        with django_assert_max_num_queries(60):
+            response = admin_client.post(
+                '/api/v1/titles/bulk/', items, format='json')
+
+        assert response.status_code == 201, (
+            'Проверьте, что POST /titles/bulk/ создаёт список произведений'
+        )
+        assert len(response.json()) == 50
+        assert response.json()[0]['genre'] == ['genre-0', 'genre-1']
+        assert Title.objects.count() == 50
+        assert GenreTitle.objects.count() == 100
+
+    def test_bulk_create_repeated_genre(self, admin_client, catalog):
+        item = title_item(0, genre=('genre-0', 'genre-0', 'genre-1'))
+
+        response = admin_client.post('/api/v1/titles/bulk/', [item],
+                                     format='json')
+
+        assert response.status_code == 201
+        assert GenreTitle.objects.count() == 2, (
+            'Проверьте, что повторённый жанр даёт одну связь'
+        )
+
+    def test_bulk_create_is_atomic(self, admin_client, catalog):
+        items = [title_item(1), title_item(2, category='unknown'),
+                 title_item(3, genre=('genre-0', 'missing'))]
+
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', items, format='json')
+
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}, (
+            'Проверьте, что у корректных элементов ошибок нет'
+        )
+        assert 'category' in errors[1]
+        assert 'genre' in errors[2]
+        assert Title.objects.count() == 0, (
+            'Проверьте, что при ошибке не создаётся ни одно произведение'
+        )
+
+    def test_bulk_update(self, admin_client, catalog):
+        _, genres = catalog
+        titles = [Title.objects.create(name=f'Старое {i}', year=1990,
+                                       category=catalog[0])
+                  for i in range(2)]
+        GenreTitle.objects.create(title=titles[0], genre=genres[0])
+
+        response = admin_client.patch('/api/v1/titles/bulk/', [
+            {'id': titles[0].id, 'genre': ['genre-2']},
+            {'id': titles[1].id, 'name': 'Новое', 'year': 2001},
+        ], format='json')
+
+        assert response.status_code == 200
+        assert response.json()[0]['genre'] == ['genre-2'], (
+            'Проверьте, что PATCH заменяет жанры произведения'
+        )
+        titles[1].refresh_from_db()
+        assert (titles[1].name, titles[1].year) == ('Новое', 2001)
+
+        response = admin_client.patch('/api/v1/titles/bulk/', [
+            {'id': 0, 'name': 'Нет такого'}, {'name': 'Без id'}],
+            format='json')
+        assert response.status_code == 400
+        assert all('id' in error for error in response.json())
+
+    def test_bulk_admin_only(self, user_client, catalog):
+        response = user_client.post(
+            '/api/v1/titles/bulk/', [title_item(1)], format='json')
+
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db
+class TestSlugNameBulk:
+
+    @pytest.mark.parametrize('resource, model',
+                             (('genres', Genre), ('categories', Category)))
+    def test_bulk_create_and_rename(self, admin_client, resource, model):
+        items = [{'name': f'Имя {i}', 'slug': f'slug-{i}'} for i in range(3)]
+
+        response = admin_client.post(
+            f'/api/v1/{resource}/bulk/', items, format='json')
+        assert response.status_code == 201
+        assert model.objects.count() == 3
+
+        response = admin_client.post(f'/api/v1/{resource}/bulk/', [
+            {'name': 'Свежее', 'slug': 'fresh'},
+            {'name': 'Имя 0', 'slug': 'other'},
+            {'name': 'Дубль', 'slug': 'slug-1'},
+        ], format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'name' in errors[1] and 'slug' in errors[2], (
+            'Проверьте, что занятые name и slug возвращаются как ошибки'
+        )
+        assert model.objects.count() == 3
+
+        response = admin_client.patch(f'/api/v1/{resource}/bulk/', [
+            {'slug': 'slug-0', 'name': 'Переименовано'}], format='json')
+        assert response.status_code == 200
+        assert model.objects.get(slug='slug-0').name == 'Переименовано'
+
+    @pytest.mark.parametrize('resource', ('genres', 'categories'))
+    def test_bulk_slug_reserved(self, admin_client, resource):
+        response = admin_client.post(
+            f'/api/v1/{resource}/', {'name': 'Оптом', 'slug': 'bulk'})
+        assert response.status_code == 400, (
+            'Проверьте, что slug bulk нельзя занять: '
+            f'/{resource}/bulk/ - адрес пакетной записи'
+        )
+        assert 'slug' in response.json()
+
+        response = admin_client.post(f'/api/v1/{resource}/bulk/', [
+            {'name': 'Оптом', 'slug': 'bulk'}], format='json')
+        assert response.status_code == 400
+        assert 'slug' in response.json()[0], (
+            'Проверьте, что пакетная запись тоже не занимает slug bulk'
+        )
+
+
+@pytest.mark.django_db
+class TestBulkDefaults:
+
+    def test_create_and_update_by_pk(self):
+        created = plain_bulk('post', [{'name': 'Драма', 'slug': 'drama'},
+                                      {'name': 'Рок', 'slug': 'rock'}])
+        assert created.status_code == 201
+        rock = Genre.objects.get(slug='rock')
+
+        updated = plain_bulk('patch', [{'id': rock.id, 'name': 'Рок-н-ролл'}])
+
+        assert updated.status_code == 200
+        assert updated.data == [
+            {'id': rock.id, 'name': 'Рок-н-ролл', 'slug': 'rock'}], (
+            'Проверьте, что BulkWriteMixin по умолчанию изменяет объекты '
+            'по lookup_field'
+        )
+        assert Genre.objects.get(slug='drama').name == 'Драма'
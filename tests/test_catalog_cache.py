@@ -0,0 +1,61 @@
+import pytest
+
+from reviews.models import Title
+
+
+@pytest.mark.django_db
+class TestCatalogCache:
+
+    def test_cached_list_skips_database(self, client,
+                                        django_assert_num_queries):
+        Title.objects.create(name='Произведение', year=2000)
+        first = client.get('/api/v1/titles/?year=2000')
+
+        with django_assert_num_queries(0):
+            second = client.get('/api/v1/titles/?year=2000')
+
+        assert second.json() == first.json(), (
+            'Проверьте, что из кэша отдаётся тот же ответ'
+        )
+
+    def test_query_string_is_part_of_key(self, client):
+        Title.objects.create(name='Произведение', year=2000)
+        client.get('/api/v1/titles/?year=2000')
+
+        response = client.get('/api/v1/titles/?year=1999')
+
+        assert response.json()['count'] == 0, (
+            'Проверьте, что фильтры входят в ключ кэша'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_invalidates_titles(self, admin_client, client):
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/categories/')
+
+        admin_client.post('/api/v1/categories/',
+                          {'name': 'Фильмы', 'slug': 'movie'})
+        response = admin_client.post(
+            '/api/v1/titles/',
+            {'name': 'Фильм', 'year': 2000, 'category': 'movie'})
+
+        assert response.status_code == 201
+        assert client.get('/api/v1/categories/').json()['count'] == 1, (
+            'Проверьте, что создание категории сбрасывает кэш категорий'
+        )
+        assert client.get('/api/v1/titles/').json()['count'] == 1, (
+            'Проверьте, что создание произведения сбрасывает кэш произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_review_invalidates_rating(self, user_client, client):
+        title = Title.objects.create(name='Произведение', year=2000)
+        client.get(f'/api/v1/titles/{title.id}/')
+
+        user_client.post(f'/api/v1/titles/{title.id}/reviews/',
+                         {'text': 'Отзыв', 'score': 7})
+
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.json()['rating'] == 7, (
+            'Проверьте, что отзыв сбрасывает кэш рейтинга произведения'
+        )
@@ -0,0 +1,184 @@
+import pytest
+from django.db import connection
+from django.db.models.signals import pre_delete
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Comment, Review, Title, Tombstone
+
+URL = '/api/v1/changes/'
+
+
+@pytest.fixture(autouse=True)
+def no_safety_lag(settings):
+    settings.CHANGES_SAFETY_LAG = 0
+
+
+@pytest.fixture
+def title():
+    category = Category.objects.create(name='Книги', slug='books')
+    return Title.objects.create(name='Идиот', year=1869, category=category)
+
+
+def read_all(client, cursor=None, **params):
+    """Все страницы ленты: список изменений и курсор для следующего опроса."""
+    results = []
+    while True:
+        query = dict(params, cursor=cursor) if cursor else params
+        data = client.get(URL, query).json()
+        results += data['results']
+        cursor = data['next']
+        if not data['has_more']:
+            return results, cursor
+
+
+@pytest.mark.django_db
+class TestChangesFeed:
+
+    def test_created_updated_and_deleted(self, title, user, user_client):
+        review = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Хорошо', 'score': 8}, format='json').json()
+        comment = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/{review["id"]}/comments/',
+            data={'text': 'Согласен'}, format='json').json()
+        client = APIClient()
+
+        changes, cursor = read_all(client)
+        assert [(change['type'], change['id']) for change in changes] == [
+            ('review', review['id']), ('comment', comment['id'])], (
+            'Проверьте, что лента содержит новые отзывы и комментарии'
+        )
+        assert changes[0]['data']['text'] == 'Хорошо'
+
+        user_client.patch(
+            f'/api/v1/titles/{title.id}/reviews/{review["id"]}/',
+            data={'text': 'Отлично'}, format='json')
+        changes, cursor = read_all(client, cursor)
+        assert [(change['type'], change['data']['text'])
+                for change in changes] == [('review', 'Отлично')], (
+            'Проверьте, что после курсора отдаются только изменения'
+        )
+
+        user_client.delete(
+            f'/api/v1/titles/{title.id}/reviews/{review["id"]}/')
+        changes, cursor = read_all(client, cursor)
+        assert {(change['type'], change['id'], change['action'])
+                for change in changes} == {
+            ('review', review['id'], 'delete'),
+            ('comment', comment['id'], 'delete')}, (
+            'Проверьте, что удаление отзыва даёт tombstone и для '
+            'его комментариев'
+        )
+        assert all(change['title_id'] == title.id for change in changes)
+
+        assert read_all(client, cursor) == ([], cursor), (
+            'Проверьте, что без новых изменений курсор не меняется'
+        )
+
+    def test_pages_by_cursor(self, title, django_user_model):
+        for i in range(5):
+            author = django_user_model.objects.create(
+                username=f'critic{i}', email=f'critic{i}@yamdb.fake')
+            review = Review.objects.create(
+                title=title, author=author, text=f'отзыв {i}', score=5)
+            Comment.objects.create(review=review, author=author, text='+')
+        client = APIClient()
+
+        changes, _ = read_all(client, limit=3)
+
+        assert len(changes) == 10
+        assert len({(change['type'], change['id'])
+                    for change in changes}) == 10, (
+            'Проверьте, что страницы ленты не повторяют и не теряют строки'
+        )
+
+    def test_title_filter_and_cascade(self, title, user, admin_client):
+        review = Review.objects.create(title=title, author=user, text='x',
+                                       score=1)
+        Comment.objects.create(review=review, author=user, text='y')
+        other = Title.objects.create(name='Бесы', year=1872)
+
+        admin_client.delete(f'/api/v1/titles/{title.id}/')
+
+        assert set(Tombstone.objects.values_list('kind', 'title_id')) == {
+            ('review', title.id), ('comment', title.id)}
+        changes, _ = read_all(APIClient(), title=other.id)
+        assert changes == []
+
+    def test_invalid_cursor(self):
+        response = APIClient().get(URL, {'cursor': 'broken'})
+
+        assert response.status_code == 400
+
+
+def tombstone_inserts(queries):
+    return [query['sql'] for query in queries
+            if query['sql'].startswith('INSERT')
+            and 'reviews_tombstone' in query['sql']]
+
+
+@pytest.fixture
+def discussed(title, django_user_model):
+    """Три отзыва на произведение, у каждого по два комментария."""
+    for i in range(3):
+        author = django_user_model.objects.create(
+            username=f'critic{i}', email=f'critic{i}@yamdb.fake')
+        review = Review.objects.create(title=title, author=author, text='x',
+                                       score=5)
+        for _ in range(2):
+            Comment.objects.create(review=review, author=author, text='y')
+    return title
+
+
+class TestTombstones:
+
+    @pytest.mark.django_db
+    def test_cascade_single_insert(self, discussed):
+        title_id = discussed.id
+        with CaptureQueriesContext(connection) as queries:
+            discussed.delete()
+
+        assert len(tombstone_inserts(queries)) == 1, (
+            'Проверьте, что надгробия удаления и каскада пишутся '
+            'одним bulk_create'
+        )
+        assert Tombstone.objects.filter(
+            kind=Tombstone.REVIEW, title_id=title_id).count() == 3
+        assert Tombstone.objects.filter(
+            kind=Tombstone.COMMENT, title_id=title_id).count() == 6
+
+    @pytest.mark.django_db
+    def test_comment_without_review(self, discussed):
+        comment = Comment.objects.first()
+        comment_id = comment.id
+
+        comment.delete()
+
+        assert list(Tombstone.objects.values_list(
+            'kind', 'object_id', 'title_id')) == [
+            ('comment', comment_id, discussed.id)], (
+            'Проверьте, что надгробие комментария знает произведение'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_delete_forgotten(self, discussed):
+        def refuse(sender, instance, **kwargs):
+            raise RuntimeError('удаление запрещено')
+
+        pre_delete.connect(refuse, sender=Title)
+        try:
+            with pytest.raises(RuntimeError):
+                discussed.delete()
+        finally:
+            pre_delete.disconnect(refuse, sender=Title)
+        comment = Comment.objects.first()
+        comment_id = comment.id
+        comment.delete()
+
+        assert list(Tombstone.objects.values_list('kind', 'object_id')) == [
+            ('comment', comment_id)], (
+            'Проверьте, что надгробия откатившегося удаления не пишутся '
+            'со следующим'
+        )
+        assert Review.objects.count() == 3
@@ -0,0 +1,186 @@
+import pytest
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from api.v1 import cache as generations
+from reviews.models import Category, Comment, Review, Title
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(settings, tmp_path):
+    """Общий для процессов кэш: файлы в одной папке вместо redis."""
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path)}}
+    return str(tmp_path)
+
+
+def post_review(client, review, score=7):
+    return client.post(f'/api/v1/titles/{review.title_id}/reviews/',
+                       {'text': 'Ещё отзыв', 'score': score})
+
+
+@pytest.fixture
+def review(user):
+    title = Title.objects.create(name='Произведение', year=2000)
+    review = Review.objects.create(
+        title=title, author=user, text='Отзыв', score=5)
+    Comment.objects.create(review=review, author=user, text='Комментарий')
+    return review
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_not_modified_without_queries(self, review,
+                                          django_assert_num_queries):
+        client = APIClient()
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert etag.startswith('W/"'), 'Проверьте, что ETag слабый'
+        assert 'Last-Modified' in response
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что совпавший If-None-Match получает 304 без базы'
+        )
+        assert response['ETag'] == etag
+
+    def test_if_modified_since(self, review):
+        client = APIClient()
+        url = '/api/v1/titles/'
+        last_modified = client.get(url)['Last-Modified']
+
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0))
+        assert response.status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalGetInvalidation:
+
+    def test_review_write_changes_etag(self, review, user_client,
+                                       admin_client):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        etag = APIClient().get(url)['ETag']
+
+        post_review(admin_client, review)
+
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый отзыв меняет ETag списка отзывов'
+        )
+        assert response['ETag'] != etag
+
+    def test_comment_etag_changes_on_review_delete(self, review,
+                                                   admin_client):
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.id}/comments/')
+        etag = APIClient().get(url)['ETag']
+
+        admin_client.delete(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/')
+
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 404, (
+            'Проверьте, что после удаления отзыва старый ETag не даёт 304'
+        )
+
+    def test_comment_etag_changes_on_author_delete(self, review, user,
+                                                   admin_client):
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.id}/comments/')
+        etag = APIClient().get(url)['ETag']
+
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 404, (
+            'Проверьте, что каскадное удаление с автором меняет ETag '
+            'комментариев'
+        )
+
+    def test_write_outside_api(self, review):
+        client = APIClient()
+        reviews_url = f'/api/v1/titles/{review.title_id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        etags = {url: client.get(url)['ETag']
+                 for url in (reviews_url, comments_url, '/api/v1/titles/')}
+
+        # правка в админке
+        review.text = 'Исправленный отзыв'
+        review.save()
+        comment = review.comments.get()
+        comment.text = 'Исправленный комментарий'
+        comment.save()
+
+        for url, etag in etags.items():
+            assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == (
+                200), (
+                'Проверьте, что запись мимо API меняет ETag: ' + url
+            )
+
+    def test_category_changed_outside_api(self, review):
+        category = Category.objects.create(name='Книги', slug='books')
+        client = APIClient()
+        etag = client.get('/api/v1/categories/')['ETag']
+
+        category.name = 'Романы'
+        category.save()
+
+        response = client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['results'][0]['name'] == 'Романы', (
+            'Проверьте, что правка категории мимо API сбрасывает кэш'
+        )
+
+    def test_write_in_another_process(self, review, admin_client,
+                                      shared_cache, monkeypatch):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        etag = APIClient().get(url)['ETag']
+
+        # второй процесс: свой экземпляр кэша на тех же файлах
+        monkeypatch.setattr(generations, 'cache',
+                            FileBasedCache(shared_cache, {}))
+        post_review(admin_client, review)
+        monkeypatch.undo()
+
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что запись в другом процессе меняет ETag'
+        )
+
+
+@pytest.mark.django_db
+class TestProcessLocalCache:
+
+    def test_no_etag(self, review, admin_client, settings, monkeypatch):
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        first = APIClient().get(url)
+        stale_etag = 'W/"{}"'.format(generations.get_generation(
+            generations.REVIEWS_NAMESPACE.format(title_id=review.title_id)))
+
+        # второй процесс со своим кэшем в памяти: поколение здесь не сдвинется
+        monkeypatch.setattr(generations, 'cache', LocMemCache('other', {}))
+        post_review(admin_client, review)
+        monkeypatch.undo()
+
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=stale_etag)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 2, (
+            'Проверьте, что с кэшем в памяти процесса запись из другого '
+            'процесса видна сразу'
+        )
+        assert 'ETag' not in first and 'Last-Modified' not in first, (
+            'Проверьте, что с кэшем в памяти процесса ETag не выдаётся'
+        )
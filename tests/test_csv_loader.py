@@ -0,0 +1,268 @@
+import json
+import logging
+from concurrent.futures import Future
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.management.commands import _loader
+from api.management.commands._loader import (load_csv, load_files,
+                                             load_levels, read_manifest)
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def log_file(settings, tmp_path):
+    settings.CSV_TO_DB_LOG_FILE = str(tmp_path / 'csv_to_db_log.log')
+    return settings.CSV_TO_DB_LOG_FILE
+
+
+def write_csv(directory, name, *lines):
+    path = directory / name
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def genre_rows(count, start=1):
+    return [f'{i},Жанр {i},genre-{i}' for i in range(start, start + count)]
+
+
+def inserts(queries, table):
+    return [query for query in queries
+            if query['sql'].startswith('INSERT')
+            and f'INTO "{table}"' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestLoadCsv:
+
+    @pytest.mark.parametrize('rows, batch_size, batches', (
+        (5, 2, 3), (4, 2, 2), (2, 5, 1), (0, 2, 0)))
+    def test_batch_boundaries(self, tmp_path, rows, batch_size, batches):
+        path = write_csv(tmp_path, 'genre.csv', 'id,name,slug',
+                         *genre_rows(rows))
+
+        with CaptureQueriesContext(connection) as queries:
+            total = load_csv(Genre, path, batch_size)
+
+        assert total == rows == Genre.objects.count(), (
+            'Проверьте, что load_csv загружает все строки файла'
+        )
+        assert len(inserts(queries, 'reviews_genre')) == batches, (
+            'Проверьте, что строки пишутся порциями по batch_size'
+        )
+
+    def test_sequence_after_load(self, tmp_path):
+        path = write_csv(tmp_path, 'genre.csv', 'id,name,slug',
+                         *genre_rows(3, start=10))
+
+        load_csv(Genre, path, 2)
+
+        assert Genre.objects.create(name='Новый', slug='new').id == 13, (
+            'Проверьте, что счётчик первичного ключа сдвигается после загрузки'
+        )
+
+    @pytest.mark.parametrize('column', ('category', 'category_id'))
+    def test_foreign_key_header(self, tmp_path, column):
+        Category.objects.create(id=7, name='Книги', slug='books')
+        path = write_csv(tmp_path, 'titles.csv', f'id,name,year,{column}',
+                         '1,Идиот,1869,7', '2,Без категории,1900,')
+
+        load_csv(Title, path, 10)
+
+        assert dict(Title.objects.values_list('id', 'category_id')) == {
+            1: 7, 2: None}, (
+            'Проверьте, что внешний ключ читается из столбца category '
+            'и category_id, пустое значение - NULL'
+        )
+
+
+@pytest.mark.django_db
+class TestCsvToDb:
+
+    def test_on_conflict_ignore(self, tmp_path):
+        Genre.objects.create(id=2, name='Жанр 2', slug='genre-2')
+        path = write_csv(tmp_path, 'genre.csv', 'id,name,slug',
+                         *genre_rows(3))
+
+        call_command('csv_to_db', path=path, app_name='reviews',
+                     model_name='Genre', batch_size=2)
+
+        assert Genre.objects.count() == 3, (
+            'Проверьте, что с --on_conflict ignore существующие строки '
+            'пропускаются, а остальные загружаются'
+        )
+
+    def test_log_file(self, tmp_path, log_file):
+        handlers = list(logging.getLogger().handlers)
+        path = write_csv(tmp_path, 'genre.csv', 'id,name,slug',
+                         *genre_rows(1))
+
+        call_command('csv_to_db', path=path, app_name='reviews',
+                     model_name='Genre')
+
+        with open(log_file, encoding='utf-8') as file:
+            assert 'успешно сохранены' in file.read(), (
+                'Проверьте, что команда пишет лог в CSV_TO_DB_LOG_FILE'
+            )
+        assert logging.getLogger().handlers == handlers, (
+            'Проверьте, что обработчики лога снимаются после команды'
+        )
+
+    def test_on_conflict_fail(self, tmp_path):
+        Genre.objects.create(id=3, name='Жанр 3', slug='genre-3')
+        path = write_csv(tmp_path, 'genre.csv', 'id,name,slug',
+                         *genre_rows(4))
+
+        call_command('csv_to_db', path=path, app_name='reviews',
+                     model_name='Genre', batch_size=2, on_conflict='fail')
+
+        assert sorted(Genre.objects.values_list('id', flat=True)) == [
+            1, 2, 3], (
+            'Проверьте, что с --on_conflict fail загрузка останавливается '
+            'на порции с конфликтом и эта порция откатывается'
+        )
+
+    def test_ratings_after_reviews(self, tmp_path, user, admin):
+        Title.objects.create(id=1, name='Идиот', year=1869)
+        path = write_csv(
+            tmp_path, 'review.csv', 'id,title_id,text,author,score,pub_date',
+            f'1,1,отзыв,{user.id},9,2019-09-24T21:08:21.567Z',
+            f'2,1,отзыв,{admin.id},4,2019-09-24T21:08:21.567Z')
+
+        call_command('csv_to_db', load=[f'reviews.Review={path}'])
+
+        title = Title.objects.get()
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            13, 2, 6.5), (
+            'Проверьте, что после загрузки отзывов рейтинг пересчитывается'
+        )
+        assert Review.objects.filter(
+            pub_date__year=2019).count() == 2, (
+            'Проверьте, что даты отзывов берутся из файла'
+        )
+
+
+def title_indexes():
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(
+            cursor, Title._meta.db_table))
+
+
+def catalog_dir(directory):
+    """Папка выгрузки с именами файлов по умолчанию, без manifest.json."""
+    write_csv(directory, 'category.csv', 'id,name,slug', '1,Книги,books')
+    write_csv(directory, 'genre.csv', 'id,name,slug', *genre_rows(2))
+    write_csv(directory, 'titles.csv', 'id,name,year,category',
+              '1,Идиот,1869,1', '2,Бесы,1872,1')
+    write_csv(directory, 'genre_title.csv', 'id,title_id,genre_id',
+              '1,1,1', '2,1,2', '3,2,1')
+    write_csv(directory, 'notes.csv', 'id,text', '1,не загружается')
+    return directory
+
+
+class InProcessPool:
+    """ProcessPoolExecutor, выполняющий задачи сразу в этом процессе."""
+
+    def __init__(self, max_workers, initializer):
+        self.submitted = []
+        InProcessPool.last = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, label, *args):
+        self.submitted.append(label)
+        future = Future()
+        future.set_result(function(label, *args))
+        return future
+
+
+class TestLoadPlan:
+
+    def test_levels(self):
+        levels = load_levels((Comment, Review, GenreTitle, Title, Genre,
+                              Category, User))
+
+        assert [set(level) for level in levels] == [
+            {Genre, Category, User}, {Title}, {Review, GenreTitle},
+            {Comment}], (
+            'Проверьте, что модели уровня ссылаются только на '
+            'предыдущие уровни'
+        )
+        assert load_levels((Comment, Title)) == [[Comment, Title]], (
+            'Проверьте, что учитываются только связи загружаемых моделей'
+        )
+
+    def test_default_file_names(self, tmp_path):
+        files = read_manifest(str(catalog_dir(tmp_path)))
+
+        assert files == {
+            Category: str(tmp_path / 'category.csv'),
+            Genre: str(tmp_path / 'genre.csv'),
+            Title: str(tmp_path / 'titles.csv'),
+            GenreTitle: str(tmp_path / 'genre_title.csv')}, (
+            'Проверьте, что без manifest.json берутся известные '
+            'имена файлов, найденные в папке'
+        )
+
+    def test_manifest(self, tmp_path):
+        catalog_dir(tmp_path)
+        (tmp_path / 'manifest.json').write_text(
+            json.dumps({'reviews.Genre': 'notes.csv'}), encoding='utf-8')
+
+        assert read_manifest(str(tmp_path)) == {
+            Genre: str(tmp_path / 'notes.csv')}, (
+            'Проверьте, что manifest.json задаёт модели и файлы'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadFiles:
+
+    def test_indexes_restored_after_failure(self, tmp_path, monkeypatch):
+        files = read_manifest(str(catalog_dir(tmp_path)))
+        indexes_during_load = []
+
+        def broken_load(model, *args):
+            indexes_during_load.append(title_indexes())
+            raise ValueError('порция не загрузилась')
+
+        monkeypatch.setattr(_loader, 'load_csv', broken_load)
+        with pytest.raises(ValueError):
+            load_files(files, 10)
+
+        assert 'title-rating' not in indexes_during_load[0], (
+            'Проверьте, что индексы снимаются на время загрузки'
+        )
+        assert {'title-rating', 'title-category-rating'} <= (
+            title_indexes()), (
+            'Проверьте, что индексы строятся заново, даже если загрузка '
+            'упала'
+        )
+
+    def test_parallel_levels(self, tmp_path, monkeypatch):
+        # пул выполняет задачи в этом процессе, SQLite выдаём за PostgreSQL
+        monkeypatch.setattr(_loader, 'ProcessPoolExecutor', InProcessPool)
+        monkeypatch.setattr(connection, 'vendor', 'postgresql')
+        monkeypatch.setattr(_loader.connections, 'close_all', lambda: None)
+
+        call_command('csv_to_db', dir=str(catalog_dir(tmp_path)), workers=3)
+
+        submitted = InProcessPool.last.submitted
+        assert set(submitted[:2]) == {'reviews.Category', 'reviews.Genre'}
+        assert submitted[2:] == ['reviews.Title', 'reviews.GenreTitle'], (
+            'Проверьте, что уровни грузятся по порядку внешних ключей'
+        )
+        assert sorted(GenreTitle.objects.values_list(
+            'title__name', 'genre__slug')) == [
+            ('Бесы', 'genre-1'), ('Идиот', 'genre-1'), ('Идиот', 'genre-2')]
+        assert 'title-rating' in title_indexes()
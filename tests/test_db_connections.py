@@ -0,0 +1,210 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.db_connections import (check_connections, get_connection_stats,
+                                reset_connection_stats)
+from api.db_pool import pool as pool_module
+from api.db_pool.base import is_usable
+from api.db_pool.pool import ConnectionPool, PoolTimeoutError
+from api_yamdb import settings as project_settings
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def connection_stats():
+    reset_connection_stats()
+    yield
+    reset_connection_stats()
+
+
+class TestConnectionPool:
+
+    def test_reuses_released_connection(self):
+        pool = ConnectionPool('pool', max_size=2, timeout=1)
+
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        second = pool.acquire(FakeConnection)
+
+        assert second is first, (
+            'Проверьте, что пул выдаёт возвращённое соединение повторно'
+        )
+        stats = get_connection_stats()['databases']['pool']
+        assert stats['opened'] == 1 and stats['checkouts'] == 2
+
+    def test_waits_for_free_slot(self):
+        pool = ConnectionPool('pool', max_size=1, timeout=0.05)
+        pool.acquire(FakeConnection)
+
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire(FakeConnection)
+
+        stats = get_connection_stats()['databases']['pool']
+        assert stats['timeouts'] == 1, (
+            'Проверьте, что пул считает превышения времени ожидания'
+        )
+
+    def test_replaces_unusable_connection(self):
+        pool = ConnectionPool('pool', max_size=1, timeout=1,
+                              check=lambda conn: False, check_after=0)
+        broken = pool.acquire(FakeConnection)
+        pool.release(broken)
+
+        fresh = pool.acquire(FakeConnection)
+
+        assert fresh is not broken and broken.closed, (
+            'Проверьте, что непрошедшее проверку соединение закрывается'
+        )
+        stats = get_connection_stats()['databases']['pool']
+        assert stats['unusable'] == 1 and stats['closed'] == 1
+
+    def test_checks_only_idle_connections(self, monkeypatch):
+        checks = []
+        pool = ConnectionPool('pool', max_size=1, timeout=1,
+                              check=lambda conn: checks.append(conn) or True,
+                              check_after=30)
+        now = [1000.0]
+        monkeypatch.setattr(pool_module.time, 'monotonic', lambda: now[0])
+        connection = pool.acquire(FakeConnection)
+
+        pool.release(connection)
+        now[0] += 5
+        pool.release(pool.acquire(FakeConnection))
+        assert checks == [], (
+            'Проверьте, что недавно возвращённое соединение выдаётся '
+            'без SELECT 1'
+        )
+        now[0] += 60
+        assert pool.acquire(FakeConnection) is connection
+        assert checks == [connection], (
+            'Проверьте, что простоявшее соединение проверяется'
+        )
+
+    def test_health_check_closes_cursor(self):
+        cursors = []
+
+        class Cursor:
+            closed = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                self.closed = True
+
+            def execute(self, sql):
+                cursors.append(self)
+
+        class PooledConnection(FakeConnection):
+
+            def cursor(self):
+                return Cursor()
+
+        assert is_usable(PooledConnection())
+        assert [cursor.closed for cursor in cursors] == [True], (
+            'Проверьте, что проверка соединения закрывает курсор'
+        )
+
+    def test_discarded_connection_frees_slot(self):
+        pool = ConnectionPool('pool', max_size=1, timeout=0.05)
+        broken = pool.acquire(FakeConnection)
+        pool.release(broken, discard=True)
+
+        assert pool.acquire(FakeConnection) is not broken
+        assert broken.closed and pool.idle == 0
+
+
+class TestConnectionSettings:
+
+    def test_persistent_connections(self):
+        database = project_settings.DATABASES['default']
+
+        assert database['CONN_MAX_AGE'] > 0, (
+            'Проверьте, что соединения с базой переиспользуются между '
+            'запросами'
+        )
+        assert database['CONN_HEALTH_CHECKS'], (
+            'Проверьте, что постоянные соединения проверяются перед запросом'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestHealthChecks:
+
+    def test_unusable_connection_replaced_on_first_query(self,
+                                                        monkeypatch):
+        monkeypatch.setitem(connection.settings_dict,
+                            'CONN_HEALTH_CHECKS', True)
+        connection.ensure_connection()
+        broken = connection.connection
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+
+        check_connections(sender=None)
+        assert connection.connection is broken, (
+            'Проверьте, что соединение проверяется не в начале запроса, '
+            'а перед первым SQL'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        assert connection.connection is not broken, (
+            'Проверьте, что оборванное соединение заменяется до первого SQL'
+        )
+        stats = get_connection_stats()
+        assert stats['databases']['default']['unusable'] == 1
+        assert stats['requests'] == 1
+
+    def test_cache_hit_without_health_check(self, client, monkeypatch):
+        monkeypatch.setitem(connection.settings_dict,
+                            'CONN_HEALTH_CHECKS', True)
+        checks = []
+        monkeypatch.setattr(connection, 'is_usable',
+                            lambda: checks.append(1) or True)
+        client.get('/api/v1/categories/')
+        checks.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/categories/')
+
+        assert response.status_code == 200
+        assert not queries and not checks, (
+            'Проверьте, что ответ из кэша не проверяет соединение '
+            'и не обращается к базе'
+        )
+        client.get('/api/v1/genres/')
+        assert checks == [1], (
+            'Проверьте, что соединение проверяется раз за запрос с SQL'
+        )
+
+    def test_connection_churn_counted(self, client):
+        connection.close()
+
+        client.get('/api/v1/categories/')
+
+        stats = get_connection_stats()
+        assert stats['databases']['default']['opened'] >= 1, (
+            'Проверьте, что новые соединения считаются'
+        )
+        assert stats['requests'] == 1
+
+
+@pytest.mark.django_db
+class TestConnectionStatsView:
+
+    def test_admin_only(self, admin_client, user_client):
+        url = '/api/v1/profiling/connections/'
+
+        assert user_client.get(url).status_code == 403
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        assert set(response.json()) == {'requests', 'databases'}
+        assert admin_client.delete(url).status_code == 204
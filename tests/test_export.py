@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import Category, Comment, Review, Title
+
+
+@pytest.fixture
+def reviews(user, admin):
+    category = Category.objects.create(name='Книги', slug='books')
+    titles = [Title.objects.create(name=f'Книга {i}', year=2000,
+                                   category=category) for i in range(2)]
+    result = []
+    for title in titles:
+        for author, score in ((user, 7), (admin, 9)):
+            review = Review.objects.create(
+                title=title, author=author, text=f'Отзыв "{score}", да',
+                score=score)
+            Comment.objects.create(review=review, author=user, text='+1')
+            result.append(review)
+    return result
+
+
+def streamed(response):
+    assert response.streaming, (
+        'Проверьте, что выгрузка отдаётся потоком, а не целиком'
+    )
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_reviews_ndjson_by_title(self, admin_client, reviews):
+        title_id = reviews[0].title_id
+
+        response = admin_client.get(
+            f'/api/v1/export/reviews/?title={title_id}')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = [json.loads(line)
+                for line in streamed(response).splitlines()]
+        assert [row['id'] for row in rows] == [
+            review.id for review in reviews if review.title_id == title_id], (
+            'Проверьте, что выгрузка фильтруется по произведению'
+        )
+        assert rows[0]['author_username'] == 'TestUser'
+        assert rows[0]['text'] == reviews[0].text
+
+    def test_comments_csv(self, admin_client, reviews):
+        response = admin_client.get('/api/v1/export/comments/?output=csv')
+
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(io.StringIO(streamed(response))))
+        assert len(rows) == Comment.objects.count()
+        assert set(rows[0]) == {'id', 'review_id', 'text', 'pub_date',
+                                'title_id', 'author_username'}
+
+    def test_pub_date_range(self, admin_client, reviews):
+        since = (timezone.now() + timedelta(minutes=1)).isoformat()
+
+        response = admin_client.get(
+            '/api/v1/export/reviews/', {'since': since})
+
+        assert streamed(response) == '', (
+            'Проверьте, что since отсекает более ранние отзывы'
+        )
+
+    def test_admin_only(self, user_client, admin_client):
+        assert user_client.get(
+            '/api/v1/export/reviews/').status_code == 403
+        assert admin_client.get(
+            '/api/v1/export/users/').status_code == 404
+
+    def test_command(self, reviews, tmp_path):
+        path = tmp_path / 'titles.csv'
+
+        call_command('export_data', 'titles', '--output', 'csv',
+                     '--file', str(path))
+
+        rows = list(csv.DictReader(path.open(encoding='utf-8')))
+        assert [row['name'] for row in rows] == ['Книга 0', 'Книга 1']
+        assert rows[0]['category_slug'] == 'books'
+
+        output = io.StringIO()
+        call_command('export_data', 'reviews', stdout=output)
+        assert len(output.getvalue().splitlines()) == len(reviews)
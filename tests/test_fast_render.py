@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.v1 import renderers
+from api.v1.pagination import KeysetPagination
+from api.v1.renderers import FastJSONRenderer
+from api.v1.serializer import (CommentSerializer, ReviewSerializer,
+                               TitlesReadSerializer)
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+
+# текст со всем, что по-разному кодируют JSON-библиотеки
+TRICKY_TEXT = ('Кавычки " и \\, строки\nи\tтабы \x01, эмодзи \U0001f3ac, '
+               '\u2028 \u2029')
+
+
+@pytest.fixture
+def catalog(django_user_model):
+    books = Category.objects.create(name='Книги', slug='books')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    authors = [django_user_model.objects.create(
+        username=f'critic{i}', email=f'critic{i}@yamdb.fake')
+        for i in range(3)]
+    both = Title.objects.create(name='А жанры', year=1960, category=books,
+                                description=TRICKY_TEXT)
+    GenreTitle.objects.create(title=both, genre=drama)
+    GenreTitle.objects.create(title=both, genre=comedy)
+    Title.objects.create(name='Б без категории', year=2000)
+    # средняя оценка 26 / 3 - дробная, в ответе отбрасывается
+    for author, score in zip(authors, (10, 9, 7)):
+        review = Review.objects.create(title=both, author=author,
+                                       text=TRICKY_TEXT, score=score)
+        Comment.objects.create(review=review, author=author, text=TRICKY_TEXT)
+    return both
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+class TestFastListResponses:
+    """Быстрый путь списков отдаёт те же байты, что ModelSerializer."""
+
+    def test_titles(self, catalog):
+        response = APIClient().get('/api/v1/titles/?ordering=name')
+
+        titles = Title.objects.select_related('category').prefetch_related(
+            'genre').order_by('name', 'id')
+        expected = OrderedDict([
+            ('count', 2), ('next', None), ('previous', None),
+            ('results', TitlesReadSerializer(titles, many=True).data)])
+        assert response.content == render(expected), (
+            'Проверьте, что список произведений совпадает с '
+            'TitlesReadSerializer байт в байт'
+        )
+
+    def test_reviews(self, catalog):
+        response = APIClient().get(
+            f'/api/v1/titles/{catalog.id}/reviews/?cursor=')
+
+        reviews = Review.objects.select_related('author').order_by(
+            'pub_date', 'id')
+        expected = OrderedDict([
+            ('next', None),
+            ('results', ReviewSerializer(reviews, many=True).data)])
+        assert response.content == render(expected), (
+            'Проверьте, что список отзывов совпадает с ReviewSerializer '
+            'байт в байт'
+        )
+
+    def test_comments(self, catalog):
+        review = Review.objects.filter(title=catalog).first()
+
+        response = APIClient().get(
+            f'/api/v1/titles/{catalog.id}/reviews/{review.id}/comments/'
+            '?cursor=')
+
+        expected = OrderedDict([
+            ('next', None),
+            ('results', CommentSerializer(review.comments.all(),
+                                          many=True).data)])
+        assert response.content == render(expected), (
+            'Проверьте, что список комментариев совпадает с '
+            'CommentSerializer байт в байт'
+        )
+
+    def test_keyset_next_link(self, catalog, monkeypatch):
+        monkeypatch.setattr(KeysetPagination, 'page_size', 2)
+        client = APIClient()
+
+        first = client.get(
+            f'/api/v1/titles/{catalog.id}/reviews/?cursor=').json()
+        second = client.get(first['next']).json()
+
+        ids = [review['id'] for review in
+             first['results'] + second['results']]
+        assert ids == list(Review.objects.order_by(
+            'pub_date', 'id').values_list('id', flat=True)), (
+            'Проверьте, что быстрый путь строит ссылку на следующую страницу'
+        )
+
+
+class TestFastJSONRenderer:
+
+    DATA = OrderedDict([
+        ('text', TRICKY_TEXT),
+        ('when', datetime(2022, 9, 1, 12, 30, 5, 123456,
+                          tzinfo=timezone.utc)),
+        ('day', datetime(2022, 9, 1).date()),
+        ('price', Decimal('9.50')),
+        ('lazy', gettext_lazy('Книги')),
+        ('items', (1, 2.5, None, True)),
+        ('by_id', {1: 'один'}),
+    ])
+
+    def test_same_bytes_as_json_renderer(self):
+        assert FastJSONRenderer().render(self.DATA) == render(self.DATA), (
+            'Проверьте, что FastJSONRenderer отдаёт те же байты, '
+            'что JSONRenderer'
+        )
+
+    def test_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(renderers, 'orjson', None)
+
+        assert FastJSONRenderer().render(self.DATA) == render(self.DATA)
+
+    def test_indent_and_unsupported_values(self):
+        data = {'big': 2 ** 70}
+
+        assert FastJSONRenderer().render(data) == render(data)
+        assert FastJSONRenderer().render(
+            self.DATA, 'application/json; indent=4') == JSONRenderer().render(
+                self.DATA, 'application/json; indent=4')
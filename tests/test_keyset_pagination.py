@@ -0,0 +1,59 @@
+import pytest
+from django.utils import timezone
+
+from reviews.models import Review, Title
+
+REVIEWS_COUNT = 25
+
+
+@pytest.fixture
+def title_with_reviews(django_user_model):
+    title = Title.objects.create(name='Произведение', year=2000)
+    for i in range(REVIEWS_COUNT):
+        author = django_user_model.objects.create(
+            username=f'author{i}', email=f'author{i}@yamdb.fake')
+        Review.objects.create(title=title, author=author,
+                              text=f'Отзыв {i}', score=5)
+    # одинаковые даты: порядок внутри них задаёт id
+    Review.objects.filter(id__lte=title.review.order_by('id')[10].id).update(
+        pub_date=timezone.now())
+    return title
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_cursor_walks_all_reviews(self, client, title_with_reviews,
+                                      django_assert_max_num_queries):
+        url = f'/api/v1/titles/{title_with_reviews.id}/reviews/?cursor='
+        seen = []
+        while url:
+            # произведение + страница отзывов с авторами, без COUNT(*)
+            with django_assert_max_num_queries(2):
+                response = client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что при cursor не считается количество отзывов'
+            )
+            seen.extend(review['id'] for review in data['results'])
+            url = data['next']
+
+        expected = list(Review.objects.filter(
+            title=title_with_reviews).order_by(
+                'pub_date', 'id').values_list('id', flat=True))
+        assert seen == expected, (
+            'Проверьте, что курсор обходит все отзывы по (pub_date, id)'
+        )
+
+    def test_page_number_is_default(self, client, title_with_reviews):
+        response = client.get(
+            f'/api/v1/titles/{title_with_reviews.id}/reviews/')
+
+        assert response.json()['count'] == REVIEWS_COUNT
+
+    def test_invalid_cursor(self, client, title_with_reviews):
+        response = client.get(
+            f'/api/v1/titles/{title_with_reviews.id}/reviews/?cursor=xx')
+
+        assert response.status_code == 404
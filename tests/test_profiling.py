@@ -0,0 +1,119 @@
+import json
+import logging
+import re
+import time
+
+import pytest
+
+from api.middleware import reset_stats
+from api.v1.serializer import CategorySerializer
+from reviews.models import Category
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_SLOW_REQUEST_MS = 10000
+    # без кэша ответов каждый запрос идёт в базу
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    reset_stats()
+    yield settings
+    reset_stats()
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+
+    def test_disabled_by_default(self, client):
+        response = client.get('/api/v1/categories/')
+
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что профилирование выключено без PROFILING_ENABLED'
+        )
+
+    def test_server_timing(self, client, profiling):
+        Category.objects.create(name='Книги', slug='books')
+
+        response = client.get('/api/v1/categories/')
+
+        assert response.status_code == 200
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'view;dur=', 'serialize;dur=', 'render;dur=',
+                       'total;dur='):
+            assert metric in timing, (
+                f'Проверьте, что Server-Timing содержит {metric}'
+            )
+        assert 'desc="2 queries"' in timing, (
+            'Проверьте, что в Server-Timing передаётся число SQL-запросов'
+        )
+
+    def test_serialize_timed_apart_from_view(self, client, profiling,
+                                             monkeypatch):
+        Category.objects.create(name='Книги', slug='books')
+        to_representation = CategorySerializer.to_representation
+
+        def slow_representation(serializer, instance):
+            time.sleep(0.05)
+            return to_representation(serializer, instance)
+
+        monkeypatch.setattr(CategorySerializer, 'to_representation',
+                            slow_representation)
+
+        response = client.get('/api/v1/categories/')
+
+        timing = dict(re.findall(r'(\w+);dur=([\d.]+)',
+                                 response['Server-Timing']))
+        serialize_ms = float(timing['serialize'])
+        view_ms = float(timing['view'])
+        assert serialize_ms >= 50, (
+            'Проверьте, что время serializer.data попадает в serialize'
+        )
+        assert view_ms < 50, (
+            'Проверьте, что время сериализации не входит во время '
+            'представления'
+        )
+
+    def test_slow_request_logged_with_sql(self, client, profiling, caplog):
+        profiling.PROFILING_SLOW_REQUEST_MS = 0
+        Category.objects.create(name='Книги', slug='books')
+
+        with caplog.at_level(logging.INFO, logger='api.middleware'):
+            client.get('/api/v1/categories/')
+
+        records = [record for record in caplog.records
+                   if record.name == 'api.middleware']
+        assert records and records[-1].levelno == logging.WARNING, (
+            'Проверьте, что медленный запрос логируется с уровнем WARNING'
+        )
+        entry = json.loads(records[-1].getMessage())
+        assert entry['endpoint'] == 'GET category-list'
+        assert entry['queries'] == len(entry['sql']) == 2, (
+            'Проверьте, что медленный запрос логируется с текстом SQL'
+        )
+        assert entry['size'] > 0
+
+    def test_stats_admin_only(self, client, user_client, admin_client,
+                              profiling):
+        Category.objects.create(name='Книги', slug='books')
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/categories/')
+
+        assert user_client.get('/api/v1/profiling/').status_code == 403, (
+            'Проверьте, что сводка профилирования доступна только админу'
+        )
+        response = admin_client.get('/api/v1/profiling/')
+        assert response.status_code == 200
+        stats = response.json()['GET category-list']
+        assert stats['requests'] == 2
+        assert stats['avg_queries'] == 2
+        assert 'avg_serialize_ms' in stats, (
+            'Проверьте, что сводка содержит среднее время сериализации'
+        )
+        assert stats['p50_ms'] <= stats['p99_ms'] <= stats['max_ms']
+
+        assert admin_client.delete('/api/v1/profiling/').status_code == 204
+        assert 'GET category-list' not in (
+            admin_client.get('/api/v1/profiling/').json()), (
+            'Проверьте, что DELETE сбрасывает сводку профилирования'
+        )
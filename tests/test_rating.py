@@ -0,0 +1,229 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.v1.serializer import TitlesWriteSerializer
+
+from reviews.models import Genre, GenreTitle, Review, Title
+
+
+@pytest.fixture
+def title():
+    title = Title.objects.create(name='Тихий Дон', year=1928)
+    GenreTitle.objects.create(
+        title=title, genre=Genre.objects.create(name='Драма', slug='drama'))
+    return title
+
+
+def post_review(client, title, score):
+    return client.post(f'/api/v1/titles/{title.id}/reviews/',
+                       data={'text': 'отзыв', 'score': score}, format='json')
+
+
+def rating_of(title):
+    title.refresh_from_db()
+    link = GenreTitle.objects.get(title=title)
+    assert (link.rating, link.rating_count) == (
+        title.rating, title.rating_count), (
+        'Проверьте, что рейтинг копируется в связи с жанрами'
+    )
+    return title.rating_sum, title.rating_count, title.rating
+
+
+@pytest.mark.django_db
+class TestRatingDeltas:
+
+    def test_patch_and_delete(self, title, admin_client, user_client):
+        post_review(admin_client, title, 10)
+        review_id = post_review(user_client, title, 6).json()['id']
+        url = f'/api/v1/titles/{title.id}/reviews/{review_id}/'
+
+        user_client.patch(url, data={'score': 2}, format='json')
+        assert rating_of(title) == (12, 2, 6.0), (
+            'Проверьте, что изменение оценки сдвигает сумму оценок'
+        )
+
+        user_client.delete(url)
+        assert rating_of(title) == (10, 1, 10.0), (
+            'Проверьте, что удаление отзыва вычитает его оценку'
+        )
+        assert user_client.delete(url).status_code == 404
+        assert rating_of(title) == (10, 1, 10.0)
+
+    def test_last_review_deleted(self, title, user_client):
+        review_id = post_review(user_client, title, 7).json()['id']
+
+        user_client.delete(f'/api/v1/titles/{title.id}/reviews/{review_id}/')
+
+        assert rating_of(title) == (0, 0, None), (
+            'Проверьте, что без отзывов у произведения нет рейтинга'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_author_deleted(self, title, user, admin_client, user_client):
+        post_review(admin_client, title, 10)
+        post_review(user_client, title, 4)
+        admin_client.get('/api/v1/titles/')
+
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+
+        assert rating_of(title) == (10, 1, 10.0), (
+            'Проверьте, что рейтинг пересчитывается при удалении автора '
+            'вместе с его отзывами'
+        )
+        titles = APIClient().get('/api/v1/titles/').json()['results']
+        assert titles[0]['rating'] == 10, (
+            'Проверьте, что после каскадного удаления кэш списка сброшен'
+        )
+
+    def test_deleted_outside_api(self, title, user_client):
+        post_review(user_client, title, 8)
+
+        Review.objects.get().delete()
+
+        assert rating_of(title) == (0, 0, None), (
+            'Проверьте, что рейтинг сдвигается и при удалении из админки'
+        )
+
+
+@pytest.mark.django_db
+class TestRatingOutsideApi:
+    """Отзывы, созданные и изменённые мимо API, например в админке."""
+
+    def test_create_edit_delete(self, title, user):
+        review = Review.objects.create(title=title, author=user, text='x',
+                                       score=8)
+        assert rating_of(title) == (8, 1, 8.0), (
+            'Проверьте, что отзыв из админки учитывается в рейтинге'
+        )
+
+        review.score = 3
+        review.save()
+        assert rating_of(title) == (3, 1, 3.0), (
+            'Проверьте, что изменение оценки мимо API сдвигает рейтинг'
+        )
+        review.text = 'без оценки'
+        review.save(update_fields=('text',))
+        assert rating_of(title) == (3, 1, 3.0)
+
+        review.delete()
+        assert rating_of(title) == (0, 0, None)
+
+    def test_moved_to_other_title(self, title, user):
+        other = Title.objects.create(name='Идиот', year=1869)
+        review = Review.objects.create(title=title, author=user, text='x',
+                                       score=6)
+
+        review.title = other
+        review.save()
+
+        assert rating_of(title) == (0, 0, None)
+        other.refresh_from_db()
+        assert (other.rating_sum, other.rating_count) == (6, 1), (
+            'Проверьте, что перенос отзыва сдвигает рейтинг обоих произведений'
+        )
+
+    def test_admin_review_then_author_deleted(self, title, user,
+                                              admin_client):
+        Review.objects.create(title=title, author=user, text='x', score=5)
+
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+
+        assert response.status_code == 204
+        assert rating_of(title) == (0, 0, None), (
+            'Проверьте, что каскадное удаление не уводит количество оценок '
+            'ниже нуля'
+        )
+
+    def test_title_save_keeps_rating(self, title, user):
+        stale = Title.objects.get(pk=title.pk)
+        Review.objects.create(title=title, author=user, text='x', score=9)
+
+        stale.name = 'Поднятая целина'
+        stale.save()
+
+        assert rating_of(title) == (9, 1, 9.0), (
+            'Проверьте, что сохранение произведения не перезаписывает '
+            'рейтинг, сдвинутый параллельно'
+        )
+        assert title.name == 'Поднятая целина'
+
+    def test_title_patch_keeps_rating(self, title, user, admin_client,
+                                      monkeypatch):
+        update = TitlesWriteSerializer.update
+
+        def concurrent_review(serializer, instance, validated_data):
+            # отзыв пишется, пока запрос держит прочитанное произведение
+            Review.objects.create(title=title, author=user, text='x', score=4)
+            return update(serializer, instance, validated_data)
+
+        monkeypatch.setattr(TitlesWriteSerializer, 'update',
+                            concurrent_review)
+        admin_client.patch(f'/api/v1/titles/{title.id}/',
+                           data={'name': 'Поднятая целина'}, format='json')
+
+        assert rating_of(title) == (4, 1, 4.0), (
+            'Проверьте, что PATCH произведения не теряет параллельную оценку'
+        )
+
+@pytest.mark.django_db
+class TestCascadeRating:
+
+    def test_title_delete_skips_rating(self, title, django_user_model):
+        for i in range(30):
+            author = django_user_model.objects.create(
+                username=f'critic{i}', email=f'critic{i}@yamdb.fake')
+            Review.objects.create(title=title, author=author, text='x',
+                                  score=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            title.delete()
+
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE')]
+        assert updates == [], (
+            'Проверьте, что рейтинг удаляемого произведения не пересчитывается'
+        )
+        assert len(queries) < 10
+
+    def test_author_delete_once_per_title(self, title, user):
+        other = Title.objects.create(name='Идиот', year=1869)
+        for target in (title, other):
+            Review.objects.create(title=target, author=user, text='x',
+                                  score=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            user.delete()
+
+        assert sum(query['sql'].startswith('UPDATE "reviews_title"')
+                   for query in queries) == 2, (
+            'Проверьте, что рейтинг сдвигается один раз на произведение'
+        )
+        assert rating_of(title) == (0, 0, None)
+
+
+@pytest.mark.django_db
+class TestRebuildRating:
+
+    def test_rebuild_all_and_selected(self, title, user, admin):
+        other = Title.objects.create(name='Идиот', year=1869)
+        Review.objects.create(title=title, author=user, text='x', score=9)
+        Review.objects.create(title=title, author=admin, text='y', score=4)
+        Review.objects.create(title=other, author=user, text='z', score=3)
+        # рейтинг, разошедшийся с отзывами
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        GenreTitle.objects.update(rating_count=0, rating=None)
+
+        call_command('rebuild_rating', '--title_id', str(other.id))
+        assert rating_of(title) == (0, 0, None), (
+            'Проверьте, что --title_id пересчитывает только эти произведения'
+        )
+        other.refresh_from_db()
+        assert (other.rating_sum, other.rating_count) == (3, 1)
+
+        call_command('rebuild_rating')
+        assert rating_of(title) == (13, 2, 6.5), (
+            'Проверьте, что rebuild_rating пересчитывает рейтинг по отзывам'
+        )
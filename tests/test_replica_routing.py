@@ -0,0 +1,131 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api import db_router
+from api.v1 import cache as generations
+from api.db_router import ReplicaRouter, replica_reads
+from reviews.models import Category
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ('replica',)
+    # ответы не кэшируем: проверяем, из какой базы они прочитаны
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    # поколения DummyCache всегда новые: без окна отставания реплики
+    settings.DATABASE_REPLICA_LAG = 0
+    Category.objects.create(name='Основная', slug='primary')
+    Category.objects.using('replica').create(name='Реплика', slug='replica')
+    return settings
+
+
+@pytest.mark.django_db(transaction=True, databases=('default', 'replica'))
+class TestReplicaRouting:
+
+    def test_router_read_your_writes(self, replica):
+        router = ReplicaRouter()
+
+        assert router.db_for_read(Category) == 'default', (
+            'Проверьте, что вне запросов api.v1 чтения идут в default'
+        )
+        with replica_reads():
+            assert router.db_for_read(Category) == 'replica'
+            assert router.db_for_write(Category) == 'default'
+            assert router.db_for_read(Category) == 'default', (
+                'Проверьте, что после записи запрос читает из default'
+            )
+
+    def test_safe_requests_read_from_replica(self, replica):
+        response = APIClient().get('/api/v1/categories/')
+
+        assert response.status_code == 200
+        assert [item['slug'] for item in response.json()['results']] == [
+            'replica'], (
+            'Проверьте, что GET к api.v1 читает с реплики'
+        )
+
+    def test_one_replica_per_request(self, replica, monkeypatch):
+        replica.DATABASE_REPLICAS = ('replica', 'default')
+        picks = []
+
+        def choice(replicas):
+            picks.append(replicas)
+            return replicas[0]
+
+        monkeypatch.setattr(db_router.random, 'choice', choice)
+        response = APIClient().get('/api/v1/categories/')
+
+        assert response.json()['count'] == 1
+        assert len(picks) == 1, (
+            'Проверьте, что реплика выбирается один раз на запрос, '
+            'а не на каждый SQL-запрос'
+        )
+        assert ReplicaRouter().db_for_read(Category) == 'default', (
+            'Проверьте, что реплика запроса сбрасывается по request_finished'
+        )
+
+    def test_writes_go_to_primary(self, replica, admin_client):
+        response = admin_client.post(
+            '/api/v1/categories/', {'name': 'Новая', 'slug': 'new'})
+
+        assert response.status_code == 201
+        assert Category.objects.using('default').filter(
+            slug='new').exists(), (
+            'Проверьте, что запись идёт в основную базу'
+        )
+        assert not Category.objects.using('replica').filter(
+            slug='new').exists()
+
+    def test_without_replicas_reads_primary(self, replica):
+        replica.DATABASE_REPLICAS = ()
+
+        response = APIClient().get('/api/v1/categories/')
+
+        assert [item['slug'] for item in response.json()['results']] == [
+            'primary']
+
+
+def slugs(response):
+    return [item['slug'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True, databases=('default', 'replica'))
+class TestReplicaLag:
+
+    @pytest.fixture(autouse=True)
+    def lagging_replica(self, replica, tmp_path):
+        """Реплика ещё не получила запись, которая сдвинула поколение."""
+        replica.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path)}}
+        replica.DATABASE_REPLICA_LAG = 60
+        return replica
+
+    def test_recent_write_read_from_primary(self, lagging_replica):
+        generations.bump_generation('categories')
+        client = APIClient()
+
+        response = client.get('/api/v1/categories/')
+        assert slugs(response) == ['primary'], (
+            'Проверьте, что сразу после записи кэшируемый ответ читается '
+            'из default'
+        )
+        lagging_replica.DATABASE_REPLICA_LAG = 0
+        cached = client.get('/api/v1/categories/',
+                            HTTP_IF_NONE_MATCH=response['ETag'])
+        assert cached.status_code == 304
+        assert slugs(client.get('/api/v1/categories/')) == ['primary'], (
+            'Проверьте, что под новым поколением закэширован ответ default'
+        )
+
+    def test_old_generation_reads_replica(self, lagging_replica):
+        key = generations.GENERATION_KEY.format(namespace='categories')
+        cache.set(key, generations._now() - 120 * 10 ** 6, timeout=None)
+
+        response = APIClient().get('/api/v1/categories/')
+
+        assert slugs(response) == ['replica'], (
+            'Проверьте, что без недавних записей чтения идут на реплику'
+        )
@@ -0,0 +1,80 @@
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews import signals
+from reviews.models import Review, Title
+
+
+@pytest.fixture
+def title():
+    return Title.objects.create(name='Тихий Дон', year=1928)
+
+
+def review_queries(queries):
+    return [query['sql'] for query in queries
+            if 'reviews_review' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestReviewCreate:
+
+    def test_single_review_query(self, title, user_client):
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                data={'text': 'шедевр', 'score': 10}, format='json')
+
+        assert response.status_code == 201
+        sql = review_queries(queries)
+        assert len(sql) == 1 and sql[0].startswith('INSERT'), (
+            'Проверьте, что отзыв создаётся одной вставкой, '
+            'без проверки перед ней'
+        )
+        assert sum(query['sql'].startswith('SELECT')
+                   and 'FROM "reviews_title"' in query['sql']
+                   for query in queries) == 1, (
+            'Проверьте, что произведение читается один раз за запрос'
+        )
+
+    def test_second_review_rejected(self, title, user_client):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        user_client.post(url, data={'text': 'шедевр', 'score': 10},
+                         format='json')
+
+        response = user_client.post(url, data={'text': 'ещё', 'score': 1},
+                                    format='json')
+
+        assert response.status_code == 400
+        assert response.json() == {
+            'non_field_errors': ['есть уже твоё мнение, угомонись']}, (
+            'Проверьте, что повторный отзыв отклоняется прежним ответом'
+        )
+        title.refresh_from_db()
+        assert (title.rating_count, title.rating) == (1, 10.0), (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг'
+        )
+        assert Review.objects.count() == 1
+
+    def test_other_integrity_error_not_duplicate(self, title, user_client,
+                                                monkeypatch):
+        def broken_rating(*args):
+            raise IntegrityError('CHECK constraint failed: rating_count')
+
+        monkeypatch.setattr(signals, 'update_rating', broken_rating)
+
+        with pytest.raises(IntegrityError):
+            user_client.post(f'/api/v1/titles/{title.id}/reviews/',
+                             data={'text': 'шедевр', 'score': 10},
+                             format='json')
+        assert Review.objects.count() == 0, (
+            'Проверьте, что за повторный отзыв принимается только нарушение '
+            'unique-review'
+        )
+
+    def test_missing_title(self, user_client):
+        response = user_client.post('/api/v1/titles/999/reviews/',
+                                    data={'text': 'шедевр', 'score': 10},
+                                    format='json')
+
+        assert response.status_code == 404
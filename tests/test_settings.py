@@ -1,3 +1,8 @@
+import importlib
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
 from api_yamdb import settings
 
 
@@ -9,3 +14,30 @@ class TestSettings:
         assert settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql', (
             'Проверьте, что используете базу данных postgresql'
         )
+
+    def test_workers_need_shared_cache(self, monkeypatch):
+        with monkeypatch.context() as env:
+            env.setenv('GUNICORN_WORKERS', '3')
+            env.delenv('CACHE_BACKEND', raising=False)
+            with pytest.raises(ImproperlyConfigured):
+                importlib.reload(settings)
+            env.setenv('CACHE_BACKEND', 'django_redis.cache.RedisCache')
+            importlib.reload(settings)
+        importlib.reload(settings)
+
+        assert settings.CACHES['default']['BACKEND'] in (
+            settings.PROCESS_LOCAL_CACHES), (
+            'Проверьте, что один воркер может работать с кэшем в памяти'
+        )
+
+    def test_workers_need_redis_throttle_store(self, monkeypatch):
+        with monkeypatch.context() as env:
+            env.setenv('GUNICORN_WORKERS', '3')
+            env.setenv('CACHE_BACKEND',
+                       'django.core.cache.backends.filebased.FileBasedCache')
+            with pytest.raises(ImproperlyConfigured):
+                importlib.reload(settings)
+            for scope in ('AUTH_IP', 'AUTH_ACCOUNT', 'WRITE_IP', 'WRITE_USER'):
+                env.setenv(f'THROTTLE_{scope}', '')
+            importlib.reload(settings)
+        importlib.reload(settings)
@@ -0,0 +1,135 @@
+import pytest
+from django.core import mail
+
+from api.mail_utils import send_outbox
+from api.models import EmailOutbox
+
+
+class BrokenConnection:
+    """Почтовое соединение, которое не может отправить ни одного письма."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class DroppingConnection(BrokenConnection):
+    """Соединение, которое обрывается после двух писем и не открывается."""
+    sent = []
+
+    def __init__(self):
+        self.opened = 0
+
+    def open(self):
+        if self.opened:
+            raise ConnectionRefusedError('SMTP не отвечает')
+        self.opened += 1
+
+    def send_messages(self, messages):
+        if len(self.sent) == 2:
+            raise ConnectionResetError('соединение оборвалось')
+        self.sent.extend(messages)
+
+
+class UnreachableConnection(BrokenConnection):
+    """SMTP-сервер недоступен: соединение не открывается."""
+
+    def open(self):
+        raise ConnectionRefusedError('SMTP не отвечает')
+
+
+def signup_many(client, count):
+    for i in range(count):
+        client.post('/api/v1/auth/signup/',
+                    {'username': f'newbie{i}',
+                     'email': f'newbie{i}@yamdb.fake'})
+
+
+@pytest.mark.django_db
+class TestSignupOutbox:
+
+    def test_signup_queues_email(self, client):
+        response = client.post('/api/v1/auth/signup/',
+                               {'username': 'newbie',
+                                'email': 'newbie@yamdb.fake'})
+
+        assert response.status_code == 200
+        assert not mail.outbox, (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        assert EmailOutbox.objects.filter(
+            to_email='newbie@yamdb.fake', sent__isnull=True).exists(), (
+            'Проверьте, что письмо с кодом ставится в очередь'
+        )
+
+    def test_send_outbox_delivers_queue(self, client):
+        for i in range(3):
+            client.post('/api/v1/auth/signup/',
+                        {'username': f'newbie{i}',
+                         'email': f'newbie{i}@yamdb.fake'})
+
+        assert send_outbox(batch_size=2) == 3
+        assert len(mail.outbox) == 3
+        assert not EmailOutbox.objects.filter(sent__isnull=True).exists()
+        assert send_outbox() == 0, 'Проверьте, что письма не уходят дважды'
+
+    def test_failed_email_is_retried_later(self, client, monkeypatch):
+        client.post('/api/v1/auth/signup/',
+                    {'username': 'newbie', 'email': 'newbie@yamdb.fake'})
+        monkeypatch.setattr('api.mail_utils.get_connection', BrokenConnection)
+
+        assert send_outbox() == 1
+        message = EmailOutbox.objects.get()
+        assert message.sent is None and message.attempts == 1
+        assert message.next_attempt > message.created, (
+            'Проверьте, что повторная попытка откладывается'
+        )
+        assert send_outbox() == 0
+
+    def test_connection_drops_mid_batch(self, client, monkeypatch):
+        signup_many(client, 4)
+        DroppingConnection.sent = []
+        monkeypatch.setattr('api.mail_utils.get_connection',
+                            DroppingConnection)
+
+        assert send_outbox(batch_size=10) == 4, (
+            'Проверьте, что обрыв соединения не роняет обработчик'
+        )
+        messages = list(EmailOutbox.objects.order_by('id'))
+        assert [message.sent is not None for message in messages] == [
+            True, True, False, False], (
+            'Проверьте, что отправленные до обрыва письма отмечены '
+            'и не уйдут повторно'
+        )
+        assert [message.attempts for message in messages] == [1] * 4
+        assert 'оборвалось' in messages[2].last_error
+        assert 'не отвечает' in messages[3].last_error, (
+            'Проверьте, что неоткрывшееся соединение считается '
+            'неудачной попыткой'
+        )
+        assert send_outbox() == 0, (
+            'Проверьте, что неотправленные письма ждут задержки'
+        )
+
+    def test_smtp_unavailable(self, client, monkeypatch):
+        signup_many(client, 3)
+        monkeypatch.setattr('api.mail_utils.get_connection',
+                            UnreachableConnection)
+
+        assert send_outbox(batch_size=2) == 2, (
+            'Проверьте, что без SMTP обработка останавливается на '
+            'первой порции'
+        )
+        assert list(EmailOutbox.objects.order_by('id').values_list(
+            'attempts', flat=True)) == [1, 1, 0]
@@ -0,0 +1,116 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+
+
+@pytest.fixture
+def catalog(django_user_model):
+    category = Category.objects.create(name='Книги', slug='books')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    author = django_user_model.objects.create(
+        username='critic', email='critic@yamdb.fake')
+    titles = []
+    for i in range(5):
+        title = Title.objects.create(name=f'Произведение {i}', year=2000,
+                                     category=category, description='…')
+        GenreTitle.objects.create(title=title, genre=genre)
+        review = Review.objects.create(title=title, author=author,
+                                       text='отзыв', score=5)
+        Comment.objects.create(review=review, author=author, text='+')
+        titles.append(title)
+    return titles
+
+
+def get_with_sql(path):
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().get(path)
+    return response, ' '.join(query['sql'] for query in queries)
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_titles_list(self, catalog):
+        response, sql = get_with_sql('/api/v1/titles/?fields=id,name')
+
+        assert response.status_code == 200
+        assert [list(title) for title in response.json()['results']] == [
+            ['id', 'name']] * 5, (
+            'Проверьте, что ?fields= оставляет в ответе только эти поля'
+        )
+        assert 'description' not in sql and 'reviews_genre' not in sql, (
+            'Проверьте, что ненужные столбцы и жанры не читаются из базы'
+        )
+
+    def test_title_detail(self, catalog):
+        response, sql = get_with_sql(
+            f'/api/v1/titles/{catalog[0].id}/?fields=name,category')
+
+        assert response.json() == {
+            'name': 'Произведение 0',
+            'category': {'name': 'Книги', 'slug': 'books'}}
+        assert 'description' not in sql and 'reviews_genre' not in sql
+
+    def test_reviews_without_author_join(self, catalog):
+        response, sql = get_with_sql(
+            f'/api/v1/titles/{catalog[0].id}/reviews/?fields=text')
+
+        assert response.json()['results'] == [{'text': 'отзыв'}]
+        assert 'users_user' not in sql, (
+            'Проверьте, что автор не загружается, если его нет в ?fields='
+        )
+
+    def test_comments_and_keyset_cursor(self, catalog):
+        review = catalog[0].review.get()
+
+        response = APIClient().get(
+            f'/api/v1/titles/{catalog[0].id}/reviews/{review.id}/comments/'
+            '?fields=author&cursor=')
+
+        assert response.json() == {'next': None,
+                                   'results': [{'author': 'critic'}]}
+
+    def test_top_and_catalog(self, catalog):
+        top = APIClient().get('/api/v1/titles/top/?fields=id&min_reviews=1')
+        categories = APIClient().get('/api/v1/categories/?fields=slug')
+
+        assert [list(title) for title in top.json()] == [['id']] * 5
+        assert categories.json()['results'] == [{'slug': 'books'}]
+
+    def test_unknown_field(self, catalog):
+        response = APIClient().get('/api/v1/titles/?fields=id,secret')
+
+        assert response.status_code == 400, (
+            'Проверьте, что неизвестное поле в ?fields= даёт 400'
+        )
+
+    def test_write_ignores_fields(self, admin_client):
+        response = admin_client.post('/api/v1/genres/?fields=slug',
+                                     {'name': 'Рок', 'slug': 'rock'})
+
+        assert response.json() == {'name': 'Рок', 'slug': 'rock'}
+
+
+@pytest.mark.django_db
+class TestPageSize:
+
+    def test_page_size(self, catalog):
+        response = APIClient().get('/api/v1/titles/?page_size=2')
+
+        data = response.json()
+        assert len(data['results']) == 2, (
+            'Проверьте, что ?page_size= задаёт размер страницы'
+        )
+        assert 'page_size=2' in data['next']
+
+    def test_page_size_bounded(self, catalog, settings):
+        settings.API_MAX_PAGE_SIZE = 3
+
+        titles = APIClient().get('/api/v1/titles/?page_size=1000')
+
+        assert len(titles.json()['results']) == 3, (
+            'Проверьте, что ?page_size= не больше API_MAX_PAGE_SIZE'
+        )
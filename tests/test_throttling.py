@@ -0,0 +1,180 @@
+import time
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.v1 import throttling
+from api.v1.throttling import (AuthIPThrottle, TokenBucketThrottle, get_store,
+                               refill_bucket)
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+
+
+@pytest.fixture
+def rates(settings):
+    """Маленькие лимиты: ведро пустеет за пару запросов."""
+    def set_rates(**scopes):
+        settings.REST_FRAMEWORK = dict(
+            settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=scopes)
+    return set_rates
+
+
+def signup(client, number, **extra):
+    return client.post(SIGNUP_URL, {'username': f'newbie{number}',
+                                    'email': f'newbie{number}@yamdb.fake'},
+                       **extra)
+
+
+@pytest.mark.django_db
+class TestAuthThrottling:
+
+    def test_signup_per_ip(self, rates):
+        rates(auth_ip='2/min')
+        client = APIClient()
+
+        statuses = [signup(client, i).status_code for i in range(3)]
+
+        assert statuses == [200, 200, 429], (
+            'Проверьте, что регистрации с одного IP ограничены'
+        )
+        response = signup(client, 3)
+        assert int(response['Retry-After']) > 0, (
+            'Проверьте, что ответ 429 говорит, когда повторить запрос'
+        )
+        assert signup(client, 4, REMOTE_ADDR='10.0.0.2').status_code == 200, (
+            'Проверьте, что другой IP имеет своё ведро'
+        )
+
+    def test_forwarded_for_from_proxy(self, rates):
+        rates(auth_ip='1/min')
+        client = APIClient()
+
+        first = signup(client, 0, HTTP_X_FORWARDED_FOR='1.1.1.1')
+        second = signup(client, 1, HTTP_X_FORWARDED_FOR='2.2.2.2')
+        spoofed = signup(client, 2, HTTP_X_FORWARDED_FOR='9.9.9.9, 1.1.1.1')
+
+        assert (first.status_code, second.status_code) == (200, 200), (
+            'Проверьте, что IP клиента берётся из X-Forwarded-For nginx'
+        )
+        assert spoofed.status_code == 429, (
+            'Проверьте, что подставленные клиентом адреса не учитываются'
+        )
+
+    def test_token_per_username_from_any_ip(self, rates, user):
+        rates(auth_account='2/min')
+        statuses = [
+            APIClient().post(
+                '/api/v1/auth/token/',
+                {'username': user.username.upper(),
+                 'confirmation_code': 'guess'},
+                REMOTE_ADDR=f'10.0.0.{i}').status_code
+            for i in range(3)]
+
+        assert statuses[-1] == 429, (
+            'Проверьте, что подбор кода к одному username ограничен '
+            'независимо от IP'
+        )
+
+    def test_signup_per_email(self, rates):
+        rates(auth_account='1/min')
+        client = APIClient()
+
+        client.post(SIGNUP_URL, {'username': 'first',
+                                 'email': 'same@yamdb.fake'})
+        response = client.post(SIGNUP_URL, {'username': 'second',
+                                            'email': 'SAME@yamdb.fake'})
+
+        assert response.status_code == 429, (
+            'Проверьте, что письма на один email ограничены'
+        )
+
+
+@pytest.mark.django_db
+class TestWriteThrottling:
+
+    def test_writes_per_user(self, rates, user_client):
+        rates(write_user='2/min')
+
+        statuses = [user_client.patch('/api/v1/users/me/',
+                                      {'bio': str(i)}).status_code
+                    for i in range(3)]
+
+        assert statuses == [200, 200, 429], (
+            'Проверьте, что запись одного пользователя ограничена'
+        )
+        assert user_client.get('/api/v1/users/me/').status_code == 200, (
+            'Проверьте, что чтение не ограничивается'
+        )
+
+    def test_writes_per_ip(self, rates, admin_client):
+        rates(write_ip='1/min')
+
+        first = admin_client.post('/api/v1/genres/',
+                                  {'name': 'Драма', 'slug': 'drama'})
+        second = admin_client.post('/api/v1/genres/',
+                                   {'name': 'Рок', 'slug': 'rock'})
+
+        assert (first.status_code, second.status_code) == (201, 429)
+
+    def test_unlimited_without_rate(self, rates, user_client):
+        rates()
+
+        for i in range(5):
+            assert user_client.patch('/api/v1/users/me/',
+                                     {'bio': str(i)}).status_code == 200
+
+
+class TestTokenBucket:
+
+    def test_refill(self):
+        bucket, wait = refill_bucket(None, 2, 1.0, now=100.0)
+        bucket, wait = refill_bucket(bucket, 2, 1.0, now=100.0)
+        assert wait == 0
+        bucket, wait = refill_bucket(bucket, 2, 1.0, now=100.25)
+        assert wait == pytest.approx(0.75), (
+            'Проверьте, что пустое ведро говорит, сколько ждать токена'
+        )
+        bucket, wait = refill_bucket(bucket, 2, 1.0, now=101.0)
+        assert wait == 0, 'Проверьте, что ведро пополняется со временем'
+        bucket, wait = refill_bucket(bucket, 2, 1.0, now=1000.0)
+        assert bucket[0] == 1, 'Проверьте, что ведро не переполняется'
+
+    def test_check_under_millisecond(self, rates):
+        rates(auth_ip='1000000/s')
+        request = APIRequestFactory().post(SIGNUP_URL)
+        throttle = AuthIPThrottle()
+        checks = 1000
+
+        started = time.perf_counter()
+        for _ in range(checks):
+            assert throttle.allow_request(request, None)
+        average_ms = (time.perf_counter() - started) / checks * 1000
+
+        assert average_ms < 1, (
+            'Проверьте, что проверка ограничения быстрее миллисекунды'
+        )
+
+    def test_default_ident_is_ip(self, rates):
+        rates(plain='1/min')
+        throttle = type('PlainThrottle', (TokenBucketThrottle,),
+                        {'scope': 'plain'})()
+        factory = APIRequestFactory()
+
+        assert throttle.allow_request(factory.get('/'), None)
+        assert not throttle.allow_request(factory.get('/'), None), (
+            'Проверьте, что по умолчанию ведро - на IP клиента'
+        )
+        assert throttle.allow_request(
+            factory.get('/', REMOTE_ADDR='10.0.0.2'), None)
+
+    def test_workers_need_redis_store(self, settings, monkeypatch):
+        monkeypatch.setattr(throttling, '_stores', {})
+        settings.WEB_WORKERS = 3
+
+        with pytest.raises(ImproperlyConfigured):
+            get_store()
+        settings.WEB_WORKERS = 1
+        assert isinstance(get_store(), throttling.CacheBucketStore), (
+            'Проверьте, что вёдра в процессе - только для одного воркера'
+        )
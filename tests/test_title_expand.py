@@ -0,0 +1,129 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Comment, Review, Title
+
+# count + произведения + жанры + число комментариев + новые отзывы
+EXPANDED_LIST_MAX_QUERIES = 5
+EXPAND_ALL = 'review_count,comment_count,latest_reviews'
+
+
+def create_titles(count, authors):
+    category = Category.objects.create(name='Книги', slug='books')
+    titles = []
+    for i in range(count):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000, category=category)
+        for number, author in enumerate(authors[:i % 5]):
+            review = Review.objects.create(
+                title=title, author=author, text=f'отзыв {number}', score=5)
+            Comment.objects.create(review=review, author=author, text='+')
+        titles.append(title)
+    return titles
+
+
+@pytest.fixture
+def authors(django_user_model):
+    return [django_user_model.objects.create(
+        username=f'critic{i}', email=f'critic{i}@yamdb.fake')
+        for i in range(4)]
+
+
+@pytest.mark.django_db
+class TestTitleExpand:
+
+    @pytest.mark.parametrize('titles_count', (1, 10))
+    def test_fixed_queries_per_page(self, django_assert_max_num_queries,
+                                    authors, titles_count, settings):
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        create_titles(titles_count, authors)
+
+        with django_assert_max_num_queries(EXPANDED_LIST_MAX_QUERIES):
+            response = APIClient().get(
+                '/api/v1/titles/', {'expand': EXPAND_ALL})
+
+        assert response.status_code == 200
+
+    def test_expanded_values(self, authors):
+        title = create_titles(5, authors)[-1]
+
+        response = APIClient().get('/api/v1/titles/', {'expand': EXPAND_ALL})
+
+        card = next(item for item in response.json()['results']
+                    if item['id'] == title.id)
+        assert (card['review_count'], card['comment_count']) == (4, 4), (
+            'Проверьте, что expand добавляет число отзывов и комментариев'
+        )
+        assert [review['text'] for review in card['latest_reviews']] == [
+            'отзыв 3', 'отзыв 2', 'отзыв 1'], (
+            'Проверьте, что expand добавляет три новых отзыва'
+        )
+
+    def test_latest_reviews_plan(self, authors, django_user_model):
+        if connection.vendor != 'sqlite':
+            pytest.skip('план запроса в формате SQLite')
+        popular = create_titles(3, authors)[0]
+        for i in range(20):
+            author = django_user_model.objects.create(
+                username=f'fan{i}', email=f'fan{i}@yamdb.fake')
+            Review.objects.create(title=popular, author=author,
+                                  text=f'отзыв фаната {i}', score=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get('/api/v1/titles/',
+                                       {'expand': 'latest_reviews'})
+        sql = next(query['sql'] for query in queries
+                   if 'reviews_review' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[-1] for row in cursor.fetchall()]
+
+        assert not any('CORRELATED' in step for step in plan), (
+            'Проверьте, что новые отзывы выбираются без коррелированного '
+            'подзапроса на каждый отзыв'
+        )
+        assert sum('INDEX review-title-pub-date' in step
+                   for step in plan) == 3, (
+            'Проверьте, что отзывы каждого произведения читаются по индексу '
+            'с LIMIT'
+        )
+        card = next(item for item in response.json()['results']
+                    if item['id'] == popular.id)
+        assert [review['text'] for review in card['latest_reviews']] == [
+            'отзыв фаната 19', 'отзыв фаната 18', 'отзыв фаната 17']
+
+    def test_not_expanded_by_default(self, authors):
+        create_titles(2, authors)
+
+        card = APIClient().get('/api/v1/titles/').json()['results'][0]
+
+        assert 'latest_reviews' not in card and 'comment_count' not in card
+
+    def test_unknown_expand(self):
+        response = APIClient().get('/api/v1/titles/', {'expand': 'author'})
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_new_comment_refreshes_cached_counts(authors, user_client):
+    title = create_titles(2, authors)[-1]
+    review = Review.objects.filter(title=title).first()
+    client = APIClient()
+
+    def comment_count():
+        results = client.get('/api/v1/titles/', {
+            'expand': 'comment_count'}).json()['results']
+        return next(item['comment_count'] for item in results
+                    if item['id'] == title.id)
+
+    assert comment_count() == 1
+    user_client.post(
+        f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+        data={'text': 'ещё'}, format='json')
+    assert comment_count() == 2, (
+        'Проверьте, что новый комментарий сбрасывает кэш списка с expand'
+    )
@@ -0,0 +1,55 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from api.management.commands.explain_filters import FILTERS
+from reviews.models import Genre, GenreTitle, Title
+
+
+@pytest.mark.django_db
+class TestGenreFilter:
+
+    def test_title_matching_several_genres_once(self):
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        novel = Genre.objects.create(name='Роман', slug='novel')
+        both = Title.objects.create(name='Идиот', year=1869)
+        other = Title.objects.create(name='Бесы', year=1872)
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre)
+            for title, genre in ((both, drama), (both, novel),
+                                 (other, drama)))
+
+        response = APIClient().get('/api/v1/titles/?genre=drama')
+
+        data = response.json()
+        assert sorted(title['id'] for title in data['results']) == [
+            both.id, other.id], (
+            'Проверьте, что произведение с несколькими жанрами '
+            'не повторяется в выдаче ?genre='
+        )
+        assert data['count'] == 2
+
+
+@pytest.mark.django_db
+class TestExplainFilters:
+
+    def test_reports_every_plan(self):
+        out = StringIO()
+
+        call_command('explain_filters', seed=20, verbose_plans=True,
+                     stdout=out)
+
+        output = out.getvalue()
+        assert output.startswith('seeded: ')
+        combinations = 2 ** len(FILTERS) - 1
+        assert sum(line.startswith(FILTERS) and ': {' in line
+                   for line in output.splitlines()) == combinations, (
+            'Проверьте, что explain_filters выводит план каждой '
+            'комбинации фильтров'
+        )
+        assert output.rstrip().endswith('combinations with sequential scans')
+        assert not Title.objects.exists(), (
+            'Проверьте, что данные --seed откатываются'
+        )
@@ -0,0 +1,31 @@
+import pytest
+
+from reviews.models import Title
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_search_name_and_description(self, client):
+        Title.objects.create(name='Анна Каренина', year=1877,
+                             description='Роман о мире и войне')
+        Title.objects.create(name='Война и мир', year=1869)
+        Title.objects.create(name='Отцы и дети', year=1862)
+
+        response = client.get('/api/v1/titles/?search=мир')
+
+        assert response.status_code == 200
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Война и мир', 'Анна Каренина'], (
+            'Проверьте, что поиск идёт по названию и описанию, '
+            'и совпадения в названии выше'
+        )
+
+    def test_search_combines_with_filters(self, client):
+        Title.objects.create(name='Война и мир', year=1869)
+        Title.objects.create(name='Новый мир', year=2000)
+
+        response = client.get('/api/v1/titles/?search=мир&year=2000')
+
+        assert [title['name'] for title in response.json()['results']] == [
+            'Новый мир']
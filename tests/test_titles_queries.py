@@ -0,0 +1,57 @@
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, GenreTitle, Title
+
+# count + произведения + жанры
+TITLES_LIST_MAX_QUERIES = 3
+# произведение с категорией + жанры
+TITLE_DETAIL_MAX_QUERIES = 2
+
+
+def create_titles(count):
+    category = Category.objects.create(name='Книги', slug='books')
+    genres = [Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+              for i in range(3)]
+    titles = []
+    for i in range(count):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000, category=category)
+        for genre in genres[:i % 3 + 1]:
+            GenreTitle.objects.create(title=title, genre=genre)
+        titles.append(title)
+    return titles
+
+
+@pytest.mark.django_db
+class TestTitlesQueries:
+
+    @pytest.mark.parametrize('titles_count', (1, 10, 25))
+    def test_titles_list_queries(self, django_assert_max_num_queries,
+                                 titles_count):
+        create_titles(titles_count)
+        client = APIClient()
+
+        with django_assert_max_num_queries(TITLES_LIST_MAX_QUERIES):
+            response = client.get('/api/v1/titles/')
+
+        assert response.status_code == 200, (
+            'Проверьте, что список произведений доступен без токена'
+        )
+        results = response.json()['results']
+        assert results and all(title['genre'] for title in results), (
+            'Проверьте, что в списке произведений выводятся жанры'
+        )
+
+    def test_title_detail_queries(self, django_assert_max_num_queries):
+        title = create_titles(3)[-1]
+        client = APIClient()
+
+        with django_assert_max_num_queries(TITLE_DETAIL_MAX_QUERIES):
+            response = client.get(f'/api/v1/titles/{title.id}/')
+
+        assert response.status_code == 200
+        assert response.json()['category'] == {
+            'name': 'Книги', 'slug': 'books'}, (
+            'Проверьте, что в произведении выводится категория'
+        )
@@ -0,0 +1,98 @@
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from reviews.models import Review, Title
+from tests.fixtures.fixture_user import token_client
+
+
+def users_queries(queries):
+    """Отдельные запросы к таблице пользователей, JOIN не в счёт."""
+    return [query['sql'] for query in queries.captured_queries
+            if 'FROM "users_user"' in query['sql']]
+
+
+@pytest.fixture
+def moderator(django_user_model):
+    return django_user_model.objects.create(
+        username='TestModerator', email='moderator@yamdb.fake',
+        role='moderator')
+
+
+@pytest.mark.django_db
+class TestTokenRoles:
+
+    def test_token_has_role_claim(self, user):
+        response = APIClient().post('/api/v1/auth/token/', {
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user)})
+
+        assert response.status_code == 201
+        token = AccessToken(response.json()['token'])
+        assert token['role'] == 'user', (
+            'Проверьте, что токен доступа содержит роль пользователя'
+        )
+        assert token['username'] == user.username
+
+    def test_permissions_without_user_lookup(self, user, moderator):
+        title = Title.objects.create(name='Произведение', year=2000)
+        review = Review.objects.create(
+            title=title, author=user, text='Отзыв', score=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = token_client(moderator).delete(
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/')
+
+        assert response.status_code == 204, (
+            'Проверьте, что модератор может удалить чужой отзыв'
+        )
+        assert users_queries(queries) == [], (
+            'Проверьте, что роль и автор проверяются без запроса к users_user'
+        )
+
+    def test_token_without_role_loads_once(self, user):
+        client = APIClient()
+        token = RefreshToken.for_user(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get('/api/v1/genres/').status_code == 200
+        assert len(users_queries(queries)) == 1, (
+            'Проверьте, что роль для токена без claims читается из базы'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/v1/genres/')
+        assert users_queries(queries) == [], (
+            'Проверьте, что роль из базы кэшируется'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRoleChanges:
+
+    def test_role_change_applies_to_issued_token(self, user, admin_client,
+                                                 user_client):
+        category = {'name': 'Книги', 'slug': 'books'}
+        assert user_client.post(
+            '/api/v1/categories/', category).status_code == 403
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', {'role': 'admin'})
+        assert response.status_code == 200
+
+        assert user_client.post(
+            '/api/v1/categories/', category).status_code == 201, (
+            'Проверьте, что смена роли действует на уже выданный токен'
+        )
+
+    def test_deleted_user_token_rejected(self, user, admin_client,
+                                         user_client):
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == 204
+
+        assert user_client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что токен удалённого пользователя не принимается'
+        )
@@ -0,0 +1,129 @@
+import pytest
+from django.db import IntegrityError, transaction
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, GenreTitle, Review, Title
+
+# категория или жанр по slug + id рейтинга + произведения + их жанры
+TOP_MAX_QUERIES = 4
+
+
+@pytest.fixture
+def catalog(django_user_model):
+    """Произведения с оценками: рейтинг известен заранее."""
+    books = Category.objects.create(name='Книги', slug='books')
+    films = Category.objects.create(name='Фильмы', slug='films')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    users = [django_user_model.objects.create(
+        username=f'critic{i}', email=f'critic{i}@yamdb.fake')
+        for i in range(3)]
+    scores = {
+        'Тихий Дон': (books, (10, 9, 8)),
+        'Война и мир': (books, (10, 10)),
+        'Идиот': (books, (7,)),
+        'Без оценок': (books, ()),
+        'Сталкер': (films, (9, 9, 8)),
+    }
+    titles = {}
+    for name, (category, marks) in scores.items():
+        title = Title.objects.create(name=name, year=1960, category=category)
+        GenreTitle.objects.create(title=title, genre=drama)
+        for author, score in zip(users, marks):
+            Review.objects.create(title=title, author=author, text='отзыв',
+                                  score=score)
+        titles[name] = title
+    return titles
+
+
+def names(response):
+    return [title['name'] for title in response.json()]
+
+
+@pytest.mark.django_db
+class TestTopTitles:
+
+    def test_category_top(self, catalog, django_assert_max_num_queries):
+        client = APIClient()
+
+        with django_assert_max_num_queries(TOP_MAX_QUERIES):
+            response = client.get('/api/v1/titles/top/?category=books')
+
+        assert response.status_code == 200, (
+            'Проверьте, что рейтинг произведений доступен без токена'
+        )
+        assert names(response) == ['Война и мир', 'Тихий Дон', 'Идиот'], (
+            'Проверьте, что рейтинг категории отсортирован по убыванию '
+            'оценки и не содержит произведений без оценок'
+        )
+
+    def test_genre_top_limit_and_min_reviews(self, catalog):
+        client = APIClient()
+
+        response = client.get(
+            '/api/v1/titles/top/?genre=drama&min_reviews=3&limit=1')
+
+        assert names(response) == ['Тихий Дон'], (
+            'Проверьте, что рейтинг жанра учитывает limit и min_reviews'
+        )
+
+    def test_genre_link_unique(self, catalog):
+        drama = Genre.objects.get(slug='drama')
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            GenreTitle.objects.create(title=catalog['Идиот'], genre=drama)
+
+        response = APIClient().get('/api/v1/titles/top/?genre=drama')
+        assert len(names(response)) == len(set(names(response))), (
+            'Проверьте, что произведение не повторяется в рейтинге жанра'
+        )
+
+    def test_genre_top_follows_new_review(self, catalog, user_client):
+        title = catalog['Идиот']
+
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'шедевр', 'score': 10}, format='json')
+        assert response.status_code == 201
+
+        link = GenreTitle.objects.get(title=title)
+        assert (link.rating, link.rating_count) == (8.5, 2), (
+            'Проверьте, что отзыв обновляет рейтинг произведения в жанре'
+        )
+        response = APIClient().get('/api/v1/titles/top/?genre=drama')
+        assert names(response).index('Идиот') == 3
+
+    def test_new_genre_gets_title_rating(self, catalog, admin_client):
+        title = catalog['Сталкер']
+        Genre.objects.create(name='Фантастика', slug='sci-fi')
+
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.id}/', data={'genre': ['sci-fi']},
+            format='json')
+
+        assert response.status_code == 200
+        response = APIClient().get('/api/v1/titles/top/?genre=sci-fi')
+        assert names(response) == ['Сталкер'], (
+            'Проверьте, что новая связь с жанром получает рейтинг '
+            'произведения'
+        )
+
+    @pytest.mark.parametrize('query,status', (
+        ('category=books&genre=drama', 400),
+        ('limit=0', 400),
+        ('category=unknown', 404),
+    ))
+    def test_invalid_query(self, catalog, query, status):
+        response = APIClient().get(f'/api/v1/titles/top/?{query}')
+
+        assert response.status_code == status
+
+    def test_list_ordering_by_rating(self, catalog):
+        response = APIClient().get(
+            '/api/v1/titles/?ordering=-rating&category=books')
+
+        results = [title['name'] for title in response.json()['results']]
+        assert results == ['Война и мир', 'Тихий Дон', 'Идиот',
+                           'Без оценок'], (
+            'Проверьте, что ordering=-rating сортирует по убыванию оценки, '
+            'произведения без оценок - в конце'
+        )